@@ -11,11 +11,13 @@ import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
 
 from src.core.config import AppConfig, save_criteria
-from src.core.models import EvaluationResult
+from src.core.models import EvaluationResult, EvidenceMatch
 from src.pipelines.batch import process_file
-from src.services.db import init_db, list_evaluations, count_evaluations
+from src.pipelines.scheduler import JobScheduler
+from src.services.db import init_db, list_evaluations, count_evaluations, list_segments
+from src.services.evidence import verify_evidence
 from src.services.knowledge import ensure_knowledge_index
-from src.services.export_excel import default_report_path, export_to_excel
+from src.services.export_excel import default_report_path, export_to_excel, exportable
 
 
 class GuiApp(tk.Tk):
@@ -29,6 +31,7 @@ class GuiApp(tk.Tk):
         self._results: Dict[str, EvaluationResult] = {}
         self._row_map: Dict[str, EvaluationResult] = {}
         self._row_errors: Dict[str, str] = {}
+        self._partials: Dict[str, List[str]] = {}
         self._page = 1
         self._page_size = 50
         self._name_filter = ""
@@ -209,19 +212,37 @@ class GuiApp(tk.Tk):
         self.cfg.input_dir.mkdir(parents=True, exist_ok=True)
         processed = 0
 
+        scheduler = JobScheduler(self.cfg.scheduler)
         for p in paths:
             src = Path(p)
             dst = self.cfg.input_dir / src.name
             try:
                 shutil.copy2(src, dst)
-                self._queue.put(("status", src.name, "W trakcie", None))
-                result = process_file(dst, self.cfg, local_db)
+                scheduler.submit(dst, lane="manual")
+            except Exception as exc:
+                self._queue.put(("error", src.name, str(exc)))
+                processed += 1
+                self._queue.put(("progress", processed, len(paths)))
+        scheduler.close()
+
+        while (job := scheduler.get()) is not None:
+            name = job.path.name
+            try:
+                self._queue.put(("status", name, "W trakcie", None))
+                result = process_file(
+                    job.path,
+                    self.cfg,
+                    local_db,
+                    on_segment=lambda seg, found, name=name: self._queue.put(
+                        ("segment", name, seg, found)
+                    ),
+                )
                 if result is None:
-                    self._queue.put(("status", src.name, "Pominieto", None))
+                    self._queue.put(("status", name, "Pominieto", None))
                 else:
-                    self._queue.put(("result", src.name, result))
+                    self._queue.put(("result", name, result))
             except Exception as exc:
-                self._queue.put(("error", src.name, str(exc)))
+                self._queue.put(("error", name, str(exc)))
 
             processed += 1
             self._queue.put(("progress", processed, len(paths)))
@@ -253,17 +274,30 @@ class GuiApp(tk.Tk):
             self.details.insert(tk.END, self._row_errors[item_id])
             return
         r = self._row_map.get(item_id)
+        key = self.tree.item(item_id, "values")[0]
         if not r:
-            key = self.tree.item(item_id, "values")[0]
             r = self._results.get(key)
         if not r:
+            if key in self._partials:
+                self.details.delete("1.0", tk.END)
+                self.details.insert(tk.END, "Transkrypcja (w trakcie):\n")
+                self.details.insert(tk.END, "\n".join(self._partials[key]))
             return
+        verification = r.evidence_verification
+        if r.evidence_breakdown and not verification:
+            verification = verify_evidence(
+                r.evidence_breakdown,
+                r.transcript,
+                list_segments(self.db_conn, r.file_hash),
+                self.cfg.scoring,
+            )
         self.details.delete("1.0", tk.END)
         self.details.insert(tk.END, "Oceny kategorii:\n")
         for k, v in r.score_breakdown.items():
             ev = r.evidence_breakdown.get(k, "") if r.evidence_breakdown else ""
             if ev:
-                self.details.insert(tk.END, f"- {k}: {v:.2f} | Dowod: {ev}\n")
+                ts_txt = _evidence_label(verification.get(k))
+                self.details.insert(tk.END, f"- {k}: {v:.2f} | Dowod{ts_txt}: {ev}\n")
             else:
                 self.details.insert(tk.END, f"- {k}: {v:.2f}\n")
         if r.knowledge_snippets:
@@ -274,10 +308,10 @@ class GuiApp(tk.Tk):
         self.details.insert(tk.END, r.transcript)
 
     def _export_excel(self) -> None:
-        if not self._results:
-            messagebox.showinfo("Eksport", "Brak wynikow do eksportu.")
+        rows = exportable(list(self._results.values()))
+        if not rows:
+            messagebox.showinfo("Eksport", "Brak ocenionych rozmow do eksportu.")
             return
-        rows = list(self._results.values())
         report_path = default_report_path(self.cfg.reports_dir)
         export_to_excel(rows, report_path)
         messagebox.showinfo("Eksport", f"Zapisano: {report_path}")
@@ -304,7 +338,7 @@ class GuiApp(tk.Tk):
             self._results[r.file_name] = r
             self._upsert_row(
                 r.file_name,
-                status="Zakonczono",
+                status=_status_label(r),
                 score=f"{r.score_total * 100:.2f}",
                 stars=str(r.stars),
                 profanity="TAK" if r.profanity_flag else "NIE",
@@ -324,12 +358,24 @@ class GuiApp(tk.Tk):
             if kind == "status":
                 filename, status, _ = msg[1], msg[2], msg[3]
                 self._upsert_row(filename, status=status)
+            elif kind == "segment":
+                filename, seg, found = msg[1], msg[2], msg[3]
+                self._partials.setdefault(filename, []).append(
+                    f"[{_format_ts(seg.start)}] {seg.text.strip()}"
+                )
+                self._upsert_row(
+                    filename,
+                    status=f"Transkrypcja {_format_ts(seg.end)}",
+                    profanity="TAK" if found else None,
+                    excerpt=seg.text.strip()[:200] or None,
+                )
             elif kind == "result":
                 filename, result = msg[1], msg[2]
+                self._partials.pop(filename, None)
                 self._results[filename] = result
                 self._upsert_row(
                     filename,
-                    status="Zakonczono",
+                    status=_status_label(result),
                     score=f"{result.score_total * 100:.2f}",
                     stars=str(result.stars),
                     profanity="TAK" if result.profanity_flag else "NIE",
@@ -572,6 +618,29 @@ class GuiApp(tk.Tk):
             self._load_from_db()
 
 
+def _status_label(result: EvaluationResult) -> str:
+    if result.status == "pending":
+        return "Oczekuje na ocene"
+    if result.status == "transcribed":
+        return "Tylko transkrypcja"
+    if result.status == "auto":
+        return f"Auto: {result.auto_label}"
+    return "Zakonczono"
+
+
+def _format_ts(seconds: float) -> str:
+    total = int(seconds)
+    return f"{total // 60:02d}:{total % 60:02d}"
+
+
+def _evidence_label(match: EvidenceMatch | None) -> str:
+    if match is None or not match.verified:
+        return " (niezweryfikowany)"
+    if match.start_sec >= 0:
+        return f" [{_format_ts(match.start_sec)}]"
+    return ""
+
+
 def run_gui(cfg: AppConfig, db_conn) -> None:
     app = GuiApp(cfg, db_conn)
     app.mainloop()
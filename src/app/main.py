@@ -3,29 +3,88 @@
 import argparse
 from pathlib import Path
 
-from src.core.config import load_config
+from src.core.config import AppConfig, load_config
 from src.core.logging_setup import setup_logging
+from src.pipelines.backfill import run_criteria_backfill
 from src.pipelines.batch import run_batch
+from src.pipelines.deferred import batch_scoring_cfg, run_deferred_scoring
+from src.pipelines.importer import run_import
 from src.pipelines.watcher import run_watcher
+from src.services.cassettes import CASSETTE_MODES, finish_cassettes, install_cassettes
 from src.services.db import init_db
+from src.services.metrics import REGISTRY, log_context
+from src.services.profiling import PROFILE_MODES, finish_profiler, install_profiler
 from src.app.gui import run_gui
 
 
 def main() -> None:
     parser = argparse.ArgumentParser()
-    parser.add_argument("--mode", choices=["batch", "watch", "gui"], default="watch")
+    parser.add_argument(
+        "--mode",
+        choices=[
+            "batch",
+            "watch",
+            "gui",
+            "backfill-criteria",
+            "deferred-scoring",
+            "import-transcripts",
+        ],
+        default="watch",
+    )
+    parser.add_argument("--source", help="transcript folder, JSONL file or - for stdin")
+    parser.add_argument("--profile", choices=PROFILE_MODES, help="profile each processed file")
+    parser.add_argument(
+        "--cassettes", choices=CASSETTE_MODES, help="record or replay STT and LLM calls"
+    )
+    parser.add_argument(
+        "--rescore-legacy",
+        action="store_true",
+        help="backfill-criteria: re-score calls scored before criterion fingerprints",
+    )
     args = parser.parse_args()
+    if args.mode == "import-transcripts" and not args.source:
+        parser.error("--mode import-transcripts requires --source")
 
     cfg = load_config(Path("config.yaml"))
-    setup_logging(cfg.logging)
+    if args.mode == "deferred-scoring" or cfg.batch_api.get("enabled"):
+        try:
+            batch_scoring_cfg(cfg)
+        except ValueError as exc:
+            parser.error(str(exc))
+    setup_logging(cfg.logging, log_context)
     db_conn = init_db(cfg.db_path)
+    if args.profile:
+        install_profiler(args.profile, cfg.profiling, int(cfg.scheduler.get("workers", 1)))
+    cassettes = install_cassettes(args.cassettes or cfg.cassettes.get("mode", "off"), cfg.cassettes)
+    try:
+        _run_mode(args, cfg, db_conn)
+    finally:
+        finish_cassettes()
+        if cassettes:
+            print(cassettes.summary())
+        profile_report = finish_profiler()
+        if profile_report:
+            print(f"Profile report: {profile_report}")
 
+
+def _run_mode(args: argparse.Namespace, cfg: AppConfig, db_conn) -> None:
     if args.mode == "batch":
         report = run_batch(cfg, db_conn)
+        print(REGISTRY.summary())
         if report:
             print(f"Report: {report}")
         else:
             print("Batch complete (no Excel export).")
+    elif args.mode == "backfill-criteria":
+        updated = run_criteria_backfill(cfg, db_conn, args.rescore_legacy)
+        print(f"Criteria backfill complete: {updated} calls updated.")
+    elif args.mode == "deferred-scoring":
+        ingested = run_deferred_scoring(cfg, db_conn)
+        print(f"Deferred scoring: {ingested} calls scored.")
+    elif args.mode == "import-transcripts":
+        imported, skipped = run_import(cfg, db_conn, args.source)
+        print(REGISTRY.summary())
+        print(f"Import complete: {imported} calls scored, {skipped} duplicates skipped.")
     elif args.mode == "watch":
         run_watcher(cfg, db_conn)
     else:
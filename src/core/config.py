@@ -30,6 +30,13 @@ class AppConfig:
     watcher: Dict[str, str]
     logging: Dict[str, str]
     knowledge: Dict[str, str]
+    scheduler: Dict[str, str]
+    batch_api: Dict[str, str]
+    preclassify: Dict[str, str]
+    sampling: Dict[str, str]
+    metrics: Dict[str, str]
+    profiling: Dict[str, str]
+    cassettes: Dict[str, str]
 
 
 def load_config(path: Path) -> AppConfig:
@@ -50,6 +57,13 @@ def load_config(path: Path) -> AppConfig:
         watcher=raw["watcher"],
         logging=raw.get("logging", {}),
         knowledge=raw.get("knowledge", {}),
+        scheduler=raw.get("scheduler", {}),
+        batch_api=raw.get("batch_api", {}),
+        preclassify=raw.get("preclassify", {}),
+        sampling=raw.get("sampling", {}),
+        metrics=raw.get("metrics", {}),
+        profiling=raw.get("profiling", {}),
+        cassettes=raw.get("cassettes", {}),
     )
 
 
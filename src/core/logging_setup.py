@@ -1,12 +1,153 @@
 from __future__ import annotations
 
+import atexit
+import copy
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
-from typing import Dict
+from typing import Callable, Dict, Optional
 
 
-def setup_logging(cfg_logging: Dict[str, str]) -> None:
+LogContext = Callable[[], Dict[str, str]]
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s - %(message)s"
+
+_listener: Optional["DrainingQueueListener"] = None
+_queue_handler: Optional["DroppingQueueHandler"] = None
+
+
+class RotatingLogFileHandler(RotatingFileHandler):
+    def __init__(self, path: Path, max_bytes: int, backup_count: int, rotate_when: str) -> None:
+        super().__init__(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+        self.rotate_when = rotate_when
+        self.rollover_at = _next_rollover(rotate_when)
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.rollover_at and time.time() >= self.rollover_at:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        self.rollover_at = _next_rollover(self.rotate_when)
+
+
+class DroppingQueueHandler(QueueHandler):
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return
+        if self.dropped:
+            with self._lock:
+                dropped, self.dropped = self.dropped, 0
+            if dropped:
+                self._report_dropped(dropped)
+
+    def _report_dropped(self, dropped: int) -> None:
+        notice = logging.makeLogRecord(
+            {
+                "name": __name__,
+                "levelno": logging.WARNING,
+                "levelname": "WARNING",
+                "msg": f"Dropped {dropped} log records (logging queue full)",
+            }
+        )
+        try:
+            self.queue.put_nowait(notice)
+        except queue.Full:
+            with self._lock:
+                self.dropped += dropped
+
+
+class DrainingQueueListener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+class ContextFilter(logging.Filter):
+    def __init__(self, context: LogContext) -> None:
+        super().__init__()
+        self.context = context
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in self.context().items():
+            setattr(record, key, value)
+        return True
+
+
+class DebugSampler(logging.Filter):
+    def __init__(self, rates: Dict[str, float]) -> None:
+        super().__init__()
+        self.rates = {name: float(rate) for name, rate in rates.items()}
+        self._every: Dict[str, int] = {}
+        self._seen: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        every = self._every.get(record.name)
+        if every is None:
+            every = self._every_for(record.name)
+        if every <= 1:
+            return every == 1
+        with self._lock:
+            seen = self._seen.get(record.name, 0)
+            self._seen[record.name] = seen + 1
+        return seen % every == 0
+
+    def _every_for(self, name: str) -> int:
+        rate, best_len = 1.0, -1
+        for prefix, value in self.rates.items():
+            if (name == prefix or name.startswith(prefix + ".")) and len(prefix) > best_len:
+                rate, best_len = value, len(prefix)
+        every = 0 if rate <= 0 else max(1, int(round(1.0 / min(rate, 1.0))))
+        self._every[name] = every
+        return every
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": self.formatTime(record, DATE_FORMAT),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+            "file_hash": getattr(record, "file_hash", ""),
+            "file": getattr(record, "file_name", ""),
+            "stage": getattr(record, "stage", ""),
+            "exc": record.exc_text or "",
+        }
+        return json.dumps({k: v for k, v in payload.items() if v}, ensure_ascii=False)
+
+
+def setup_logging(cfg_logging: Dict[str, str], context: Optional[LogContext] = None) -> None:
+    global _listener, _queue_handler
     if not cfg_logging or not cfg_logging.get("enabled", True):
         return
 
@@ -18,15 +159,48 @@ def setup_logging(cfg_logging: Dict[str, str]) -> None:
 
     max_bytes = int(cfg_logging.get("max_bytes", 1_048_576))
     backup_count = int(cfg_logging.get("backup_count", 5))
+    rotate_when = str(cfg_logging.get("rotate_when", "") or "").lower()
 
-    handler = RotatingFileHandler(
-        file_path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
-    )
-    formatter = logging.Formatter(
-        fmt="%(asctime)s %(levelname)s %(name)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
-    )
-    handler.setFormatter(formatter)
+    handler = RotatingLogFileHandler(file_path, max_bytes, backup_count, rotate_when)
+    if str(cfg_logging.get("format", "text")).lower() == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(fmt=TEXT_FORMAT, datefmt=DATE_FORMAT))
+
+    shutdown_logging()
+    log_queue: queue.Queue = queue.Queue(int(cfg_logging.get("queue_size", 10000) or 0))
+    _queue_handler = DroppingQueueHandler(log_queue)
+    if context is not None:
+        _queue_handler.addFilter(ContextFilter(context))
+    if cfg_logging.get("debug_sample"):
+        _queue_handler.addFilter(DebugSampler(cfg_logging["debug_sample"]))
+    _listener = DrainingQueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
 
     root = logging.getLogger()
     root.setLevel(level)
-    root.addHandler(handler)
+    root.addHandler(_queue_handler)
+
+
+def shutdown_logging() -> None:
+    global _listener, _queue_handler
+    listener, _listener = _listener, None
+    queue_handler, _queue_handler = _queue_handler, None
+    if queue_handler is not None:
+        logging.getLogger().removeHandler(queue_handler)
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+def _next_rollover(rotate_when: str) -> float:
+    now = datetime.now()
+    if rotate_when == "midnight":
+        return datetime.combine(now.date() + timedelta(days=1), datetime.min.time()).timestamp()
+    if rotate_when == "hourly":
+        return (now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)).timestamp()
+    return 0.0
+
+
+atexit.register(shutdown_logging)
@@ -1,16 +1,56 @@
 ﻿from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Dict, List
 
 
+@dataclass
+class TranscriptSegment:
+    text: str
+    start: float
+    end: float
+
+
+@dataclass
+class KnowledgeChunk:
+    text: str
+    page: int
+    start: int
+    end: int
+
+
+@dataclass
+class EvidenceMatch:
+    verified: bool
+    match: str
+    score: float
+    offset: int = -1
+    segment: int = -1
+    start_sec: float = -1.0
+
+
+@dataclass
+class AudioInfo:
+    duration_sec: float
+    bitrate_kbps: int
+    channels: int
+    sample_rate: int
+
+
+@dataclass
+class TranscriptionInfo:
+    confidence: float
+    duration_sec: int
+
+
 @dataclass
 class TranscriptionResult:
     file_name: str
     transcript: str
     confidence: float
     duration_sec: int
+    segments: List[TranscriptSegment] = field(default_factory=list)
 
 
 @dataclass
@@ -32,3 +72,8 @@ class EvaluationResult:
     transcription_confidence: float
     call_duration_sec: int
     file_hash: str
+    bitrate_kbps: int = 0
+    channels: int = 0
+    status: str = "scored"
+    auto_label: str = ""
+    evidence_verification: Dict[str, EvidenceMatch] = field(default_factory=dict)
@@ -1,6 +1,7 @@
 ﻿from __future__ import annotations
 
 import hashlib
+import unicodedata
 from pathlib import Path
 
 
@@ -15,6 +16,17 @@ def file_sha256(path: Path, chunk_size: int = 1024 * 1024) -> str:
     return h.hexdigest()
 
 
+def text_sha256(text: str) -> str:
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+def fold_text(text: str) -> str:
+    text = text.lower().replace("\u0142", "l")
+    return "".join(
+        ch for ch in unicodedata.normalize("NFKD", text) if not unicodedata.combining(ch)
+    )
+
+
 def safe_move(src: Path, dst: Path) -> None:
     dst.parent.mkdir(parents=True, exist_ok=True)
     if dst.exists():
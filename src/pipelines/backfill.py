@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from src.core.config import AppConfig
+from src.services.db import (
+    complete_evaluation,
+    get_scoring_inputs,
+    list_segments,
+    list_stale_criteria,
+    seed_criterion_scores,
+)
+from src.services.evidence import verify_evidence
+from src.services.knowledge import ensure_knowledge_index, retrieve_knowledge
+from src.services.llm_scoring import score_transcript
+from src.services.metrics import propagate
+from src.services.scoring import compute_score, score_to_stars, summarize_evidence
+
+
+logger = logging.getLogger(__name__)
+
+
+def run_criteria_backfill(cfg: AppConfig, db_conn, rescore_legacy: bool = False) -> int:
+    seeded = seed_criterion_scores(db_conn, cfg.criteria, legacy=rescore_legacy)
+    if seeded and rescore_legacy:
+        logger.info(
+            "Seeded criterion scores for %d calls from score_breakdown as legacy, "
+            "so they are re-scored on every criterion",
+            seeded,
+        )
+    elif seeded:
+        logger.info(
+            "Seeded criterion scores for %d calls from score_breakdown with the current "
+            "criteria definitions",
+            seeded,
+        )
+
+    stale = list_stale_criteria(db_conn, cfg.criteria)
+    if not stale:
+        logger.info("All calls scored with current criteria")
+        return 0
+    logger.info("Backfilling criteria for %d calls", len(stale))
+
+    ensure_knowledge_index(db_conn, cfg.knowledge)
+    by_name = {c["name"]: c for c in cfg.criteria}
+    workers = max(1, int(cfg.scheduler.get("workers", 1)))
+    updated = 0
+
+    def score(item: Tuple[str, List[str], tuple]) -> Tuple[Dict[str, float], Dict[str, str]]:
+        _, names, (transcript, _, _, knowledge_ctx) = item
+        subset = [by_name[n] for n in names]
+        return score_transcript(transcript, cfg.scoring, subset, knowledge_ctx)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for start in range(0, len(stale), workers * 4):
+            batch = []
+            for file_hash, names in stale[start : start + workers * 4]:
+                inputs = get_scoring_inputs(db_conn, file_hash)
+                if inputs is None:
+                    continue
+                if not inputs[3]:
+                    knowledge_ctx = retrieve_knowledge(db_conn, cfg.knowledge, inputs[0])
+                    inputs = (*inputs[:3], knowledge_ctx)
+                batch.append((file_hash, names, inputs))
+            futures = [pool.submit(propagate(score), item) for item in batch]
+            for (file_hash, names, (transcript, breakdown, evidence, _)), future in zip(
+                batch, futures
+            ):
+                try:
+                    scores, new_evidence = future.result()
+                except Exception:
+                    logger.exception("Criteria backfill failed: %s", file_hash)
+                    continue
+                breakdown = {**breakdown, **scores}
+                evidence = {**evidence, **new_evidence}
+                total = compute_score(cfg.weights, breakdown)
+                verification = verify_evidence(
+                    evidence, transcript, list_segments(db_conn, file_hash), cfg.scoring
+                )
+                complete_evaluation(
+                    db_conn,
+                    file_hash,
+                    [by_name[n] for n in names],
+                    breakdown,
+                    evidence,
+                    summarize_evidence(breakdown, evidence, transcript, verification),
+                    total,
+                    score_to_stars(total, cfg.score_thresholds),
+                    verification,
+                )
+                updated += 1
+                logger.info("Backfilled %s: %s", file_hash[:12], ", ".join(names))
+    return updated
@@ -1,56 +1,162 @@
 ﻿from __future__ import annotations
 
+import logging
 from datetime import datetime
 from pathlib import Path
-from typing import List
+from threading import Lock
+from typing import Callable, Dict, List, Tuple
 
 from src.core.config import AppConfig, is_valid_filename, parse_name_from_filename
-from src.core.models import EvaluationResult
+from src.core.models import AudioInfo, EvaluationResult, TranscriptionResult, TranscriptSegment
 from src.core.utils import file_sha256, safe_move
-from src.services.db import has_file_hash, insert_evaluation
+from src.pipelines.scheduler import Job, JobScheduler, run_workers
+from src.services.audio_probe import probe_mp3
+from src.services.db import (
+    delete_segments,
+    has_file_hash,
+    insert_evaluation,
+    insert_segments,
+    insert_stage_timings,
+)
 from src.services.evaluation_engine import evaluate_transcript
-from src.services.export_excel import default_report_path, export_to_excel
+from src.services.evidence import verify_evidence
+from src.services.export_excel import default_report_path, export_to_excel, exportable
 from src.services.profanity import detect_profanity
-from src.services.scoring import compute_score, score_to_stars
-from src.services.stt_whisper import transcribe
+from src.services.scoring import compute_score, score_to_stars, summarize_evidence
+from src.services.stt_whisper import join_segments, stream_transcribe
 from src.services.knowledge import ensure_knowledge_index, retrieve_knowledge
+from src.services.metrics import (
+    REGISTRY,
+    FileMetrics,
+    incr,
+    set_file_hash,
+    stage,
+    track_file,
+)
+from src.services.preclassify import preclassify
+from src.services.profiling import active_profiler
+from src.services.sampling import get_sampler
+
+
+logger = logging.getLogger(__name__)
+
+SegmentCallback = Callable[[TranscriptSegment, List[str]], None]
+
+
+def process_file(
+    path: Path, cfg: AppConfig, db_conn, on_segment: SegmentCallback | None = None
+) -> EvaluationResult | None:
+    profiler = active_profiler()
+    with track_file(path.name) as fm:
+        if profiler is None:
+            result = _process_file(path, cfg, db_conn, on_segment)
+        else:
+            with profiler.profile(path.name):
+                result = _process_file(path, cfg, db_conn, on_segment)
+    if result is not None:
+        record_file_metrics(db_conn, fm, cfg.metrics)
+    return result
+
 
+def record_file_metrics(db_conn, fm: FileMetrics, cfg_metrics: Dict[str, str]) -> None:
+    if not cfg_metrics.get("enabled", True) or not cfg_metrics.get("record_db", True):
+        return
+    if fm.file_hash:
+        insert_stage_timings(db_conn, fm.file_hash, fm.file_name, fm.stages, fm.counters)
 
-def process_file(path: Path, cfg: AppConfig, db_conn) -> EvaluationResult | None:
+
+def _process_file(
+    path: Path, cfg: AppConfig, db_conn, on_segment: SegmentCallback | None
+) -> EvaluationResult | None:
     if not is_valid_filename(path.name):
         safe_move(path, cfg.invalid_dir / path.name)
+        incr("invalid_files")
         return None
 
-    file_hash = file_sha256(path)
+    with stage("hash"):
+        file_hash = file_sha256(path)
+    incr("bytes", path.stat().st_size)
+    set_file_hash(file_hash)
     if has_file_hash(db_conn, file_hash):
         safe_move(path, cfg.processed_dir / path.name)
+        incr("duplicate_files")
         return None
 
     first_name, last_name = parse_name_from_filename(path.name)
-    transcription = transcribe(str(path), cfg.transcription)
+    with stage("probe"):
+        audio = probe_mp3(path) or AudioInfo(
+            duration_sec=0.0, bitrate_kbps=0, channels=0, sample_rate=0
+        )
+    with stage("transcribe"):
+        transcription, profanity = _transcribe_streaming(
+            path, cfg, db_conn, file_hash, on_segment
+        )
+    incr("audio_sec", transcription.duration_sec or audio.duration_sec)
+
+    result = score_and_store(
+        transcription, cfg, db_conn, file_hash, first_name, last_name, audio, profanity
+    )
+    with stage("move"):
+        safe_move(path, cfg.processed_dir / path.name)
+    return result
 
-    ensure_knowledge_index(db_conn, cfg.knowledge)
-    knowledge_ctx = retrieve_knowledge(db_conn, cfg.knowledge, transcription.transcript)
 
-    scores, evidence = evaluate_transcript(
-        transcription.transcript, cfg.scoring, cfg.criteria, knowledge_ctx
-    )
-    total = compute_score(cfg.weights, scores)
-    stars = score_to_stars(total, cfg.score_thresholds)
-
-    profanity_flag, phrases, excerpt = detect_profanity(transcription.transcript, cfg.profanity_list)
-    evidence_summary = ""
-    for k in scores.keys():
-        if evidence.get(k):
-            evidence_summary = evidence.get(k, "")
-            break
-    if not evidence_summary:
-        evidence_summary = transcription.transcript[:200].strip()
+def score_and_store(
+    transcription: TranscriptionResult,
+    cfg: AppConfig,
+    db_conn,
+    file_hash: str,
+    first_name: str,
+    last_name: str,
+    audio: AudioInfo,
+    profanity: Tuple[bool, List[str], str],
+) -> EvaluationResult:
+    profanity_flag, phrases, excerpt = profanity
+    duration_sec = transcription.duration_sec or int(round(audio.duration_sec))
+    sampler = get_sampler(cfg.sampling)
+    with stage("preclassify"):
+        auto_label = (
+            "" if profanity_flag else preclassify(transcription, duration_sec, cfg.preclassify)
+        )
+    knowledge_ctx: List[str] = []
+    if auto_label:
+        scores, evidence, status = {}, {}, "auto"
+        total = float(cfg.preclassify.get("score", 0.0))
+        stars = 0
+        logger.info("Auto-classified %s as %s", transcription.file_name, auto_label)
+    elif sampler and not sampler.select(
+        db_conn, first_name, last_name, duration_sec, profanity_flag
+    ):
+        scores, evidence, total, stars, status = {}, {}, 0.0, 0, "transcribed"
+    elif cfg.batch_api.get("enabled"):
+        with stage("knowledge"):
+            ensure_knowledge_index(db_conn, cfg.knowledge)
+            knowledge_ctx = retrieve_knowledge(db_conn, cfg.knowledge, transcription.transcript)
+        scores, evidence, total, stars, status = {}, {}, 0.0, 0, "pending"
+    else:
+        with stage("knowledge"):
+            ensure_knowledge_index(db_conn, cfg.knowledge)
+            knowledge_ctx = retrieve_knowledge(db_conn, cfg.knowledge, transcription.transcript)
+        with stage("llm"):
+            scores, evidence = evaluate_transcript(
+                transcription.transcript,
+                cfg.scoring,
+                cfg.criteria,
+                knowledge_ctx,
+                cfg.score_thresholds,
+            )
+        total = compute_score(cfg.weights, scores)
+        stars = score_to_stars(total, cfg.score_thresholds)
+        status = "scored"
+    with stage("evidence"):
+        verification = verify_evidence(
+            evidence, transcription.transcript, transcription.segments, cfg.scoring
+        )
 
     result = EvaluationResult(
         first_name=first_name,
         last_name=last_name,
-        file_name=path.name,
+        file_name=transcription.file_name,
         evaluation_timestamp=datetime.now(),
         transcript=transcription.transcript,
         score_total=total,
@@ -60,29 +166,90 @@ def process_file(path: Path, cfg: AppConfig, db_conn) -> EvaluationResult | None
         profanity_excerpt=excerpt,
         score_breakdown=scores,
         evidence_breakdown=evidence,
-        evidence_summary=evidence_summary,
+        evidence_summary=(
+            f"[auto: {auto_label}]"
+            if auto_label
+            else summarize_evidence(scores, evidence, transcription.transcript, verification)
+        ),
         knowledge_snippets=knowledge_ctx,
         transcription_confidence=transcription.confidence,
-        call_duration_sec=transcription.duration_sec,
+        call_duration_sec=duration_sec,
         file_hash=file_hash,
+        bitrate_kbps=audio.bitrate_kbps,
+        channels=audio.channels,
+        status=status,
+        auto_label=auto_label,
+        evidence_verification=verification,
     )
 
-    insert_evaluation(db_conn, result)
-    safe_move(path, cfg.processed_dir / path.name)
+    with stage("db"):
+        insert_evaluation(db_conn, result, cfg.criteria)
+    incr(f"status_{status}")
     return result
 
 
+def _transcribe_streaming(
+    path: Path, cfg: AppConfig, db_conn, file_hash: str, on_segment: SegmentCallback | None
+) -> Tuple[TranscriptionResult, Tuple[bool, List[str], str]]:
+    segment_iter, info = stream_transcribe(str(path), cfg.transcription)
+    delete_segments(db_conn, file_hash)
+
+    commit_every = max(1, int(cfg.transcription.get("segment_commit_every", 20) or 1))
+    segments: List[TranscriptSegment] = []
+    stored = 0
+    phrases: List[str] = []
+    for seg in segment_iter:
+        segments.append(seg)
+        if len(segments) - stored >= commit_every:
+            insert_segments(db_conn, file_hash, stored, segments[stored:])
+            stored = len(segments)
+        if on_segment:
+            _, found, _ = detect_profanity(seg.text, cfg.profanity_list)
+            new_phrases = [p for p in found if p not in phrases]
+            phrases.extend(new_phrases)
+            on_segment(seg, new_phrases)
+    if stored < len(segments):
+        insert_segments(db_conn, file_hash, stored, segments[stored:])
+
+    transcript = join_segments(segments)
+    transcription = TranscriptionResult(
+        file_name=path.name,
+        transcript=transcript,
+        confidence=info.confidence,
+        duration_sec=info.duration_sec,
+        segments=segments,
+    )
+    return transcription, detect_profanity(transcript, cfg.profanity_list)
+
+
 def run_batch(cfg: AppConfig, db_conn) -> Path | None:
     rows: List[EvaluationResult] = []
+    rows_lock = Lock()
 
+    scheduler = JobScheduler(cfg.scheduler)
     for path in cfg.input_dir.glob("*.mp3"):
-        res = process_file(path, cfg, db_conn)
+        scheduler.submit(path)
+    scheduler.close()
+
+    def handle(job: Job, conn) -> None:
+        res = process_file(job.path, cfg, conn)
         if res:
-            rows.append(res)
+            with rows_lock:
+                rows.append(res)
+
+    run_workers(scheduler, cfg, handle, int(cfg.scheduler.get("workers", 1)), db_conn)
+    logger.info("Stage timings:\n%s", REGISTRY.summary())
+
+    auto = sum(1 for r in rows if r.status == "auto")
+    if auto:
+        logger.info("Pre-classifier skipped the LLM for %d of %d calls", auto, len(rows))
+    parked = sum(1 for r in rows if r.status == "transcribed")
+    if parked:
+        logger.info("Sampling parked %d calls as transcribed-only", parked)
 
     if cfg.use_excel_export:
         report_path = default_report_path(cfg.reports_dir)
-        export_to_excel(rows, report_path)
+        export_to_excel(exportable(rows), report_path)
         return report_path
 
     return None
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import json
+import logging
+import time
+from typing import Dict, List, Tuple
+
+from src.core.config import AppConfig
+from src.services.db import (
+    complete_evaluation,
+    get_scoring_inputs,
+    insert_batch_job,
+    list_open_batch_jobs,
+    list_pending_unsubmitted,
+    list_segments,
+    release_batch,
+    update_batch_job,
+)
+from src.services.evidence import verify_evidence
+from src.services.llm_pool import client_for_provider, derived_scoring_cfg
+from src.services.llm_scoring import chat_request_bodies, parse_scoring_response, reduce_windows
+from src.services.resilience import RetryPolicy, call_with_retry
+from src.services.scoring import compute_score, score_to_stars, summarize_evidence
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def batch_scoring_cfg(cfg: AppConfig) -> Dict[str, str]:
+    overrides = {
+        key: cfg.batch_api.get(key) for key in ("provider", "base_url", "api_key_env", "model")
+    }
+    scoring_cfg = derived_scoring_cfg(cfg.scoring, overrides)
+    if scoring_cfg["provider"] == "openai" and not scoring_cfg.get("model"):
+        raise ValueError("batch_api.model is required for provider openai")
+    return scoring_cfg
+
+
+def run_deferred_scoring(cfg: AppConfig, db_conn) -> int:
+    scoring_cfg = batch_scoring_cfg(cfg)
+    client = client_for_provider(scoring_cfg)
+    policy = RetryPolicy.from_cfg(scoring_cfg)
+    poll_sec = float(cfg.batch_api.get("poll_sec", 60))
+    wait = bool(cfg.batch_api.get("wait", True))
+
+    def api(fn, label: str):
+        return call_with_retry(fn, policy, label=label)
+
+    resumed = list_open_batch_jobs(db_conn)
+    if resumed:
+        logger.info("Resuming %d batch jobs: %s", len(resumed), ", ".join(resumed))
+    _submit_pending(cfg, db_conn, client, scoring_cfg, api)
+
+    ingested = 0
+    while True:
+        open_jobs = list_open_batch_jobs(db_conn)
+        if not open_jobs:
+            break
+        for batch_id in open_jobs:
+            batch = api(lambda: client.batches.retrieve(batch_id), "Batch status")
+            status = str(batch.status)
+            if status not in TERMINAL_STATUSES:
+                update_batch_job(db_conn, batch_id, status)
+                continue
+            logger.info("Batch %s %s", batch_id, status)
+            if batch.output_file_id:
+                ingested += _ingest_output(cfg, db_conn, client, batch.output_file_id, api)
+            released = release_batch(db_conn, batch_id)
+            if released:
+                logger.warning("Batch %s: %d calls returned to pending", batch_id, released)
+            update_batch_job(
+                db_conn,
+                batch_id,
+                status,
+                batch.output_file_id,
+                getattr(batch, "error_file_id", None),
+                ingested=True,
+            )
+        if not wait or not list_open_batch_jobs(db_conn):
+            break
+        time.sleep(poll_sec)
+    return ingested
+
+
+def _submit_pending(cfg: AppConfig, db_conn, client, scoring_cfg: Dict[str, str], api) -> None:
+    max_requests = int(cfg.batch_api.get("max_requests", 50000))
+    while True:
+        pending = list_pending_unsubmitted(db_conn, max_requests)
+        if not pending:
+            return
+        lines: List[str] = []
+        submitted: List[str] = []
+        for file_hash, transcript, knowledge_ctx in pending:
+            bodies = chat_request_bodies(transcript, scoring_cfg, cfg.criteria, knowledge_ctx)
+            if submitted and len(lines) + len(bodies) > max_requests:
+                break
+            if len(bodies) > 1:
+                logger.info("Batch request %s split into %d windows", file_hash, len(bodies))
+            for i, body in enumerate(bodies):
+                lines.append(
+                    json.dumps(
+                        {
+                            "custom_id": _custom_id(file_hash, i, len(bodies)),
+                            "method": "POST",
+                            "url": BATCH_ENDPOINT,
+                            "body": body,
+                        },
+                        ensure_ascii=False,
+                    )
+                )
+            submitted.append(file_hash)
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        uploaded = api(
+            lambda: client.files.create(file=("scoring.jsonl", data), purpose="batch"),
+            "Batch upload",
+        )
+        batch = api(
+            lambda: client.batches.create(
+                input_file_id=uploaded.id,
+                endpoint=BATCH_ENDPOINT,
+                completion_window=str(cfg.batch_api.get("completion_window", "24h")),
+            ),
+            "Batch create",
+        )
+        insert_batch_job(db_conn, batch.id, uploaded.id, submitted)
+        logger.info(
+            "Submitted batch %s with %d calls (%d requests)", batch.id, len(submitted), len(lines)
+        )
+
+
+def _custom_id(file_hash: str, idx: int, total: int) -> str:
+    return file_hash if total == 1 else f"{file_hash}#{idx + 1}/{total}"
+
+
+def _parse_custom_id(custom_id: str) -> Tuple[str, int, int]:
+    file_hash, _, part = custom_id.partition("#")
+    idx, _, total = part.partition("/")
+    if not idx or not total:
+        return file_hash, 0, 1
+    return file_hash, int(idx) - 1, int(total)
+
+
+def _ingest_output(cfg: AppConfig, db_conn, client, output_file_id: str, api) -> int:
+    content = api(lambda: client.files.content(output_file_id), "Batch download")
+    windows: Dict[str, Dict[int, Tuple[Dict[str, float], Dict[str, str]]]] = {}
+    totals: Dict[str, int] = {}
+    failed = set()
+    for line in content.text.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        custom_id = record.get("custom_id", "")
+        file_hash, idx, total = _parse_custom_id(custom_id)
+        totals[file_hash] = total
+        response = record.get("response") or {}
+        if response.get("status_code") != 200:
+            logger.warning("Batch request %s failed: %s", custom_id, record.get("error"))
+            failed.add(file_hash)
+            continue
+        try:
+            raw = response["body"]["choices"][0]["message"]["content"] or ""
+            windows.setdefault(file_hash, {})[idx] = parse_scoring_response(raw, cfg.criteria)
+        except (KeyError, IndexError, TypeError, ValueError) as exc:
+            logger.warning("Batch response for %s unusable: %s", custom_id, exc)
+            failed.add(file_hash)
+
+    ingested = 0
+    for file_hash, parts in windows.items():
+        if file_hash in failed:
+            continue
+        if len(parts) != totals[file_hash]:
+            logger.warning(
+                "Batch output for %s has %d of %d windows", file_hash, len(parts), totals[file_hash]
+            )
+            continue
+        inputs = get_scoring_inputs(db_conn, file_hash)
+        if inputs is None:
+            continue
+        if len(parts) == 1:
+            scores, evidence = parts[0]
+        else:
+            scores, evidence = reduce_windows(
+                [parts[i] for i in sorted(parts)], cfg.criteria, cfg.scoring
+            )
+        total = compute_score(cfg.weights, scores)
+        verification = verify_evidence(
+            evidence, inputs[0], list_segments(db_conn, file_hash), cfg.scoring
+        )
+        complete_evaluation(
+            db_conn,
+            file_hash,
+            cfg.criteria,
+            scores,
+            evidence,
+            summarize_evidence(scores, evidence, inputs[0], verification),
+            total,
+            score_to_stars(total, cfg.score_thresholds),
+            verification,
+        )
+        ingested += 1
+    return ingested
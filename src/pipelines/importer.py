@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import sys
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.core.config import AppConfig, parse_name_from_filename
+from src.core.models import AudioInfo, TranscriptionResult, TranscriptSegment
+from src.core.utils import text_sha256
+from src.pipelines.batch import record_file_metrics, score_and_store
+from src.pipelines.scheduler import run_workers
+from src.services.db import delete_segments, has_file_hash, insert_segments
+from src.services.metrics import set_file_hash, stage, track_file
+from src.services.profanity import detect_profanity
+from src.services.stt_whisper import join_segments
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ImportJob:
+    path: Path
+    file_hash: str
+    first_name: str
+    last_name: str
+    call_id: str
+    duration_sec: float
+    confidence: float
+    transcript: str
+    segments: List[TranscriptSegment] = field(default_factory=list)
+
+
+class ImportQueue:
+    def __init__(self, maxsize: int) -> None:
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+
+    def put(self, job: ImportJob) -> None:
+        self._queue.put(job)
+
+    def get(self, timeout: Optional[float] = None) -> Optional[ImportJob]:
+        job = self._queue.get(timeout=timeout)
+        if job is None:
+            self._queue.put(None)
+        return job
+
+    def close(self) -> None:
+        self._queue.put(None)
+
+
+def run_import(cfg: AppConfig, db_conn, source: str) -> Tuple[int, int]:
+    workers = int(cfg.scheduler.get("workers", 1))
+    jobs = ImportQueue(max(1, workers) * 4)
+    counts = {"imported": 0, "skipped": 0, "invalid": 0}
+    counts_lock = threading.Lock()
+
+    def count(key: str) -> None:
+        with counts_lock:
+            counts[key] += 1
+
+    def produce() -> None:
+        seen = set()
+        try:
+            for label, data in _iter_records(source):
+                try:
+                    job = _job_from_record(label, data)
+                except (TypeError, ValueError):
+                    job = None
+                if job is None:
+                    logger.warning("Skipping %s: invalid record", label)
+                    count("invalid")
+                    continue
+                if job.file_hash in seen:
+                    count("skipped")
+                    continue
+                seen.add(job.file_hash)
+                jobs.put(job)
+        except (OSError, UnicodeDecodeError) as exc:
+            logger.error("Reading %s failed: %s", source, exc)
+        finally:
+            jobs.close()
+
+    def handle(job: ImportJob, conn) -> None:
+        if has_file_hash(conn, job.file_hash):
+            count("skipped")
+            return
+        with track_file(job.call_id) as fm:
+            set_file_hash(job.file_hash)
+            _store_import(job, cfg, conn)
+        record_file_metrics(conn, fm, cfg.metrics)
+        count("imported")
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    run_workers(jobs, cfg, handle, workers, db_conn)
+    producer.join()
+
+    if counts["invalid"]:
+        logger.warning("Import: %d invalid records skipped", counts["invalid"])
+    logger.info(
+        "Import: %d transcripts scored, %d duplicates skipped",
+        counts["imported"],
+        counts["skipped"],
+    )
+    return counts["imported"], counts["skipped"]
+
+
+def _store_import(job: ImportJob, cfg: AppConfig, db_conn) -> None:
+    with stage("segments"):
+        delete_segments(db_conn, job.file_hash)
+        insert_segments(db_conn, job.file_hash, 0, job.segments)
+    transcription = TranscriptionResult(
+        file_name=job.call_id,
+        transcript=job.transcript,
+        confidence=job.confidence,
+        duration_sec=int(round(job.duration_sec)),
+        segments=job.segments,
+    )
+    _, phrases, excerpt = detect_profanity(job.transcript, cfg.profanity_list)
+    audio = AudioInfo(duration_sec=job.duration_sec, bitrate_kbps=0, channels=0, sample_rate=0)
+    score_and_store(
+        transcription,
+        cfg,
+        db_conn,
+        job.file_hash,
+        job.first_name,
+        job.last_name,
+        audio,
+        (len(phrases) > 0, phrases, excerpt),
+    )
+
+
+def _iter_records(source: str) -> Iterator[Tuple[str, Dict]]:
+    if source == "-":
+        yield from _iter_jsonl(sys.stdin, "stdin")
+        return
+    path = Path(source)
+    if path.is_file():
+        yield from _iter_file(path)
+        return
+    for item in sorted(path.iterdir()):
+        if item.suffix.lower() in (".jsonl", ".json", ".txt"):
+            yield from _iter_file(item)
+
+
+def _iter_file(path: Path) -> Iterator[Tuple[str, Dict]]:
+    suffix = path.suffix.lower()
+    if suffix == ".txt":
+        first_name, last_name = parse_name_from_filename(path.name)
+        yield str(path), {
+            "first_name": first_name,
+            "last_name": last_name,
+            "call_id": path.name,
+            "transcript": path.read_text(encoding="utf-8-sig"),
+        }
+    elif suffix == ".json":
+        try:
+            data = json.loads(path.read_text(encoding="utf-8-sig"))
+        except ValueError as exc:
+            logger.warning("Skipping %s: %s", path.name, exc)
+            return
+        records = data if isinstance(data, list) else [data]
+        for idx, record in enumerate(records):
+            yield f"{path}:{idx}", record
+    else:
+        with path.open("r", encoding="utf-8-sig") as f:
+            yield from _iter_jsonl(f, str(path))
+
+
+def _iter_jsonl(lines, label: str) -> Iterator[Tuple[str, Dict]]:
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield f"{label}:{line_no}", json.loads(line)
+        except ValueError as exc:
+            logger.warning("Skipping %s:%d: %s", label, line_no, exc)
+
+
+def _job_from_record(label: str, data: Dict) -> Optional[ImportJob]:
+    if not isinstance(data, dict):
+        return None
+    first_name = str(data.get("first_name") or "").strip()
+    last_name = str(data.get("last_name") or "").strip()
+    if not (first_name and last_name):
+        parts = str(data.get("agent") or "").split()
+        if len(parts) >= 2:
+            first_name, last_name = parts[0], parts[1]
+
+    segments = [
+        TranscriptSegment(
+            text=str(s.get("text", "")),
+            start=float(s.get("start", 0.0)),
+            end=float(s.get("end", 0.0)),
+        )
+        for s in data.get("segments") or []
+        if isinstance(s, dict)
+    ]
+    if segments:
+        transcript = join_segments(segments)
+    else:
+        transcript = str(data.get("transcript") or data.get("text") or "")
+    if not (first_name and last_name) or not transcript.strip():
+        return None
+
+    duration = data.get("duration_sec", data.get("duration"))
+    if duration is None and segments:
+        duration = max(s.end for s in segments)
+    call_id = str(data.get("call_id") or data.get("id") or "") or Path(label).name
+    return ImportJob(
+        path=Path(label),
+        file_hash=text_sha256(f"{first_name} {last_name}\n{transcript}"),
+        first_name=first_name,
+        last_name=last_name,
+        call_id=call_id,
+        duration_sec=float(duration or 0.0),
+        confidence=float(data.get("confidence", 1.0)),
+        transcript=transcript,
+        segments=segments,
+    )
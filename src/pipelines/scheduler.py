@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from src.core.config import AppConfig, parse_name_from_filename
+from src.services.audio_probe import probe_mp3
+from src.services.db import init_db
+
+
+logger = logging.getLogger(__name__)
+
+LANE_DELAY_SEC = {"manual": 0.0, "flagged": 60.0, "short": 120.0, "normal": 600.0}
+FALLBACK_BYTES_PER_SEC = 16000
+
+
+@dataclass(order=True)
+class Job:
+    key: float
+    seq: int
+    path: Path = field(compare=False)
+    lane: str = field(compare=False)
+    expected_sec: float = field(compare=False)
+    enqueued_at: float = field(compare=False)
+
+
+class JobScheduler:
+    def __init__(self, cfg_scheduler: Dict[str, str]) -> None:
+        cfg_scheduler = cfg_scheduler or {}
+        self.lane_delay = {**LANE_DELAY_SEC, **(cfg_scheduler.get("lane_delay_sec") or {})}
+        self.duration_weight = float(cfg_scheduler.get("duration_weight", 1.0))
+        self.short_call_sec = float(cfg_scheduler.get("short_call_sec", 180))
+        self.flagged_agents = {
+            " ".join(str(a).lower().split()) for a in cfg_scheduler.get("flagged_agents") or []
+        }
+        self._heap: List[Job] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def submit(self, path: Path, lane: Optional[str] = None) -> Job:
+        expected = expected_duration(path)
+        lane = lane or self._lane_for(path, expected)
+        now = time.monotonic()
+        key = now + float(self.lane_delay.get(lane, self.lane_delay["normal"]))
+        key += expected * self.duration_weight
+        job = Job(
+            key=key,
+            seq=next(self._seq),
+            path=path,
+            lane=lane,
+            expected_sec=expected,
+            enqueued_at=now,
+        )
+        with self._cond:
+            heapq.heappush(self._heap, job)
+            self._cond.notify()
+        return job
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Job]:
+        with self._cond:
+            while not self._heap and not self._closed:
+                if not self._cond.wait(timeout):
+                    return None
+            if not self._heap:
+                return None
+            return heapq.heappop(self._heap)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._heap)
+
+    def _lane_for(self, path: Path, expected: float) -> str:
+        first_name, last_name = parse_name_from_filename(path.name)
+        if f"{first_name} {last_name}".lower() in self.flagged_agents:
+            return "flagged"
+        if expected <= self.short_call_sec:
+            return "short"
+        return "normal"
+
+
+def expected_duration(path: Path) -> float:
+    try:
+        audio = probe_mp3(path)
+        if audio:
+            return audio.duration_sec
+        return path.stat().st_size / FALLBACK_BYTES_PER_SEC
+    except OSError:
+        return 0.0
+
+
+def run_workers(
+    scheduler: JobScheduler,
+    cfg: AppConfig,
+    handle: Callable[[Job, object], None],
+    workers: int,
+    db_conn=None,
+) -> None:
+    def loop(conn) -> None:
+        while True:
+            job = scheduler.get()
+            if job is None:
+                return
+            try:
+                handle(job, conn)
+            except Exception:
+                logger.exception("Processing failed: %s", job.path.name)
+
+    def threaded_loop() -> None:
+        conn = init_db(cfg.db_path)
+        try:
+            loop(conn)
+        finally:
+            conn.close()
+
+    if workers <= 1 and db_conn is not None:
+        loop(db_conn)
+        return
+
+    threads = [threading.Thread(target=threaded_loop, daemon=True) for _ in range(max(1, workers))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
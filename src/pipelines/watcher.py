@@ -2,21 +2,21 @@
 
 import time
 from pathlib import Path
-from threading import Lock
+from threading import Thread
 
 from watchdog.events import FileSystemEventHandler
 from watchdog.observers import Observer
 
 from src.core.config import AppConfig
-from src.core.utils import safe_move
 from src.pipelines.batch import process_file
+from src.pipelines.scheduler import JobScheduler, run_workers
+from src.services.metrics import serve_metrics
 
 
 class IncomingHandler(FileSystemEventHandler):
-    def __init__(self, cfg: AppConfig, db_conn) -> None:
+    def __init__(self, cfg: AppConfig, scheduler: JobScheduler) -> None:
         self.cfg = cfg
-        self.db_conn = db_conn
-        self.lock = Lock()
+        self.scheduler = scheduler
 
     def on_created(self, event):
         if event.is_directory:
@@ -25,9 +25,9 @@ class IncomingHandler(FileSystemEventHandler):
         if path.suffix.lower() != ".mp3":
             return
 
-        with self.lock:
-            _wait_for_settle(path, int(self.cfg.watcher.get("settle_time_sec", 2)))
-            process_file(path, self.cfg, self.db_conn)
+        _wait_for_settle(path, int(self.cfg.watcher.get("settle_time_sec", 2)))
+        if path.exists():
+            self.scheduler.submit(path)
 
 
 def _wait_for_settle(path: Path, settle_time_sec: int) -> None:
@@ -48,7 +48,21 @@ def _wait_for_settle(path: Path, settle_time_sec: int) -> None:
 def run_watcher(cfg: AppConfig, db_conn) -> None:
     cfg.input_dir.mkdir(parents=True, exist_ok=True)
 
-    event_handler = IncomingHandler(cfg, db_conn)
+    serve_metrics(cfg.metrics)
+    scheduler = JobScheduler(cfg.scheduler)
+    workers = Thread(
+        target=run_workers,
+        args=(
+            scheduler,
+            cfg,
+            lambda job, conn: process_file(job.path, cfg, conn),
+            int(cfg.scheduler.get("workers", 1)),
+        ),
+        daemon=True,
+    )
+    workers.start()
+
+    event_handler = IncomingHandler(cfg, scheduler)
     observer = Observer()
     observer.schedule(event_handler, str(cfg.input_dir), recursive=False)
     observer.start()
@@ -59,3 +73,4 @@ def run_watcher(cfg: AppConfig, db_conn) -> None:
     except KeyboardInterrupt:
         observer.stop()
     observer.join()
+    scheduler.close()
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Optional
+
+from src.core.models import AudioInfo
+
+
+PROBE_BYTES = 64 * 1024
+
+_BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_SAMPLE_RATES = {
+    1: [44100, 48000, 32000],
+    2: [22050, 24000, 16000],
+    25: [11025, 12000, 8000],
+}
+_VERSIONS = {0: 25, 2: 2, 3: 1}
+_LAYERS = {1: 3, 2: 2, 3: 1}
+
+
+def probe_mp3(path: Path) -> Optional[AudioInfo]:
+    size = path.stat().st_size
+    with path.open("rb") as f:
+        head = f.read(PROBE_BYTES)
+        offset = _id3v2_size(head)
+        if offset:
+            f.seek(offset)
+            head = f.read(PROBE_BYTES)
+        tail_tag = 0
+        if size >= 128:
+            f.seek(size - 128)
+            if f.read(3) == b"TAG":
+                tail_tag = 128
+
+    pos = _find_frame(head)
+    if pos is None:
+        return None
+    header = _parse_header(head, pos)
+    version, layer, bitrate, sample_rate, channels = header[:5]
+    samples_per_frame = _samples_per_frame(version, layer)
+
+    audio_bytes = size - offset - pos - tail_tag
+    frames, vbr_bytes = _vbr_info(head, pos, version, channels)
+    if frames:
+        duration = frames * samples_per_frame / sample_rate
+        if vbr_bytes:
+            audio_bytes = vbr_bytes
+        bitrate = int(round(audio_bytes * 8 / duration / 1000)) if duration else bitrate
+    else:
+        duration = audio_bytes * 8 / (bitrate * 1000)
+
+    return AudioInfo(
+        duration_sec=duration,
+        bitrate_kbps=bitrate,
+        channels=channels,
+        sample_rate=sample_rate,
+    )
+
+
+def _id3v2_size(head: bytes) -> int:
+    if len(head) < 10 or head[:3] != b"ID3":
+        return 0
+    size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+    footer = 10 if head[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _parse_header(buf: bytes, pos: int) -> Optional[tuple]:
+    if pos + 4 > len(buf):
+        return None
+    b1, b2, b3 = buf[pos + 1], buf[pos + 2], buf[pos + 3]
+    if buf[pos] != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+    version = _VERSIONS.get((b1 >> 3) & 0x03)
+    layer = _LAYERS.get((b1 >> 1) & 0x03)
+    bitrate_idx = (b2 >> 4) & 0x0F
+    rate_idx = (b2 >> 2) & 0x03
+    if version is None or layer is None or bitrate_idx in (0, 15) or rate_idx == 3:
+        return None
+    bitrate = _BITRATES[(1 if version == 1 else 2, layer)][bitrate_idx]
+    sample_rate = _SAMPLE_RATES[version][rate_idx]
+    padding = (b2 >> 1) & 0x01
+    channels = 1 if ((b3 >> 6) & 0x03) == 3 else 2
+
+    if layer == 1:
+        frame_len = (12 * bitrate * 1000 // sample_rate + padding) * 4
+    elif layer == 3 and version != 1:
+        frame_len = 72 * bitrate * 1000 // sample_rate + padding
+    else:
+        frame_len = 144 * bitrate * 1000 // sample_rate + padding
+    return version, layer, bitrate, sample_rate, channels, frame_len
+
+
+def _find_frame(buf: bytes) -> Optional[int]:
+    pos = buf.find(b"\xff")
+    while pos != -1:
+        header = _parse_header(buf, pos)
+        if header:
+            nxt = pos + header[5]
+            if nxt + 4 > len(buf) or _parse_header(buf, nxt):
+                return pos
+        pos = buf.find(b"\xff", pos + 1)
+    return None
+
+
+def _samples_per_frame(version: int, layer: int) -> int:
+    if layer == 1:
+        return 384
+    if layer == 3 and version != 1:
+        return 576
+    return 1152
+
+
+def _vbr_info(buf: bytes, pos: int, version: int, channels: int) -> tuple[int, int]:
+    if version == 1:
+        side_info = 17 if channels == 1 else 32
+    else:
+        side_info = 9 if channels == 1 else 17
+    xing = pos + 4 + side_info
+    if buf[xing : xing + 4] in (b"Xing", b"Info"):
+        flags = int.from_bytes(buf[xing + 4 : xing + 8], "big")
+        cursor = xing + 8
+        frames = vbr_bytes = 0
+        if flags & 0x01:
+            frames = int.from_bytes(buf[cursor : cursor + 4], "big")
+            cursor += 4
+        if flags & 0x02:
+            vbr_bytes = int.from_bytes(buf[cursor : cursor + 4], "big")
+        return frames, vbr_bytes
+
+    vbri = pos + 4 + 32
+    if buf[vbri : vbri + 4] == b"VBRI":
+        vbr_bytes = int.from_bytes(buf[vbri + 10 : vbri + 14], "big")
+        frames = int.from_bytes(buf[vbri + 14 : vbri + 18], "big")
+        return frames, vbr_bytes
+    return 0, 0
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from src.core.models import TranscriptionInfo, TranscriptSegment
+from src.services.metrics import current_file, incr
+
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_MODES = ("off", "record", "replay")
+CACHE_SIZE = 256
+KEPT_HEADERS = ("x-ratelimit", "retry-after")
+
+LlmResponse = Tuple[str, Mapping[str, str], Optional[int]]
+Stream = Tuple[Iterator[TranscriptSegment], TranscriptionInfo]
+
+_active: Optional["CassetteStore"] = None
+
+
+class CassetteMissError(RuntimeError):
+    pass
+
+
+class CassetteStore:
+    def __init__(self, mode: str, cfg_cassettes: Dict[str, str]) -> None:
+        self.mode = mode
+        self.root = Path(cfg_cassettes.get("dir", "cassettes"))
+        self.replay_speed = float(cfg_cassettes.get("replay_speed", 0) or 0)
+        self.on_miss = str(cfg_cassettes.get("on_miss", "error")).lower()
+        self.recorded = 0
+        self.replayed = 0
+        self.missed = 0
+        self._lock = threading.Lock()
+        self._started: set = set()
+        self._loaded: "OrderedDict[str, Dict]" = OrderedDict()
+
+    def path_for(self, file_hash: str) -> Path:
+        return self.root / file_hash[:2] / f"{file_hash}.jsonl.gz"
+
+    def transcribe(self, live: Callable[[], Stream]) -> Stream:
+        file_hash = _file_hash()
+        if not file_hash:
+            return live()
+        if self.mode == "replay":
+            record = self._cassette(file_hash)["transcribe"]
+            if record is None:
+                return self._miss(file_hash, "transcription", live)
+            self._hit()
+            segments = [TranscriptSegment(text=t, start=s, end=e) for t, s, e in record["segments"]]
+            info = TranscriptionInfo(**record["info"])
+            return self._replay_segments(segments, record["elapsed"]), info
+        started = time.perf_counter()
+        segment_iter, info = live()
+        return self._record_segments(file_hash, segment_iter, info, started), info
+
+    def llm(
+        self, provider: str, model: str, prompt, live: Callable[[], LlmResponse]
+    ) -> LlmResponse:
+        file_hash = _file_hash()
+        if not file_hash:
+            return live()
+        key = _prompt_key(prompt.system, prompt.user)
+        if self.mode == "replay":
+            record = self._next_llm(file_hash, key)
+            if record is None:
+                return self._miss(file_hash, "LLM request", live)
+            self._hit()
+            self._sleep(record["elapsed"])
+            return record["response"], record["headers"], record["used"]
+        started = time.perf_counter()
+        raw, headers, used = live()
+        self._append(
+            file_hash,
+            {
+                "kind": "llm",
+                "key": key,
+                "provider": provider,
+                "model": model,
+                "elapsed": round(time.perf_counter() - started, 6),
+                "request": {"system": prompt.system, "user": prompt.user},
+                "response": raw,
+                "headers": {
+                    k.lower(): v
+                    for k, v in headers.items()
+                    if k.lower().startswith(KEPT_HEADERS)
+                },
+                "used": used,
+            },
+        )
+        return raw, headers, used
+
+    def summary(self) -> str:
+        return (
+            f"Cassettes ({self.mode}, {self.root}): recorded {self.recorded}, "
+            f"replayed {self.replayed}, missed {self.missed}"
+        )
+
+    def _record_segments(
+        self,
+        file_hash: str,
+        segment_iter: Iterator[TranscriptSegment],
+        info: TranscriptionInfo,
+        started: float,
+    ) -> Iterator[TranscriptSegment]:
+        segments: List[TranscriptSegment] = []
+        for seg in segment_iter:
+            segments.append(seg)
+            yield seg
+        self._append(
+            file_hash,
+            {
+                "kind": "transcribe",
+                "elapsed": round(time.perf_counter() - started, 6),
+                "info": asdict(info),
+                "segments": [[s.text, s.start, s.end] for s in segments],
+            },
+        )
+
+    def _replay_segments(
+        self, segments: List[TranscriptSegment], elapsed: float
+    ) -> Iterator[TranscriptSegment]:
+        for seg in segments:
+            self._sleep(elapsed / max(1, len(segments)))
+            yield seg
+
+    def _sleep(self, recorded_sec: float) -> None:
+        if self.replay_speed > 0 and recorded_sec > 0:
+            time.sleep(recorded_sec * self.replay_speed)
+
+    def _append(self, file_hash: str, record: Dict) -> None:
+        data = gzip.compress((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+        path = self.path_for(file_hash)
+        with self._lock:
+            if file_hash in self._started:
+                mode = "ab"
+            else:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                self._started.add(file_hash)
+                mode = "wb"
+            with path.open(mode) as f:
+                f.write(data)
+            self.recorded += 1
+        incr("cassette_records")
+
+    def _cassette(self, file_hash: str) -> Dict:
+        with self._lock:
+            cassette = self._loaded.get(file_hash)
+            if cassette is not None:
+                self._loaded.move_to_end(file_hash)
+                return cassette
+        cassette = {"transcribe": None, "llm": {}, "cursors": {}}
+        path = self.path_for(file_hash)
+        if path.exists():
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    record = json.loads(line)
+                    if record.get("kind") == "transcribe":
+                        cassette["transcribe"] = record
+                    elif record.get("kind") == "llm":
+                        cassette["llm"].setdefault(record["key"], []).append(record)
+        with self._lock:
+            cassette = self._loaded.setdefault(file_hash, cassette)
+            while len(self._loaded) > CACHE_SIZE:
+                self._loaded.popitem(last=False)
+        return cassette
+
+    def _next_llm(self, file_hash: str, key: str) -> Optional[Dict]:
+        cassette = self._cassette(file_hash)
+        records = cassette["llm"].get(key)
+        if not records:
+            return None
+        with self._lock:
+            idx = cassette["cursors"].get(key, 0)
+            cassette["cursors"][key] = idx + 1
+        return records[min(idx, len(records) - 1)]
+
+    def _hit(self) -> None:
+        with self._lock:
+            self.replayed += 1
+        incr("cassette_replays")
+
+    def _miss(self, file_hash: str, what: str, live: Callable):
+        with self._lock:
+            self.missed += 1
+        incr("cassette_misses")
+        if self.on_miss == "live":
+            logger.warning("No recorded %s for %s, calling the live service", what, file_hash)
+            return live()
+        raise CassetteMissError(f"No recorded {what} for {file_hash} in {self.root}")
+
+
+def _file_hash() -> str:
+    fm = current_file()
+    return fm.file_hash if fm is not None else ""
+
+
+def _prompt_key(system: str, user: str) -> str:
+    return hashlib.sha256(f"{system}\n\0{user}".encode("utf-8")).hexdigest()
+
+
+def install_cassettes(mode: str, cfg_cassettes: Dict[str, str]) -> Optional[CassetteStore]:
+    global _active
+    mode = (mode or "off").lower()
+    if mode == "off":
+        _active = None
+        return None
+    if mode not in CASSETTE_MODES:
+        raise ValueError(f"Unknown cassette mode: {mode}")
+    _active = CassetteStore(mode, cfg_cassettes or {})
+    logger.info("Cassettes: %s %s", mode, _active.root)
+    return _active
+
+
+def active_cassettes() -> Optional[CassetteStore]:
+    return _active
+
+
+def finish_cassettes() -> Optional[CassetteStore]:
+    global _active
+    store, _active = _active, None
+    if store is not None:
+        logger.info(store.summary())
+    return store
@@ -2,16 +2,22 @@
 
 import json
 import sqlite3
+from dataclasses import asdict
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, List
+from typing import Dict, Optional, List, Tuple
 
-from src.core.models import EvaluationResult
+from src.core.models import EvaluationResult, EvidenceMatch, TranscriptSegment
+from src.services.scoring import criterion_fingerprint
+
+
+LEGACY_FINGERPRINT = "legacy"
 
 
 def init_db(db_path: Path) -> sqlite3.Connection:
     db_path.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(str(db_path))
+    conn = sqlite3.connect(str(db_path), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
     conn.execute(
         """
         CREATE TABLE IF NOT EXISTS call_evaluations (
@@ -40,6 +46,66 @@ def init_db(db_path: Path) -> sqlite3.Connection:
     _ensure_column(conn, "call_evaluations", "evidence_breakdown", "TEXT")
     _ensure_column(conn, "call_evaluations", "evidence_summary", "TEXT")
     _ensure_column(conn, "call_evaluations", "knowledge_snippets", "TEXT")
+    _ensure_column(conn, "call_evaluations", "bitrate_kbps", "INTEGER")
+    _ensure_column(conn, "call_evaluations", "channels", "INTEGER")
+    _ensure_column(conn, "call_evaluations", "status", "TEXT DEFAULT 'scored'")
+    _ensure_column(conn, "call_evaluations", "batch_id", "TEXT")
+    _ensure_column(conn, "call_evaluations", "auto_label", "TEXT")
+    _ensure_column(conn, "call_evaluations", "evidence_verification", "TEXT")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS call_segments (
+            file_hash TEXT,
+            idx INTEGER,
+            start_sec REAL,
+            end_sec REAL,
+            text TEXT,
+            PRIMARY KEY (file_hash, idx)
+        );
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS criterion_scores (
+            file_hash TEXT,
+            criterion TEXT,
+            fingerprint TEXT,
+            score REAL,
+            evidence TEXT,
+            updated_at TEXT,
+            PRIMARY KEY (file_hash, criterion)
+        );
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS batch_jobs (
+            batch_id TEXT PRIMARY KEY,
+            input_file_id TEXT,
+            output_file_id TEXT,
+            error_file_id TEXT,
+            status TEXT,
+            request_count INTEGER,
+            ingested INTEGER DEFAULT 0,
+            created_at TEXT,
+            updated_at TEXT
+        );
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS stage_timings (
+            file_hash TEXT,
+            file_name TEXT,
+            kind TEXT,
+            name TEXT,
+            value REAL,
+            calls INTEGER,
+            recorded_at TEXT,
+            PRIMARY KEY (file_hash, kind, name)
+        );
+        """
+    )
     conn.commit()
     return conn
 
@@ -55,15 +121,18 @@ def has_file_hash(conn: sqlite3.Connection, file_hash: str) -> bool:
     return cur.fetchone() is not None
 
 
-def insert_evaluation(conn: sqlite3.Connection, r: EvaluationResult) -> None:
+def insert_evaluation(
+    conn: sqlite3.Connection, r: EvaluationResult, criteria: Optional[List[dict]] = None
+) -> None:
     conn.execute(
         """
         INSERT INTO call_evaluations (
             first_name, last_name, file_name, file_hash, call_duration,
             evaluation_timestamp, transcript, score_total, stars,
             profanity_flag, profanity_phrases, profanity_excerpt, score_breakdown,
-            evidence_breakdown, evidence_summary, knowledge_snippets, transcription_confidence
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            evidence_breakdown, evidence_summary, knowledge_snippets, transcription_confidence,
+            bitrate_kbps, channels, status, auto_label, evidence_verification
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """,
         (
             r.first_name,
@@ -83,8 +152,288 @@ def insert_evaluation(conn: sqlite3.Connection, r: EvaluationResult) -> None:
             r.evidence_summary,
             json.dumps(r.knowledge_snippets, ensure_ascii=False),
             r.transcription_confidence,
+            r.bitrate_kbps,
+            r.channels,
+            r.status,
+            r.auto_label,
+            _dump_verification(r.evidence_verification),
         ),
     )
+    if criteria:
+        _upsert_criterion_scores(
+            conn, r.file_hash, criteria, r.score_breakdown, r.evidence_breakdown
+        )
+    conn.commit()
+
+
+def _dump_verification(verification: Dict[str, EvidenceMatch]) -> str:
+    return json.dumps({k: asdict(v) for k, v in verification.items()}, ensure_ascii=False)
+
+
+def _load_verification(raw: Optional[str]) -> Dict[str, EvidenceMatch]:
+    return {k: EvidenceMatch(**v) for k, v in json.loads(raw or "{}").items()}
+
+
+def _upsert_criterion_scores(
+    conn: sqlite3.Connection,
+    file_hash: str,
+    criteria: List[dict],
+    scores: Dict[str, float],
+    evidence: Dict[str, str],
+    fingerprint: Optional[str] = None,
+) -> None:
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    conn.executemany(
+        """
+        INSERT OR REPLACE INTO criterion_scores
+            (file_hash, criterion, fingerprint, score, evidence, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        [
+            (
+                file_hash,
+                c["name"],
+                fingerprint or criterion_fingerprint(c),
+                float(scores[c["name"]]),
+                evidence.get(c["name"], ""),
+                now,
+            )
+            for c in criteria
+            if c["name"] in scores
+        ],
+    )
+
+
+def seed_criterion_scores(
+    conn: sqlite3.Connection, criteria: List[dict], legacy: bool = False
+) -> int:
+    cur = conn.execute(
+        """
+        SELECT file_hash, score_breakdown, evidence_breakdown FROM call_evaluations
+        WHERE status = 'scored'
+            AND file_hash NOT IN (SELECT DISTINCT file_hash FROM criterion_scores)
+        """
+    )
+    seeded = 0
+    for file_hash, breakdown, evidence in cur.fetchall():
+        _upsert_criterion_scores(
+            conn,
+            file_hash,
+            criteria,
+            json.loads(breakdown or "{}"),
+            json.loads(evidence or "{}"),
+            LEGACY_FINGERPRINT if legacy else None,
+        )
+        seeded += 1
+    conn.commit()
+    return seeded
+
+
+def list_stale_criteria(
+    conn: sqlite3.Connection, criteria: List[dict]
+) -> List[Tuple[str, List[str]]]:
+    fingerprints = {c["name"]: criterion_fingerprint(c) for c in criteria}
+    if not fingerprints:
+        return []
+    marks = ", ".join("?" for _ in fingerprints)
+    cur = conn.execute(
+        f"""
+        SELECT e.file_hash FROM call_evaluations e
+        WHERE e.status IN ('scored', 'transcribed') AND (
+            SELECT COUNT(1) FROM criterion_scores s
+            WHERE s.file_hash = e.file_hash AND s.fingerprint IN ({marks})
+        ) < ?
+        ORDER BY e.id
+        """,
+        (*fingerprints.values(), len(fingerprints)),
+    )
+    stale = []
+    for (file_hash,) in cur.fetchall():
+        current = dict(
+            conn.execute(
+                "SELECT criterion, fingerprint FROM criterion_scores WHERE file_hash = ?",
+                (file_hash,),
+            ).fetchall()
+        )
+        names = [n for n, fp in fingerprints.items() if current.get(n) != fp]
+        stale.append((file_hash, names))
+    return stale
+
+
+def get_scoring_inputs(
+    conn: sqlite3.Connection, file_hash: str
+) -> Optional[Tuple[str, Dict[str, float], Dict[str, str], List[str]]]:
+    row = conn.execute(
+        """
+        SELECT transcript, score_breakdown, evidence_breakdown, knowledge_snippets
+        FROM call_evaluations WHERE file_hash = ?
+        """,
+        (file_hash,),
+    ).fetchone()
+    if row is None:
+        return None
+    return (
+        row[0] or "",
+        json.loads(row[1] or "{}"),
+        json.loads(row[2] or "{}"),
+        json.loads(row[3] or "[]"),
+    )
+
+
+def delete_segments(conn: sqlite3.Connection, file_hash: str) -> None:
+    conn.execute("DELETE FROM call_segments WHERE file_hash = ?", (file_hash,))
+    conn.commit()
+
+
+def insert_segments(
+    conn: sqlite3.Connection, file_hash: str, first_idx: int, segments: List[TranscriptSegment]
+) -> None:
+    conn.executemany(
+        """
+        INSERT OR REPLACE INTO call_segments (file_hash, idx, start_sec, end_sec, text)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        [
+            (file_hash, first_idx + i, seg.start, seg.end, seg.text)
+            for i, seg in enumerate(segments)
+        ],
+    )
+    conn.commit()
+
+
+def list_segments(conn: sqlite3.Connection, file_hash: str) -> List[TranscriptSegment]:
+    cur = conn.execute(
+        "SELECT text, start_sec, end_sec FROM call_segments WHERE file_hash = ? ORDER BY idx",
+        (file_hash,),
+    )
+    return [TranscriptSegment(text=r[0] or "", start=float(r[1]), end=float(r[2])) for r in cur]
+
+
+def count_agent_calls(
+    conn: sqlite3.Connection, first_name: str, last_name: str, start: datetime, end: datetime
+) -> Tuple[int, int]:
+    row = conn.execute(
+        """
+        SELECT COUNT(1), COALESCE(SUM(CASE WHEN status = 'transcribed' THEN 0 ELSE 1 END), 0)
+        FROM call_evaluations
+        WHERE first_name = ? COLLATE NOCASE AND last_name = ? COLLATE NOCASE
+            AND evaluation_timestamp >= ? AND evaluation_timestamp < ?
+            AND status != 'auto'
+        """,
+        (
+            first_name,
+            last_name,
+            start.strftime("%Y-%m-%d %H:%M:%S"),
+            end.strftime("%Y-%m-%d %H:%M:%S"),
+        ),
+    ).fetchone()
+    return int(row[0]), int(row[1])
+
+
+def list_pending_unsubmitted(
+    conn: sqlite3.Connection, limit: int
+) -> List[Tuple[str, str, List[str]]]:
+    cur = conn.execute(
+        """
+        SELECT file_hash, transcript, knowledge_snippets FROM call_evaluations
+        WHERE status = 'pending' AND batch_id IS NULL
+        ORDER BY id
+        LIMIT ?
+        """,
+        (limit,),
+    )
+    return [(r[0], r[1] or "", json.loads(r[2] or "[]")) for r in cur.fetchall()]
+
+
+def insert_batch_job(
+    conn: sqlite3.Connection, batch_id: str, input_file_id: str, file_hashes: List[str]
+) -> None:
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    conn.execute(
+        """
+        INSERT INTO batch_jobs
+            (batch_id, input_file_id, status, request_count, created_at, updated_at)
+        VALUES (?, ?, 'validating', ?, ?, ?)
+        """,
+        (batch_id, input_file_id, len(file_hashes), now, now),
+    )
+    conn.executemany(
+        "UPDATE call_evaluations SET batch_id = ? WHERE file_hash = ?",
+        [(batch_id, h) for h in file_hashes],
+    )
+    conn.commit()
+
+
+def list_open_batch_jobs(conn: sqlite3.Connection) -> List[str]:
+    cur = conn.execute("SELECT batch_id FROM batch_jobs WHERE ingested = 0 ORDER BY created_at")
+    return [r[0] for r in cur.fetchall()]
+
+
+def update_batch_job(
+    conn: sqlite3.Connection,
+    batch_id: str,
+    status: str,
+    output_file_id: Optional[str] = None,
+    error_file_id: Optional[str] = None,
+    ingested: bool = False,
+) -> None:
+    conn.execute(
+        """
+        UPDATE batch_jobs
+        SET status = ?, output_file_id = ?, error_file_id = ?, ingested = ?, updated_at = ?
+        WHERE batch_id = ?
+        """,
+        (
+            status,
+            output_file_id,
+            error_file_id,
+            1 if ingested else 0,
+            datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            batch_id,
+        ),
+    )
+    conn.commit()
+
+
+def release_batch(conn: sqlite3.Connection, batch_id: str) -> int:
+    cur = conn.execute(
+        "UPDATE call_evaluations SET batch_id = NULL WHERE batch_id = ? AND status = 'pending'",
+        (batch_id,),
+    )
+    conn.commit()
+    return cur.rowcount
+
+
+def complete_evaluation(
+    conn: sqlite3.Connection,
+    file_hash: str,
+    criteria: List[dict],
+    scores: Dict[str, float],
+    evidence: Dict[str, str],
+    evidence_summary: str,
+    score_total: float,
+    stars: int,
+    evidence_verification: Dict[str, EvidenceMatch],
+) -> None:
+    conn.execute(
+        """
+        UPDATE call_evaluations
+        SET score_breakdown = ?, evidence_breakdown = ?, evidence_summary = ?,
+            evidence_verification = ?, score_total = ?, stars = ?, status = 'scored',
+            batch_id = NULL
+        WHERE file_hash = ?
+        """,
+        (
+            json.dumps(scores, ensure_ascii=False),
+            json.dumps(evidence, ensure_ascii=False),
+            evidence_summary,
+            _dump_verification(evidence_verification),
+            score_total,
+            stars,
+            file_hash,
+        ),
+    )
+    _upsert_criterion_scores(conn, file_hash, criteria, scores, evidence)
     conn.commit()
 
 
@@ -103,7 +452,8 @@ def list_evaluations(
             first_name, last_name, file_name, file_hash, call_duration,
             evaluation_timestamp, transcript, score_total, stars,
             profanity_flag, profanity_phrases, profanity_excerpt, score_breakdown,
-            evidence_breakdown, evidence_summary, knowledge_snippets, transcription_confidence
+            evidence_breakdown, evidence_summary, knowledge_snippets, transcription_confidence,
+            bitrate_kbps, channels, status, auto_label, evidence_verification
         FROM call_evaluations
         {where}
         ORDER BY id DESC
@@ -132,6 +482,11 @@ def list_evaluations(
                 evidence_summary=r[14] or "",
                 knowledge_snippets=json.loads(r[15] or "[]"),
                 transcription_confidence=float(r[16] or 0.0),
+                bitrate_kbps=int(r[17] or 0),
+                channels=int(r[18] or 0),
+                status=r[19] or "scored",
+                auto_label=r[20] or "",
+                evidence_verification=_load_verification(r[21]),
             )
         )
     return rows
@@ -146,3 +501,24 @@ def count_evaluations(conn: sqlite3.Connection, name_filter: str | None = None)
         params.extend([nf, nf])
     cur = conn.execute(f"SELECT COUNT(1) FROM call_evaluations {where}", params)
     return int(cur.fetchone()[0])
+
+
+def insert_stage_timings(
+    conn: sqlite3.Connection,
+    file_hash: str,
+    file_name: str,
+    stages: Dict[str, List[float]],
+    counters: Dict[str, float],
+) -> None:
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    rows = [(file_hash, file_name, "stage", k, v[0], int(v[1]), now) for k, v in stages.items()]
+    rows += [(file_hash, file_name, "counter", k, v, None, now) for k, v in counters.items()]
+    conn.executemany(
+        """
+        INSERT OR REPLACE INTO stage_timings
+            (file_hash, file_name, kind, name, value, calls, recorded_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        rows,
+    )
+    conn.commit()
@@ -1,11 +1,108 @@
 ﻿from __future__ import annotations
 
+import logging
 from typing import Dict
 
+from src.services.evidence import verify_evidence
+from src.services.llm_pool import derived_scoring_cfg
 from src.services.llm_scoring import score_transcript
+from src.services.scoring import compute_score
+
+
+logger = logging.getLogger(__name__)
+
+REASK_NOTE = (
+    "Uwaga: poprzednie cytaty dla tych kategorii nie wystepowaly w transkrypcji. "
+    "Podaj dowod jako dokladny fragment skopiowany z transkrypcji."
+)
 
 
 def evaluate_transcript(
-    transcript: str, cfg_scoring: Dict[str, str], criteria: list[dict], knowledge_ctx: list[str]
+    transcript: str,
+    cfg_scoring: Dict[str, str],
+    criteria: list[dict],
+    knowledge_ctx: list[str],
+    score_thresholds: Dict[str, float] | None = None,
 ) -> tuple[Dict[str, float], Dict[str, str]]:
-    return score_transcript(transcript, cfg_scoring, criteria, knowledge_ctx)
+    scores, evidence = _evaluate(transcript, cfg_scoring, criteria, knowledge_ctx, score_thresholds)
+    if cfg_scoring.get("evidence_reask"):
+        _reask_unverified(transcript, cfg_scoring, criteria, knowledge_ctx, scores, evidence)
+    return scores, evidence
+
+
+def _evaluate(
+    transcript: str,
+    cfg_scoring: Dict[str, str],
+    criteria: list[dict],
+    knowledge_ctx: list[str],
+    score_thresholds: Dict[str, float] | None,
+) -> tuple[Dict[str, float], Dict[str, str]]:
+    cascade = cfg_scoring.get("cascade") or {}
+    if not cascade.get("enabled") or not score_thresholds:
+        return score_transcript(transcript, cfg_scoring, criteria, knowledge_ctx)
+
+    small_cfg = {k: v for k, v in cfg_scoring.items() if k != "cascade"}
+    large_cfg = derived_scoring_cfg(small_cfg, cascade.get("large") or {})
+
+    try:
+        scores, evidence = score_transcript(transcript, small_cfg, criteria, knowledge_ctx)
+    except RuntimeError as exc:
+        logger.info("Cascade: small model failed (%s), escalating", exc)
+        return score_transcript(transcript, large_cfg, criteria, knowledge_ctx)
+
+    reason = _escalation_reason(scores, evidence, criteria, score_thresholds, cascade)
+    if not reason:
+        return scores, evidence
+    logger.info("Cascade: escalating to %s (%s)", large_cfg.get("model"), reason)
+    return score_transcript(transcript, large_cfg, criteria, knowledge_ctx)
+
+
+def _escalation_reason(
+    scores: Dict[str, float],
+    evidence: Dict[str, str],
+    criteria: list[dict],
+    score_thresholds: Dict[str, float],
+    cascade: Dict[str, str],
+) -> str:
+    weights = {c["name"]: float(c.get("weight", 0.0)) for c in criteria}
+    total = compute_score(weights, scores)
+    margin = float(cascade.get("margin", 0.03))
+    for name, threshold in score_thresholds.items():
+        if abs(total - float(threshold)) <= margin:
+            return f"total {total:.3f} within {margin} of {name}"
+    if cascade.get("escalate_on_missing_evidence", True):
+        missing = [k for k, v in scores.items() if v > 0.0 and not evidence.get(k)]
+        if missing:
+            return "missing evidence for " + ", ".join(missing)
+    return ""
+
+
+def _reask_unverified(
+    transcript: str,
+    cfg_scoring: Dict[str, str],
+    criteria: list[dict],
+    knowledge_ctx: list[str],
+    scores: Dict[str, float],
+    evidence: Dict[str, str],
+) -> None:
+    verification = verify_evidence(evidence, transcript, cfg_scoring=cfg_scoring)
+    failed = [
+        c for c in criteria if c["name"] in verification and not verification[c["name"]].verified
+    ]
+    if not failed:
+        return
+    logger.info("Re-asking for unverified evidence: %s", ", ".join(c["name"] for c in failed))
+    reask_cfg = {k: v for k, v in cfg_scoring.items() if k != "cascade"}
+    try:
+        new_scores, new_evidence = score_transcript(
+            REASK_NOTE + "\n" + transcript, reask_cfg, failed, knowledge_ctx
+        )
+    except RuntimeError as exc:
+        logger.warning("Evidence re-ask failed: %s", exc)
+        return
+    recheck = verify_evidence(new_evidence, transcript, cfg_scoring=cfg_scoring)
+    for c in failed:
+        name = c["name"]
+        if name in recheck and recheck[name].verified:
+            scores[name] = new_scores.get(name, scores.get(name, 0.0))
+            evidence[name] = new_evidence[name]
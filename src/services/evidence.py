@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+from src.core.models import EvidenceMatch, TranscriptSegment
+from src.core.utils import fold_text
+
+
+MIN_RUN_CHARS = 12
+MIN_COVERAGE = 0.8
+
+_fold_cache: Dict[str, str] = {}
+
+
+def _fold_char(ch: str) -> str:
+    folded = _fold_cache.get(ch)
+    if folded is None:
+        folded = "".join(c if c.isalnum() else " " for c in fold_text(ch))
+        _fold_cache[ch] = folded
+    return folded
+
+
+def normalize(text: str) -> Tuple[str, List[int]]:
+    out: List[str] = []
+    positions: List[int] = []
+    for pos, ch in enumerate(text):
+        for c in _fold_char(ch):
+            if c == " ":
+                if not out or out[-1] == " ":
+                    continue
+            out.append(c)
+            positions.append(pos)
+    if out and out[-1] == " ":
+        out.pop()
+        positions.pop()
+    return "".join(out), positions
+
+
+class SuffixAutomaton:
+    def __init__(self, text: str) -> None:
+        self.next: List[Dict[str, int]] = [{}]
+        self.link: List[int] = [-1]
+        self.length: List[int] = [0]
+        self.first_end: List[int] = [-1]
+        last = 0
+        for i, ch in enumerate(text):
+            cur = len(self.next)
+            self.next.append({})
+            self.link.append(0)
+            self.length.append(self.length[last] + 1)
+            self.first_end.append(i)
+            p = last
+            while p != -1 and ch not in self.next[p]:
+                self.next[p][ch] = cur
+                p = self.link[p]
+            if p != -1:
+                q = self.next[p][ch]
+                if self.length[p] + 1 == self.length[q]:
+                    self.link[cur] = q
+                else:
+                    clone = len(self.next)
+                    self.next.append(dict(self.next[q]))
+                    self.link.append(self.link[q])
+                    self.length.append(self.length[p] + 1)
+                    self.first_end.append(self.first_end[q])
+                    while p != -1 and self.next[p].get(ch) == q:
+                        self.next[p][ch] = clone
+                        p = self.link[p]
+                    self.link[q] = clone
+                    self.link[cur] = clone
+            last = cur
+
+    def matching_statistics(self, pattern: str) -> List[Tuple[int, int]]:
+        stats = []
+        v, n = 0, 0
+        for ch in pattern:
+            while v and ch not in self.next[v]:
+                v = self.link[v]
+                n = self.length[v]
+            if ch in self.next[v]:
+                v = self.next[v][ch]
+                n += 1
+            else:
+                n = 0
+            stats.append((n, self.first_end[v] if n else -1))
+        return stats
+
+
+class EvidenceIndex:
+    def __init__(self, transcript: str, segments: Optional[List[TranscriptSegment]] = None) -> None:
+        self.text, self.positions = normalize(transcript)
+        self.automaton = SuffixAutomaton(self.text)
+        self.segments = [s for s in segments or [] if s.text.strip()]
+        self.segment_offsets: List[int] = []
+        offset = 0
+        for seg in self.segments:
+            self.segment_offsets.append(offset)
+            offset += len(seg.text.strip()) + 1
+
+    def locate(
+        self, quote: str, min_run: int = MIN_RUN_CHARS, min_coverage: float = MIN_COVERAGE
+    ) -> EvidenceMatch:
+        pattern, _ = normalize(quote)
+        if not pattern or not self.text:
+            return EvidenceMatch(verified=False, match="none", score=0.0)
+
+        stats = self.automaton.matching_statistics(pattern)
+        best_len, best_end = max(stats)
+        if best_len == len(pattern):
+            return self._match(best_end - best_len + 1, "exact", 1.0)
+
+        run = min(min_run, len(pattern))
+        covered, last_end = 0, -1
+        for i, (n, _) in enumerate(stats):
+            if n >= run:
+                covered += i - max(i - n + 1, last_end + 1) + 1
+                last_end = i
+        coverage = covered / len(pattern)
+        if best_len >= run and coverage >= min_coverage:
+            return self._match(best_end - best_len + 1, "fuzzy", round(coverage, 3))
+        return EvidenceMatch(verified=False, match="none", score=round(coverage, 3))
+
+    def _match(self, norm_start: int, kind: str, score: float) -> EvidenceMatch:
+        offset = self.positions[norm_start]
+        segment = bisect_right(self.segment_offsets, offset) - 1 if self.segments else -1
+        return EvidenceMatch(
+            verified=True,
+            match=kind,
+            score=score,
+            offset=offset,
+            segment=segment,
+            start_sec=self.segments[segment].start if segment >= 0 else -1.0,
+        )
+
+
+def verify_evidence(
+    evidence: Dict[str, str],
+    transcript: str,
+    segments: Optional[List[TranscriptSegment]] = None,
+    cfg_scoring: Optional[Dict[str, str]] = None,
+) -> Dict[str, EvidenceMatch]:
+    quotes = {k: v for k, v in evidence.items() if v}
+    if not quotes:
+        return {}
+    cfg_scoring = cfg_scoring or {}
+    min_run = int(cfg_scoring.get("evidence_min_run_chars", MIN_RUN_CHARS))
+    min_coverage = float(cfg_scoring.get("evidence_min_coverage", MIN_COVERAGE))
+    index = EvidenceIndex(transcript, segments)
+    return {k: index.locate(v, min_run, min_coverage) for k, v in quotes.items()}
@@ -7,6 +7,13 @@ from typing import List
 from src.core.models import EvaluationResult
 
 
+EXPORT_STATUSES = ("scored",)
+
+
+def exportable(rows: List[EvaluationResult]) -> List[EvaluationResult]:
+    return [r for r in rows if r.status in EXPORT_STATUSES]
+
+
 def export_to_excel(rows: List[EvaluationResult], out_path: Path) -> None:
     import openpyxl
     from openpyxl.styles import PatternFill
@@ -1,29 +1,106 @@
 from __future__ import annotations
 
+import math
 import re
 import sqlite3
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
 from pathlib import Path
-from typing import List, Dict
+from typing import Iterable, Iterator, List, Dict, Tuple
 
+from src.core.models import KnowledgeChunk
+from src.services.metrics import incr
+from src.services.knowledge_vectors import (
+    delete_source_vectors,
+    reciprocal_rank_fusion,
+    sync_vectors,
+    vector_search,
+    vectors_enabled,
+)
 
-def _chunk_text(text: str, chunk_chars: int, overlap_chars: int) -> List[str]:
-    chunks = []
-    i = 0
-    while i < len(text):
-        end = min(len(text), i + chunk_chars)
-        chunks.append(text[i:end].strip())
-        i = max(end - overlap_chars, end)
-    return [c for c in chunks if c]
 
+STOP_WORDS = {
+    "oraz", "jest", "sie", "nie", "tak", "ale", "czy", "dla", "ten", "taka", "taki",
+    "jak", "jako", "pod", "nad", "juz", "jeszcze", "tylko", "bardzo", "tego", "tej", "tym",
+    "byl", "byla", "bylo", "mam", "moze", "wiec", "yyy", "eee", "hmm", "dobrze", "prosze",
+    "dziekuje", "pan", "pani", "panu", "pana", "pania", "mnie", "wlasnie", "jakby",
+}
 
-def _extract_pdf_text(path: Path) -> str:
+SENTENCE_RE = re.compile(r"\S.*?(?:[.!?\u2026](?=\s)|\n\s*\n|$)", re.DOTALL)
+
+_vocab_cache: Dict[Tuple[str, int], Tuple[int, Dict[str, int]]] = {}
+_result_cache: "OrderedDict[Tuple, List[int]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _iter_units(pages: Iterable[str], max_chars: int) -> Iterator[Tuple[str, int, int, int]]:
+    offset = 0
+    for page_no, page in enumerate(pages, start=1):
+        for match in SENTENCE_RE.finditer(page):
+            text = " ".join(match.group(0).split())
+            start = offset + match.start()
+            while len(text) > max_chars:
+                cut = text.rfind(" ", max_chars // 2, max_chars)
+                cut = cut if cut > 0 else max_chars
+                yield text[:cut], page_no, start, start + cut
+                text = text[cut:].lstrip()
+                start += cut
+            if text:
+                yield text, page_no, start, offset + match.end()
+        offset += len(page) + 1
+
+
+def _iter_chunks(
+    pages: Iterable[str], chunk_chars: int, overlap_chars: int
+) -> Iterator[KnowledgeChunk]:
+    overlap_chars = max(0, min(overlap_chars, chunk_chars // 2))
+    window: List[Tuple[str, int, int, int]] = []
+    size = 0
+    for unit in _iter_units(pages, max(overlap_chars, chunk_chars // 4, 1)):
+        if window and size + len(unit[0]) + 1 > chunk_chars:
+            yield _make_chunk(window)
+            kept: List[Tuple[str, int, int, int]] = []
+            kept_size = 0
+            for prev in reversed(window[1:]):
+                if kept_size + len(prev[0]) + 1 > overlap_chars:
+                    break
+                kept.insert(0, prev)
+                kept_size += len(prev[0]) + 1
+            window, size = kept, kept_size
+        window.append(unit)
+        size += len(unit[0]) + 1
+    if window:
+        yield _make_chunk(window)
+
+
+def _make_chunk(window: List[Tuple[str, int, int, int]]) -> KnowledgeChunk:
+    return KnowledgeChunk(
+        text=" ".join(u[0] for u in window),
+        page=window[0][1],
+        start=window[0][2],
+        end=window[-1][3],
+    )
+
+
+def _iter_pdf_pages(path: Path) -> Iterator[str]:
     from pypdf import PdfReader
 
     reader = PdfReader(str(path))
-    pages = []
     for p in reader.pages:
-        pages.append(p.extract_text() or "")
-    return "\n".join(pages)
+        yield p.extract_text() or ""
+
+
+def _migrate_index(conn: sqlite3.Connection) -> bool:
+    cols = [r[1] for r in conn.execute("PRAGMA table_info(knowledge_fts)")]
+    if not cols or "page" in cols:
+        return False
+    conn.execute("DROP TABLE IF EXISTS knowledge_vocab")
+    conn.execute("DROP TABLE knowledge_fts")
+    conn.execute("DROP TABLE IF EXISTS knowledge_meta")
+    conn.execute("DROP TABLE IF EXISTS knowledge_vectors")
+    conn.commit()
+    return True
 
 
 def ensure_knowledge_index(conn: sqlite3.Connection, cfg_knowledge: Dict[str, str]) -> None:
@@ -32,10 +109,11 @@ def ensure_knowledge_index(conn: sqlite3.Connection, cfg_knowledge: Dict[str, st
     folder = Path(cfg_knowledge.get("folder", "data/knowledge"))
     folder.mkdir(parents=True, exist_ok=True)
 
+    migrated = _migrate_index(conn)
     conn.execute(
         """
         CREATE VIRTUAL TABLE IF NOT EXISTS knowledge_fts
-        USING fts5(source, chunk, content);
+        USING fts5(source, chunk, page UNINDEXED, start_offset UNINDEXED, end_offset UNINDEXED);
         """
     )
     conn.execute(
@@ -46,9 +124,31 @@ def ensure_knowledge_index(conn: sqlite3.Connection, cfg_knowledge: Dict[str, st
         );
         """
     )
+    conn.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS knowledge_vocab USING fts5vocab(knowledge_fts, 'col')"
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS knowledge_state (
+            key TEXT PRIMARY KEY,
+            value INTEGER
+        );
+        """
+    )
+    if migrated:
+        _bump_generation(conn)
     conn.commit()
 
-    for pdf in folder.glob("*.pdf"):
+    pdfs = {pdf.name: pdf for pdf in folder.glob("*.pdf")}
+    for (source,) in conn.execute("SELECT source FROM knowledge_meta").fetchall():
+        if source not in pdfs:
+            conn.execute("DELETE FROM knowledge_fts WHERE source = ?", (source,))
+            conn.execute("DELETE FROM knowledge_meta WHERE source = ?", (source,))
+            delete_source_vectors(conn, source)
+            _bump_generation(conn)
+            conn.commit()
+
+    for pdf in pdfs.values():
         mtime = pdf.stat().st_mtime
         row = conn.execute(
             "SELECT mtime FROM knowledge_meta WHERE source = ?", (pdf.name,)
@@ -56,41 +156,81 @@ def ensure_knowledge_index(conn: sqlite3.Connection, cfg_knowledge: Dict[str, st
         if row and float(row[0]) == mtime:
             continue
 
-        text = _extract_pdf_text(pdf)
-        chunks = _chunk_text(
-            text,
+        conn.execute("DELETE FROM knowledge_fts WHERE source = ?", (pdf.name,))
+        delete_source_vectors(conn, pdf.name)
+        for ch in _iter_chunks(
+            _iter_pdf_pages(pdf),
             int(cfg_knowledge.get("chunk_chars", 1000)),
             int(cfg_knowledge.get("overlap_chars", 150)),
-        )
-        conn.execute("DELETE FROM knowledge_fts WHERE source = ?", (pdf.name,))
-        for ch in chunks:
+        ):
             conn.execute(
-                "INSERT INTO knowledge_fts (source, chunk, content) VALUES (?, ?, ?)",
-                (pdf.name, ch, ch),
+                """
+                INSERT INTO knowledge_fts (source, chunk, page, start_offset, end_offset)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (pdf.name, ch.text, ch.page, ch.start, ch.end),
             )
         conn.execute(
             "INSERT OR REPLACE INTO knowledge_meta (source, mtime) VALUES (?, ?)",
             (pdf.name, mtime),
         )
+        _bump_generation(conn)
         conn.commit()
 
+    if vectors_enabled(cfg_knowledge):
+        sync_vectors(conn, cfg_knowledge, _generation(conn))
 
-def _build_query(text: str) -> str:
-    tokens = re.findall(r"[a-zA-ZąćęłńóśźżĄĆĘŁŃÓŚŹŻ]{3,}", text.lower())
-    stop = {
-        "oraz", "jest", "oraz", "sie", "się", "nie", "tak", "ale", "czy",
-        "dla", "ten", "taka", "taki", "jak", "jako", "na", "do", "od",
-        "o", "w", "z", "że", "to", "co", "po", "za", "pod", "nad",
-    }
-    uniq = []
-    for t in tokens:
-        if t in stop:
+
+def _bump_generation(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        INSERT INTO knowledge_state (key, value) VALUES ('generation', 1)
+        ON CONFLICT(key) DO UPDATE SET value = value + 1
+        """
+    )
+
+
+def _generation(conn: sqlite3.Connection) -> Tuple[str, int]:
+    db_file = conn.execute("PRAGMA database_list").fetchone()[2] or str(id(conn))
+    row = conn.execute("SELECT value FROM knowledge_state WHERE key = 'generation'").fetchone()
+    return db_file, int(row[0]) if row else 0
+
+
+def _normalize(token: str) -> str:
+    return "".join(
+        ch for ch in unicodedata.normalize("NFKD", token.lower()) if not unicodedata.combining(ch)
+    )
+
+
+def _vocabulary(
+    conn: sqlite3.Connection, generation: Tuple[str, int]
+) -> Tuple[int, Dict[str, int]]:
+    with _cache_lock:
+        cached = _vocab_cache.get(generation)
+    if cached is not None:
+        return cached
+    docs = int(conn.execute("SELECT COUNT(1) FROM knowledge_fts").fetchone()[0])
+    df = dict(conn.execute("SELECT term, doc FROM knowledge_vocab WHERE col = 'chunk'").fetchall())
+    with _cache_lock:
+        for key in [k for k in _vocab_cache if k[0] == generation[0]]:
+            del _vocab_cache[key]
+        _vocab_cache[generation] = (docs, df)
+    return docs, df
+
+
+def _build_query(text: str, docs: int, df: Dict[str, int], max_terms: int = 24) -> str:
+    counts = Counter(
+        t for t in (_normalize(w) for w in re.findall(r"\w{3,}", text)) if t not in STOP_WORDS
+    )
+    weighted = []
+    for term, tf in counts.items():
+        n = df.get(term, 0)
+        if not n or term.isdigit():
             continue
-        if t not in uniq:
-            uniq.append(t)
-        if len(uniq) >= 20:
-            break
-    return " OR ".join(uniq)
+        idf = math.log((docs - n + 0.5) / (n + 0.5) + 1.0)
+        weighted.append(((1.0 + math.log(tf)) * idf, term))
+    weighted.sort(reverse=True)
+    return " OR ".join(f'"{term}"' for _, term in weighted[:max_terms])
 
 
 def retrieve_knowledge(
@@ -98,17 +238,110 @@ def retrieve_knowledge(
 ) -> List[str]:
     if not cfg_knowledge or not cfg_knowledge.get("enabled", True):
         return []
-    query = _build_query(transcript)
-    if not query:
+    generation = _generation(conn)
+    docs, df = _vocabulary(conn, generation)
+    if not docs:
         return []
     top_k = int(cfg_knowledge.get("top_k", 3))
+    vectors = vectors_enabled(cfg_knowledge)
+    candidates = max(top_k, int(cfg_knowledge.get("fusion_candidates", 20)))
+
+    query = _build_query(transcript, docs, df, int(cfg_knowledge.get("query_terms", 24)))
+    ranked = _bm25_rowids(conn, cfg_knowledge, generation, query, candidates) if query else []
+    if vectors:
+        dense = vector_search(conn, cfg_knowledge, transcript, generation, candidates)
+        ranked = reciprocal_rank_fusion(
+            [ranked, dense], int(cfg_knowledge.get("rrf_k", 60))
+        )
+    if not ranked:
+        return []
+
+    marks = ", ".join("?" for _ in ranked)
+    rows = {
+        r[0]: (r[1], KnowledgeChunk(text=r[2], page=int(r[3] or 0), start=r[4], end=r[5]))
+        for r in conn.execute(
+            f"""
+            SELECT rowid, source, chunk, page, start_offset, end_offset
+            FROM knowledge_fts WHERE rowid IN ({marks})
+            """,
+            ranked,
+        )
+    }
+    hits = _merge_hits([rows[i] for i in ranked if i in rows], top_k)
+    return [f"[{source} s.{chunk.page}] {chunk.text}" for source, chunk in hits]
+
+
+def _merge_hits(
+    hits: List[Tuple[str, KnowledgeChunk]], top_k: int
+) -> List[Tuple[str, KnowledgeChunk]]:
+    kept: List[Tuple[str, KnowledgeChunk]] = []
+    seen_text = set()
+    for source, chunk in hits:
+        key = " ".join(chunk.text.lower().split())
+        if key in seen_text:
+            continue
+        for i, (kept_source, kept_chunk) in enumerate(kept):
+            overlaps = chunk.start <= kept_chunk.end and kept_chunk.start <= chunk.end
+            if kept_source == source and overlaps:
+                kept[i] = (source, _join_chunks(kept_chunk, chunk))
+                break
+        else:
+            if len(kept) >= top_k:
+                continue
+            kept.append((source, chunk))
+        seen_text.add(key)
+    return kept
+
+
+def _join_chunks(a: KnowledgeChunk, b: KnowledgeChunk) -> KnowledgeChunk:
+    if b.start < a.start:
+        a, b = b, a
+    if b.end <= a.end:
+        return a
+    return KnowledgeChunk(
+        text=_join_overlapping(a.text, b.text), page=a.page, start=a.start, end=b.end
+    )
+
+
+def _join_overlapping(left: str, right: str) -> str:
+    head = right.split(" ", 1)[0]
+    idx = left.find(head) if head else -1
+    while idx != -1:
+        if (idx == 0 or left[idx - 1] == " ") and right.startswith(left[idx:]):
+            return left + right[len(left) - idx :]
+        idx = left.find(head, idx + 1)
+    return left + " " + right
+
+
+def _bm25_rowids(
+    conn: sqlite3.Connection,
+    cfg_knowledge: Dict[str, str],
+    generation: Tuple[str, int],
+    query: str,
+    limit: int,
+) -> List[int]:
+    key = (generation, query, limit)
+    with _cache_lock:
+        if key in _result_cache:
+            _result_cache.move_to_end(key)
+            incr("knowledge_cache_hits")
+            return list(_result_cache[key])
+    incr("knowledge_cache_misses")
+
     cur = conn.execute(
         """
-        SELECT source, chunk
+        SELECT rowid
         FROM knowledge_fts
         WHERE knowledge_fts MATCH ?
+        ORDER BY bm25(knowledge_fts, 0.0, 1.0)
         LIMIT ?
         """,
-        (query, top_k),
+        (query, limit),
     )
-    return [f"[{r[0]}] {r[1]}" for r in cur.fetchall()]
+    rowids = [r[0] for r in cur.fetchall()]
+
+    with _cache_lock:
+        _result_cache[key] = rowids
+        while len(_result_cache) > int(cfg_knowledge.get("cache_size", 256)):
+            _result_cache.popitem(last=False)
+    return list(rowids)
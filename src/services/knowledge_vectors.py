@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import logging
+import re
+import sqlite3
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from src.core.utils import fold_text
+
+
+logger = logging.getLogger(__name__)
+
+NGRAM_MIN = 3
+NGRAM_MAX = 5
+HASH_PRIME = 1000003
+DEFAULT_DIM = 1024
+WORD_RE = re.compile(r"\w+")
+
+_matrices: Dict[Tuple[str, int], Tuple[object, object, object]] = {}
+_matrices_lock = threading.Lock()
+_sync_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        logger.warning("numpy not installed, knowledge vectors disabled")
+        return None
+    return numpy
+
+
+def vectors_enabled(cfg_knowledge: Dict[str, str]) -> bool:
+    return bool(cfg_knowledge.get("vectors", False)) and _numpy() is not None
+
+
+def embed(text: str, dim: int):
+    np = _numpy()
+    folded = " " + " ".join(WORD_RE.findall(fold_text(text))) + " "
+    codes = np.frombuffer(folded.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    counts = np.zeros(dim, dtype=np.float64)
+    for n in range(NGRAM_MIN, NGRAM_MAX + 1):
+        size = len(codes) - n + 1
+        if size <= 0:
+            break
+        h = np.zeros(size, dtype=np.uint64)
+        for j in range(n):
+            h = h * np.uint64(HASH_PRIME) + codes[j : j + size]
+        h ^= h >> np.uint64(29)
+        counts += np.bincount((h % np.uint64(dim)).astype(np.int64), minlength=dim)
+    return np.log1p(counts).astype(np.float32)
+
+
+def delete_source_vectors(conn: sqlite3.Connection, source: str) -> None:
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'knowledge_vectors'"
+    ).fetchone()
+    if exists:
+        conn.execute("DELETE FROM knowledge_vectors WHERE source = ?", (source,))
+
+
+def sync_vectors(
+    conn: sqlite3.Connection, cfg_knowledge: Dict[str, str], generation: Tuple[str, int]
+) -> None:
+    with _sync_lock:
+        _sync_vectors(conn, cfg_knowledge, generation)
+
+
+def _sync_vectors(
+    conn: sqlite3.Connection, cfg_knowledge: Dict[str, str], generation: Tuple[str, int]
+) -> None:
+    np = _numpy()
+    dim = int(cfg_knowledge.get("vector_dim", DEFAULT_DIM))
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS knowledge_vectors (
+            fts_rowid INTEGER PRIMARY KEY,
+            source TEXT,
+            vec BLOB
+        );
+        """
+    )
+    if _state(conn, "vector_dim") != dim:
+        conn.execute("DELETE FROM knowledge_vectors")
+        _set_state(conn, "vector_dim", dim)
+        _set_state(conn, "vector_generation", -1)
+    if _state(conn, "vector_generation") == generation[1] and _matrix_path(
+        conn, generation[1]
+    ).exists():
+        conn.commit()
+        return
+
+    conn.execute(
+        "DELETE FROM knowledge_vectors WHERE fts_rowid NOT IN (SELECT rowid FROM knowledge_fts)"
+    )
+    missing = conn.execute(
+        """
+        SELECT rowid, source, chunk FROM knowledge_fts
+        WHERE rowid NOT IN (SELECT fts_rowid FROM knowledge_vectors)
+        """
+    ).fetchall()
+    for rowid, source, chunk in missing:
+        conn.execute(
+            "INSERT INTO knowledge_vectors (fts_rowid, source, vec) VALUES (?, ?, ?)",
+            (rowid, source, embed(chunk or "", dim).astype(np.float16).tobytes()),
+        )
+    if missing:
+        logger.info("Embedded %d knowledge chunks", len(missing))
+
+    _assemble(conn, dim, generation[1])
+    _set_state(conn, "vector_generation", generation[1])
+    conn.commit()
+
+
+def _assemble(conn: sqlite3.Connection, dim: int, generation: int) -> None:
+    np = _numpy()
+    rows = conn.execute(
+        "SELECT fts_rowid, vec FROM knowledge_vectors ORDER BY fts_rowid"
+    ).fetchall()
+    ids = np.array([r[0] for r in rows], dtype=np.int64)
+    if rows:
+        tf = np.frombuffer(b"".join(r[1] for r in rows), dtype=np.float16)
+        tf = tf.reshape(len(rows), dim).astype(np.float32)
+    else:
+        tf = np.zeros((0, dim), dtype=np.float32)
+    df = np.count_nonzero(tf, axis=0)
+    idf = (np.log((1.0 + len(rows)) / (1.0 + df)) + 1.0).astype(np.float32)
+    matrix = tf * idf
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix /= np.where(norms == 0, 1.0, norms)
+
+    path = _matrix_path(conn, generation)
+    np.save(path.with_suffix(".ids.npy"), ids)
+    np.save(path.with_suffix(".idf.npy"), idf)
+    np.save(path, matrix)
+    for old in path.parent.glob("knowledge_vectors.g*.npy"):
+        if old.name.split(".")[1] != f"g{generation}":
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+
+def vector_search(
+    conn: sqlite3.Connection,
+    cfg_knowledge: Dict[str, str],
+    transcript: str,
+    generation: Tuple[str, int],
+    limit: int,
+) -> List[int]:
+    loaded = _load(conn, generation)
+    if loaded is None:
+        return []
+    np = _numpy()
+    matrix, ids, idf = loaded
+    if not len(ids):
+        return []
+    query = embed(transcript, matrix.shape[1]) * idf
+    norm = float(np.linalg.norm(query))
+    if not norm:
+        return []
+    scores = matrix @ (query / norm)
+    limit = min(limit, len(ids))
+    top = np.argpartition(-scores, limit - 1)[:limit]
+    top = top[np.argsort(-scores[top])]
+    min_sim = float(cfg_knowledge.get("vector_min_similarity", 0.0))
+    return [int(ids[i]) for i in top if scores[i] > min_sim]
+
+
+def _load(conn: sqlite3.Connection, generation: Tuple[str, int]) -> Optional[tuple]:
+    with _matrices_lock:
+        cached = _matrices.get(generation)
+        if cached is not None:
+            return cached
+        path = _matrix_path(conn, generation[1])
+        if not path.exists():
+            return None
+        np = _numpy()
+        loaded = (
+            np.load(path, mmap_mode="r"),
+            np.load(path.with_suffix(".ids.npy")),
+            np.load(path.with_suffix(".idf.npy")),
+        )
+        for key in [k for k in _matrices if k[0] == generation[0]]:
+            del _matrices[key]
+        _matrices[generation] = loaded
+        return loaded
+
+
+def _matrix_path(conn: sqlite3.Connection, generation: int) -> Path:
+    db_file = conn.execute("PRAGMA database_list").fetchone()[2]
+    folder = Path(db_file).parent if db_file else Path(".")
+    return folder / f"knowledge_vectors.g{generation}.npy"
+
+
+def _state(conn: sqlite3.Connection, key: str) -> Optional[int]:
+    row = conn.execute("SELECT value FROM knowledge_state WHERE key = ?", (key,)).fetchone()
+    return int(row[0]) if row else None
+
+
+def _set_state(conn: sqlite3.Connection, key: str, value: int) -> None:
+    conn.execute(
+        "INSERT OR REPLACE INTO knowledge_state (key, value) VALUES (?, ?)", (key, value)
+    )
+
+
+def reciprocal_rank_fusion(rankings: List[List[int]], k: int = 60) -> List[int]:
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=lambda item: -scores[item])
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from openai import OpenAI
+
+from src.services.rate_limit import RateLimiter, get_limiter
+from src.services.resilience import (
+    SERVER,
+    TRANSPORT,
+    CircuitBreaker,
+    CircuitOpenError,
+    classify_error,
+    get_breaker,
+)
+
+
+logger = logging.getLogger(__name__)
+
+CONNECTION_KEYS = (
+    "base_url",
+    "api_key_env",
+    "model",
+    "weight",
+    "requests_per_minute",
+    "tokens_per_minute",
+)
+
+_pools: Dict[str, "EndpointPool"] = {}
+_pools_lock = threading.Lock()
+
+
+def client_for_provider(cfg_scoring: Dict[str, str]) -> OpenAI:
+    provider = (cfg_scoring.get("provider") or "openai").lower()
+    timeout = float(cfg_scoring.get("timeout_sec", 120))
+    if provider == "lmstudio":
+        base_url = cfg_scoring.get("base_url") or "http://localhost:1234/v1"
+        api_key = os.getenv(cfg_scoring.get("api_key_env") or "LM_STUDIO_API_KEY", "lmstudio")
+        return OpenAI(base_url=base_url, api_key=api_key, max_retries=0, timeout=timeout)
+    if cfg_scoring.get("base_url") or cfg_scoring.get("api_key_env"):
+        return OpenAI(
+            base_url=cfg_scoring.get("base_url") or None,
+            api_key=os.getenv(cfg_scoring.get("api_key_env") or "OPENAI_API_KEY"),
+            max_retries=0,
+            timeout=timeout,
+        )
+    return OpenAI(max_retries=0, timeout=timeout)
+
+
+def _endpoint_key(cfg_scoring: Dict[str, str]) -> str:
+    provider = (cfg_scoring.get("provider") or "openai").lower()
+    if provider == "lmstudio":
+        server = cfg_scoring.get("base_url") or "http://localhost:1234/v1"
+    else:
+        server = cfg_scoring.get("base_url") or provider
+    model = cfg_scoring.get("model")
+    return f"{server}#{model}" if model else server
+
+
+def derived_scoring_cfg(
+    cfg_scoring: Dict[str, str], overrides: Dict[str, str]
+) -> Dict[str, str]:
+    derived = {k: v for k, v in cfg_scoring.items() if k not in ("endpoints", "cascade")}
+    current = (derived.get("provider") or "openai").lower()
+    provider = (overrides.get("provider") or current).lower()
+    if provider != current:
+        for key in CONNECTION_KEYS:
+            derived.pop(key, None)
+    derived.update({k: v for k, v in overrides.items() if v not in (None, "")})
+    derived["provider"] = provider
+    return derived
+
+
+class Endpoint:
+    def __init__(self, cfg: Dict[str, str]) -> None:
+        self.cfg = cfg
+        self.key = _endpoint_key(cfg)
+        self.provider = (cfg.get("provider") or "openai").lower()
+        self.weight = max(0.001, float(cfg.get("weight", 1.0)))
+        self.client = client_for_provider(cfg)
+        self.breaker: CircuitBreaker = get_breaker(self.key, cfg)
+        self.limiter: Optional[RateLimiter] = get_limiter(self.key, cfg)
+        self.outstanding = 0
+        self.probing = False
+
+
+class EndpointPool:
+    def __init__(self, endpoints: List[Endpoint], max_wait_sec: float = 0.0) -> None:
+        self.endpoints = endpoints
+        self.max_wait_sec = max_wait_sec
+        self._cond = threading.Condition()
+
+    def acquire(self) -> Endpoint:
+        deadline = time.monotonic() + self.max_wait_sec if self.max_wait_sec else None
+        while True:
+            with self._cond:
+                due = [e for e in self.endpoints if not e.probing and e.breaker.probe_due()]
+                ready = [e for e in self.endpoints if e.breaker.state == CircuitBreaker.CLOSED]
+                if due:
+                    probe = due[0]
+                    probe.probing = True
+                elif ready:
+                    endpoint = min(ready, key=lambda e: (e.outstanding + 1) / e.weight)
+                    endpoint.outstanding += 1
+                    return endpoint
+                else:
+                    now = time.monotonic()
+                    if deadline is not None and now >= deadline:
+                        raise CircuitOpenError("All scoring endpoints unavailable")
+                    wait = min(e.breaker.retry_in() for e in self.endpoints)
+                    if deadline is not None:
+                        wait = min(wait, deadline - now)
+                    self._cond.wait(max(0.05, wait))
+                    continue
+
+            self._health_check(probe)
+            with self._cond:
+                probe.probing = False
+                self._cond.notify_all()
+
+    def release(self, endpoint: Endpoint, exc: Optional[Exception]) -> None:
+        if exc is not None and classify_error(exc) in (TRANSPORT, SERVER):
+            endpoint.breaker.record_failure()
+        else:
+            endpoint.breaker.record_success()
+        with self._cond:
+            endpoint.outstanding -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def lease(self) -> Iterator[Endpoint]:
+        endpoint = self.acquire()
+        try:
+            yield endpoint
+        except Exception as exc:
+            self.release(endpoint, exc)
+            raise
+        self.release(endpoint, None)
+
+    def _health_check(self, endpoint: Endpoint) -> None:
+        endpoint.breaker.begin_probe()
+        try:
+            endpoint.client.models.list()
+        except Exception as exc:
+            logger.warning("Endpoint %s failed health check: %s", endpoint.key, exc)
+            endpoint.breaker.record_failure()
+            return
+        logger.info("Endpoint %s reinstated", endpoint.key)
+        endpoint.breaker.record_success()
+
+
+def endpoint_configs(cfg_scoring: Dict[str, str]) -> List[Dict[str, str]]:
+    base = {k: v for k, v in cfg_scoring.items() if k != "endpoints"}
+    endpoints = cfg_scoring.get("endpoints") or []
+    if not endpoints:
+        return [base]
+    return [derived_scoring_cfg(base, ep) for ep in endpoints]
+
+
+def get_pool(cfg_scoring: Dict[str, str]) -> EndpointPool:
+    configs = endpoint_configs(cfg_scoring)
+    key = json.dumps(configs, sort_keys=True, default=str)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = EndpointPool(
+                [Endpoint(c) for c in configs],
+                max_wait_sec=float(cfg_scoring.get("breaker_max_wait_sec", 0)),
+            )
+            _pools[key] = pool
+        return pool
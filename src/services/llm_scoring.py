@@ -1,66 +1,64 @@
 from __future__ import annotations
 
 import json
-import os
 import re
-import time
-from typing import Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Mapping, Optional
 
 from openai import OpenAI
 
+from src.services.cassettes import active_cassettes
+from src.services.llm_pool import get_pool
+from src.services.metrics import incr, propagate
+from src.services.prompt_builder import Prompt, count_tokens, get_prompt_builder
+from src.services.resilience import RetryError, RetryPolicy, call_with_retry
 
-SYSTEM_PROMPT = """
-Jestes audytorem rozmow telefonicznych. Ocen rozmowe na podstawie transkrypcji.
-Dla kazdej kategorii podaj ocene w skali 0.0-1.0.
-Kategorie: Otwarcie, Merytoryka, Proces, Jezyk, Domkniecie, Technika.
-Wynik ma byc obiektywny i ostrozny. Jesli brak dowodu w transkrypcji, ocen nisko.
-Zwroc JSON:
-{
-  "scores": { "Kryterium": 0.0-1.0, ... },
-  "evidence": { "Kryterium": "krotki cytat z transkrypcji" }
-}
-Jesli brak dowodu, evidence ustaw na pusty string.
-Evidence musi byc doslownym cytatem z transkrypcji (krotki fragment).
-""".strip()
 
+MIN_WINDOW_TOKENS = 256
+WINDOW_MARGIN = 0.85
 
-def _schema() -> Dict:
+
+def _schema(criteria: list[dict]) -> Dict:
+    return _schema_for(tuple(c["name"] for c in criteria))
+
+
+@lru_cache(maxsize=32)
+def _schema_for(names: tuple[str, ...]) -> Dict:
     return {
         "type": "object",
         "properties": {
             "scores": {
                 "type": "object",
-                "properties": {
-                    "Otwarcie": {"type": "number"},
-                    "Merytoryka": {"type": "number"},
-                    "Proces": {"type": "number"},
-                    "Jezyk": {"type": "number"},
-                    "Domkniecie": {"type": "number"},
-                    "Technika": {"type": "number"},
-                },
-                "required": [
-                    "Otwarcie",
-                    "Merytoryka",
-                    "Proces",
-                    "Jezyk",
-                    "Domkniecie",
-                    "Technika",
-                ],
+                "properties": {n: {"type": "number"} for n in names},
+                "required": list(names),
                 "additionalProperties": False,
-            }
+            },
+            "evidence": {
+                "type": "object",
+                "properties": {n: {"type": "string"} for n in names},
+                "required": list(names),
+                "additionalProperties": False,
+            },
         },
-        "required": ["scores"],
+        "required": ["scores", "evidence"],
         "additionalProperties": False,
     }
 
 
-def _client_for_provider(cfg_scoring: Dict[str, str]) -> OpenAI:
-    provider = (cfg_scoring.get("provider") or "openai").lower()
-    if provider == "lmstudio":
-        base_url = cfg_scoring.get("base_url") or "http://localhost:1234/v1"
-        api_key = os.getenv("LM_STUDIO_API_KEY", "lmstudio")
-        return OpenAI(base_url=base_url, api_key=api_key)
-    return OpenAI()
+def _response_format(cfg_scoring: Dict[str, str], criteria: list[dict]) -> Dict:
+    if not cfg_scoring.get("structured_output", True):
+        return {}
+    return {
+        "response_format": {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "call_scoring",
+                "schema": _schema(criteria),
+                "strict": True,
+            },
+        }
+    }
 
 
 def _extract_json(text: str) -> Optional[str]:
@@ -78,103 +76,266 @@ def _normalize_scores(payload: Dict, criteria: list[dict]) -> Dict[str, float]:
         scores = {k: payload.get(k, 0.0) for k in names if k in payload}
         if not scores:
             raise KeyError("scores")
+    normalized = {}
     for k in names:
-        scores.setdefault(k, 0.0)
-    return scores
+        try:
+            normalized[k] = min(1.0, max(0.0, float(scores.get(k, 0.0) or 0.0)))
+        except (TypeError, ValueError) as exc:
+            raise ValueError(f"Invalid score for {k}: {scores.get(k)!r}") from exc
+    return normalized
 
 
 def _normalize_evidence(payload: Dict, criteria: list[dict]) -> Dict[str, str]:
     names = [c["name"] for c in criteria]
     ev = payload.get("evidence", {}) if isinstance(payload.get("evidence", {}), dict) else {}
-    if not ev:
-        ev = {k: "" for k in names}
-    for k in names:
-        ev.setdefault(k, "")
-    return ev
+    return {k: str(ev.get(k) or "") for k in names}
+
+
+def parse_scoring_response(
+    raw: str, criteria: list[dict]
+) -> tuple[Dict[str, float], Dict[str, str]]:
+    payload = _parse_payload(raw)
+    return _normalize_scores(payload, criteria), _normalize_evidence(payload, criteria)
+
+
+def chat_request_bodies(
+    transcript: str, cfg_scoring: Dict[str, str], criteria: list[dict], knowledge_ctx: list[str]
+) -> List[Dict]:
+    builder = get_prompt_builder(cfg_scoring, criteria)
+    return [
+        _chat_body(cfg_scoring, criteria, builder.build(window, knowledge_ctx))
+        for window in transcript_windows(transcript, cfg_scoring, criteria, knowledge_ctx)
+    ]
 
 
 def score_transcript(
     transcript: str, cfg_scoring: Dict[str, str], criteria: list[dict], knowledge_ctx: list[str]
 ) -> tuple[Dict[str, float], Dict[str, str]]:
-    client = _client_for_provider(cfg_scoring)
-    provider = (cfg_scoring.get("provider") or "openai").lower()
+    windows = transcript_windows(transcript, cfg_scoring, criteria, knowledge_ctx)
+    if len(windows) == 1:
+        return _score_single(windows[0], cfg_scoring, criteria, knowledge_ctx)
+    return _score_chunked(windows, cfg_scoring, criteria, knowledge_ctx)
+
 
-    max_chars = int(cfg_scoring.get("max_transcript_chars", 20000))
-    if len(transcript) > max_chars:
-        transcript = transcript[:max_chars]
+def transcript_windows(
+    transcript: str, cfg_scoring: Dict[str, str], criteria: list[dict], knowledge_ctx: list[str]
+) -> List[str]:
+    window_chars = int(cfg_scoring.get("chunk_chars", 0) or 0)
+    max_chars = int(cfg_scoring.get("max_transcript_chars", 20000) or 0)
+    if max_chars and (not window_chars or window_chars > max_chars):
+        window_chars = max_chars
+    if not window_chars or len(transcript) <= window_chars:
+        window_chars = _token_window_chars(transcript, cfg_scoring, criteria, knowledge_ctx)
+    if not window_chars:
+        return [transcript]
+    windows = _split_windows(
+        transcript, window_chars, int(cfg_scoring.get("chunk_overlap_chars", 500))
+    )
+    n = len(windows)
+    if n <= 1:
+        return windows or [transcript]
+    return [f"[Fragment {i + 1}/{n} rozmowy]\n{w}" for i, w in enumerate(windows)]
 
-    max_retries = int(cfg_scoring.get("max_retries", 2))
-    retry_sleep = float(cfg_scoring.get("retry_sleep_sec", 1))
-    last_error: Optional[Exception] = None
 
-    for attempt in range(max_retries + 1):
-        try:
-            criteria_txt = "\n".join(
-                [f"- {c['name']}: {c.get('description','')}".strip() for c in criteria]
+def _token_window_chars(
+    transcript: str, cfg_scoring: Dict[str, str], criteria: list[dict], knowledge_ctx: list[str]
+) -> int:
+    builder = get_prompt_builder(cfg_scoring, criteria)
+    _, budget = builder.transcript_budget(knowledge_ctx)
+    if budget is None or budget <= MIN_WINDOW_TOKENS:
+        return 0
+    tokens = count_tokens(transcript, builder.model)
+    if tokens <= budget:
+        return 0
+    return int(len(transcript) * budget / tokens * WINDOW_MARGIN)
+
+
+def _score_chunked(
+    windows: List[str],
+    cfg_scoring: Dict[str, str],
+    criteria: list[dict],
+    knowledge_ctx: list[str],
+) -> tuple[Dict[str, float], Dict[str, str]]:
+    workers = max(1, min(int(cfg_scoring.get("chunk_workers", 4)), len(windows)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        parts = list(
+            pool.map(
+                propagate(
+                    lambda window: _score_single(window, cfg_scoring, criteria, knowledge_ctx)
+                ),
+                windows,
             )
-            knowledge_txt = "\n".join(knowledge_ctx) if knowledge_ctx else ""
-
-            sys_prompt = SYSTEM_PROMPT + "\nKryteria:\n" + criteria_txt
-            if knowledge_txt:
-                sys_prompt += "\n\nBaza wiedzy (uzyj do weryfikacji prawdy):\n" + knowledge_txt
-
-            if provider == "lmstudio":
-                response = client.chat.completions.create(
-                    model=cfg_scoring["model"],
-                    messages=[
-                        {"role": "system", "content": sys_prompt},
-                        {"role": "user", "content": transcript},
-                    ],
-                    temperature=float(cfg_scoring.get("temperature", 0.0)),
-                    max_tokens=int(cfg_scoring.get("max_output_tokens", 400)),
-                )
-                raw = response.choices[0].message.content or ""
-            else:
-                response = client.responses.create(
-                    model=cfg_scoring["model"],
-                    input=[
-                        {
-                            "role": "system",
-                            "content": [
-                                {"type": "input_text", "text": sys_prompt},
-                            ],
-                        },
-                        {
-                            "role": "user",
-                            "content": [
-                                {"type": "input_text", "text": transcript},
-                            ],
-                        },
-                    ],
-                    temperature=float(cfg_scoring.get("temperature", 0.0)),
-                    max_output_tokens=int(cfg_scoring.get("max_output_tokens", 400)),
-                    text={
-                        "format": {
-                            "type": "json_schema",
-                            "name": "call_scoring",
-                            "schema": _schema(),
-                            "strict": True,
-                        }
-                    },
-                )
-                raw = response.output_text
-
-            try:
-                payload = json.loads(raw)
-            except json.JSONDecodeError:
-                recovered = _extract_json(raw)
-                if not recovered:
-                    raise
-                payload = json.loads(recovered)
-
-            scores = _normalize_scores(payload, criteria)
-            evidence = _normalize_evidence(payload, criteria)
-            return scores, evidence
-        except Exception as exc:
-            last_error = exc
-            if attempt < max_retries:
-                time.sleep(retry_sleep)
-                continue
+        )
+    return reduce_windows(parts, criteria, cfg_scoring)
+
+
+def _split_windows(text: str, size: int, overlap: int) -> List[str]:
+    overlap = max(0, min(overlap, size // 2))
+    windows = []
+    start = 0
+    while True:
+        end = min(len(text), start + size)
+        if end < len(text):
+            cut = text.rfind(" ", start + size // 2, end)
+            if cut > start:
+                end = cut
+        windows.append(text[start:end].strip())
+        if end >= len(text):
             break
+        next_start = max(end - overlap, start + 1)
+        space = text.find(" ", next_start, end)
+        start = space + 1 if space != -1 else next_start
+    return [w for w in windows if w]
+
+
+def reduce_windows(
+    parts: List[tuple[Dict[str, float], Dict[str, str]]],
+    criteria: list[dict],
+    cfg_scoring: Dict[str, str],
+) -> tuple[Dict[str, float], Dict[str, str]]:
+    default = str(cfg_scoring.get("chunk_reduce", "max")).lower()
+    overrides = cfg_scoring.get("chunk_reduce_overrides") or {}
+    scores: Dict[str, float] = {}
+    evidence: Dict[str, str] = {}
+
+    for c in criteria:
+        name = c["name"]
+        strategy = str(overrides.get(name, default)).lower()
+        values = [float(p[0].get(name, 0.0) or 0.0) for p in parts]
+        quotes = [p[1].get(name, "") or "" for p in parts]
+
+        if strategy == "first":
+            pick = 0
+        elif strategy == "last":
+            pick = len(parts) - 1
+        elif strategy == "min":
+            pick = min(range(len(values)), key=lambda i: values[i])
+        else:
+            pick = max(range(len(values)), key=lambda i: values[i])
+
+        if strategy == "mean":
+            scores[name] = sum(values) / len(values)
+            with_quote = [i for i in range(len(values)) if quotes[i]]
+            if with_quote:
+                pick = max(with_quote, key=lambda i: values[i])
+        else:
+            scores[name] = values[pick]
+        evidence[name] = quotes[pick]
+
+    return scores, evidence
+
+
+def _score_single(
+    transcript: str, cfg_scoring: Dict[str, str], criteria: list[dict], knowledge_ctx: list[str]
+) -> tuple[Dict[str, float], Dict[str, str]]:
+    pool = get_pool(cfg_scoring)
+    policy = RetryPolicy.from_cfg(cfg_scoring)
+    prompts: Dict[str, Prompt] = {}
+
+    def attempt() -> tuple[Dict[str, float], Dict[str, str]]:
+        with pool.lease() as endpoint:
+            cfg = endpoint.cfg
+            prompt = prompts.get(endpoint.key)
+            if prompt is None:
+                prompt = get_prompt_builder(cfg, criteria).build(transcript, knowledge_ctx)
+                prompts[endpoint.key] = prompt
+            estimated = prompt.input_tokens + int(cfg.get("max_output_tokens", 400))
+
+            def live() -> tuple[str, Mapping[str, str], Optional[int]]:
+                if endpoint.limiter:
+                    endpoint.limiter.acquire(estimated)
+                try:
+                    response = _request(endpoint.client, endpoint.provider, cfg, criteria, prompt)
+                except Exception:
+                    if endpoint.limiter:
+                        endpoint.limiter.settle(estimated, 0)
+                    raise
+                if endpoint.limiter:
+                    endpoint.limiter.update_from_headers(response[1])
+                    endpoint.limiter.settle(estimated, response[2])
+                return response
+
+            cassettes = active_cassettes()
+            if cassettes is None:
+                raw, _, used = live()
+            else:
+                raw, _, used = cassettes.llm(endpoint.provider, cfg["model"], prompt, live)
+            incr("llm_requests")
+            if used:
+                incr("llm_tokens", used)
+            return parse_scoring_response(raw, criteria)
+
+    try:
+        return call_with_retry(attempt, policy, label="LLM scoring")
+    except RetryError as exc:
+        raise RuntimeError(
+            f"LLM scoring failed after {exc.attempts} attempts: {exc.last_error}"
+        ) from exc.last_error
+
+
+def _request(
+    client: OpenAI, provider: str, cfg_scoring: Dict[str, str], criteria: list[dict], prompt: Prompt
+) -> tuple[str, Mapping[str, str], Optional[int]]:
+    if provider == "lmstudio":
+        raw_response = client.chat.completions.with_raw_response.create(
+            **_chat_body(cfg_scoring, criteria, prompt)
+        )
+        response = raw_response.parse()
+        usage = getattr(response, "usage", None)
+        used = getattr(usage, "total_tokens", None) if usage else None
+        return response.choices[0].message.content or "", raw_response.headers, used
+
+    raw_response = client.responses.with_raw_response.create(
+        model=cfg_scoring["model"],
+        input=[
+            {
+                "role": "system",
+                "content": [
+                    {"type": "input_text", "text": prompt.system},
+                ],
+            },
+            {
+                "role": "user",
+                "content": [
+                    {"type": "input_text", "text": prompt.user},
+                ],
+            },
+        ],
+        temperature=float(cfg_scoring.get("temperature", 0.0)),
+        max_output_tokens=int(cfg_scoring.get("max_output_tokens", 400)),
+        text={
+            "format": {
+                "type": "json_schema",
+                "name": "call_scoring",
+                "schema": _schema(criteria),
+                "strict": True,
+            }
+        },
+    )
+    response = raw_response.parse()
+    usage = getattr(response, "usage", None)
+    used = getattr(usage, "total_tokens", None) if usage else None
+    return response.output_text, raw_response.headers, used
+
+
+def _chat_body(cfg_scoring: Dict[str, str], criteria: list[dict], prompt: Prompt) -> Dict:
+    return {
+        "model": cfg_scoring["model"],
+        "messages": [
+            {"role": "system", "content": prompt.system},
+            {"role": "user", "content": prompt.user},
+        ],
+        "temperature": float(cfg_scoring.get("temperature", 0.0)),
+        "max_tokens": int(cfg_scoring.get("max_output_tokens", 400)),
+        **_response_format(cfg_scoring, criteria),
+    }
+
 
-    raise RuntimeError(f"LLM scoring failed after {max_retries + 1} attempts: {last_error}")
+def _parse_payload(raw: str) -> Dict:
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError:
+        recovered = _extract_json(raw)
+        if not recovered:
+            raise
+        return json.loads(recovered)
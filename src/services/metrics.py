@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional, TypeVar
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+
+class FileMetrics:
+    def __init__(self, file_name: str) -> None:
+        self.file_name = file_name
+        self.file_hash = ""
+        self.started = time.perf_counter()
+        self.stages: Dict[str, List[float]] = {}
+        self.counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        with self._lock:
+            entry = self.stages.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def add_counter(self, name: str, value: float) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0.0) + value
+
+
+class Histogram:
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        idx = len(BUCKETS)
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                idx = i
+                break
+        self.counts[idx] += 1
+        self.total += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(BUCKETS[i], self.max) if i < len(BUCKETS) else self.max
+        return self.max
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage_name: str, seconds: float) -> None:
+        with self._lock:
+            hist = self.histograms.get(stage_name)
+            if hist is None:
+                hist = Histogram()
+                self.histograms[stage_name] = hist
+            hist.observe(seconds)
+
+    def incr(self, name: str, value: float = 1.0) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0.0) + value
+
+    def reset(self) -> None:
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            stages = {
+                name: {
+                    "count": h.count,
+                    "sum": round(h.total, 6),
+                    "max": round(h.max, 6),
+                    "p50": h.quantile(0.5),
+                    "p95": h.quantile(0.95),
+                    "buckets": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], h.counts)),
+                }
+                for name, h in self.histograms.items()
+            }
+            return {"stages": stages, "counters": dict(self.counters)}
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            lines = [
+                "# HELP ocena_stage_seconds Time spent per pipeline stage.",
+                "# TYPE ocena_stage_seconds histogram",
+            ]
+            for name, h in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, n in zip([str(b) for b in BUCKETS] + ["+Inf"], h.counts):
+                    cumulative += n
+                    lines.append(
+                        f'ocena_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}'
+                    )
+                lines.append(f'ocena_stage_seconds_sum{{stage="{name}"}} {h.total:.6f}')
+                lines.append(f'ocena_stage_seconds_count{{stage="{name}"}} {h.count}')
+            lines.append("# HELP ocena_events_total Pipeline event counters.")
+            lines.append("# TYPE ocena_events_total counter")
+            for name, value in sorted(self.counters.items()):
+                lines.append(f'ocena_events_total{{name="{name}"}} {value:g}')
+            return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        snap = self.snapshot()
+        lines = [f"{'stage':<20}{'count':>8}{'total s':>11}{'mean s':>10}{'p95 s':>9}{'max s':>9}"]
+        for name, s in sorted(snap["stages"].items(), key=lambda kv: -kv[1]["sum"]):
+            mean = s["sum"] / s["count"] if s["count"] else 0.0
+            lines.append(
+                f"{name:<20}{s['count']:>8}{s['sum']:>11.2f}{mean:>10.3f}"
+                f"{s['p95']:>9.3f}{s['max']:>9.3f}"
+            )
+        for name, value in sorted(snap["counters"].items()):
+            lines.append(f"{name:<20}{value:>8g}")
+        return "\n".join(lines)
+
+
+REGISTRY = MetricsRegistry()
+
+_current_file: ContextVar[Optional[FileMetrics]] = ContextVar("current_file", default=None)
+_current_stage: ContextVar[str] = ContextVar("current_stage", default="")
+
+
+def current_file() -> Optional[FileMetrics]:
+    return _current_file.get()
+
+
+def current_stage() -> str:
+    return _current_stage.get()
+
+
+def log_context() -> Dict[str, str]:
+    fm = _current_file.get()
+    return {
+        "file_hash": fm.file_hash if fm is not None else "",
+        "file_name": fm.file_name if fm is not None else "",
+        "stage": _current_stage.get(),
+    }
+
+
+@contextmanager
+def track_file(file_name: str) -> Iterator[FileMetrics]:
+    fm = FileMetrics(file_name)
+    token = _current_file.set(fm)
+    try:
+        yield fm
+    finally:
+        _current_file.reset(token)
+        total = time.perf_counter() - fm.started
+        fm.add_stage("total", total)
+        REGISTRY.observe("total", total)
+        REGISTRY.incr("files")
+
+
+def set_file_hash(file_hash: str) -> None:
+    fm = _current_file.get()
+    if fm is not None:
+        fm.file_hash = file_hash
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    token = _current_stage.set(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        _current_stage.reset(token)
+        REGISTRY.observe(name, elapsed)
+        fm = _current_file.get()
+        if fm is not None:
+            fm.add_stage(name, elapsed)
+
+
+def incr(name: str, value: float = 1.0) -> None:
+    REGISTRY.incr(name, value)
+    fm = _current_file.get()
+    if fm is not None:
+        fm.add_counter(name, value)
+
+
+def propagate(fn: Callable[..., T]) -> Callable[..., T]:
+    ctx = copy_context()
+    return lambda *args, **kwargs: ctx.copy().run(fn, *args, **kwargs)
+
+
+def serve_metrics(cfg_metrics: Dict[str, str]) -> Optional[ThreadingHTTPServer]:
+    port = int(cfg_metrics.get("http_port", 0) or 0)
+    if not cfg_metrics.get("enabled", True) or not port:
+        return None
+    host = str(cfg_metrics.get("http_host", "127.0.0.1"))
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            path = self.path.split("?")[0]
+            if path == "/metrics":
+                body = REGISTRY.render_prometheus().encode("utf-8")
+                ctype = "text/plain; version=0.0.4; charset=utf-8"
+            elif path == "/metrics.json":
+                body = json.dumps(REGISTRY.snapshot()).encode("utf-8")
+                ctype = "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args) -> None:
+            pass
+
+    try:
+        server = ThreadingHTTPServer((host, port), Handler)
+    except OSError as exc:
+        logger.error("Metrics endpoint on %s:%d unavailable: %s", host, port, exc)
+        return None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info("Metrics endpoint on http://%s:%d/metrics", host, port)
+    return server
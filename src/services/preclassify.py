@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+from src.core.models import TranscriptionResult
+from src.core.utils import fold_text
+
+
+DEFAULT_PATTERNS = {
+    "voicemail": [
+        r"poczt\w* glosow",
+        r"zostaw\w* wiadomosc",
+        r"nagra\w* wiadomosc",
+        r"po (sygnale|sygnal)",
+        r"abonent\w* (jest )?(chwilowo )?niedostepn",
+    ],
+    "ivr": [r"wybierz (jeden|dwa|trzy|\d)", r"nacisnij", r"prosze czekac na polaczenie"],
+}
+
+
+def preclassify(
+    transcription: TranscriptionResult, duration_sec: float, cfg_pre: Dict[str, str]
+) -> str:
+    if not cfg_pre or not cfg_pre.get("enabled", False):
+        return ""
+
+    words = len(transcription.transcript.split())
+    if words == 0:
+        return "empty"
+    if duration_sec and duration_sec < float(cfg_pre.get("min_duration_sec", 8)):
+        return "hangup"
+    if words < int(cfg_pre.get("min_words", 5)):
+        return "too_short"
+
+    max_silence = float(cfg_pre.get("max_silence_ratio", 0.0) or 0.0)
+    if max_silence and duration_sec and transcription.segments:
+        speech = sum(max(0.0, s.end - s.start) for s in transcription.segments)
+        if 1.0 - min(1.0, speech / duration_sec) > max_silence:
+            return "silence"
+
+    if words <= int(cfg_pre.get("pattern_max_words", 80)):
+        folded = fold_text(transcription.transcript)
+        for label, pattern in _compiled(_patterns_key(cfg_pre)):
+            if pattern.search(folded):
+                return label
+    return ""
+
+
+def _patterns_key(cfg_pre: Dict[str, str]) -> Tuple[Tuple[str, Tuple[str, ...]], ...]:
+    patterns = cfg_pre.get("patterns")
+    if patterns is None:
+        patterns = DEFAULT_PATTERNS
+    return tuple((label, tuple(p or [])) for label, p in patterns.items())
+
+
+@lru_cache(maxsize=8)
+def _compiled(key: Tuple[Tuple[str, Tuple[str, ...]], ...]) -> List[Tuple[str, re.Pattern]]:
+    return [(label, re.compile(p, re.IGNORECASE)) for label, items in key for p in items]
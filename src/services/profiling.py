@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import cProfile
+import io
+import itertools
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ("cprofile", "sample")
+SAFE_NAME_RE = re.compile(r"[^\w.-]+")
+
+_active: Optional["PipelineProfiler"] = None
+
+
+class PipelineProfiler:
+    def __init__(self, mode: str, cfg_profiling: Dict[str, str]) -> None:
+        self.mode = mode
+        root = Path(cfg_profiling.get("dir", "profiles"))
+        self.out_dir = root / f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{mode}"
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.interval = float(cfg_profiling.get("sample_interval_ms", 5)) / 1000.0
+        self.top = int(cfg_profiling.get("top", 40))
+        self.trace_memory = bool(cfg_profiling.get("tracemalloc", True))
+        self.profiled = 0
+        self.skipped = 0
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+        self._cprofile_lock = threading.Lock()
+        self._merged_stats: Optional[pstats.Stats] = None
+        self._merged_stacks: Counter = Counter()
+        self._last_snapshot: Optional[tracemalloc.Snapshot] = None
+        self._memory_lines: List[str] = []
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start(int(cfg_profiling.get("tracemalloc_frames", 10)))
+
+    @contextmanager
+    def profile(self, name: str) -> Iterator[None]:
+        base = self.out_dir / f"{next(self._seq):05d}_{SAFE_NAME_RE.sub('_', name)}"
+        runner = self._cprofile if self.mode == "cprofile" else self._sample
+        try:
+            with runner(base):
+                yield
+        finally:
+            if self.trace_memory:
+                self._memory_diff(base, name)
+
+    @contextmanager
+    def _cprofile(self, base: Path) -> Iterator[None]:
+        if not self._cprofile_lock.acquire(blocking=False):
+            with self._lock:
+                self.skipped += 1
+            yield
+            return
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+            try:
+                yield
+            finally:
+                prof.disable()
+        finally:
+            self._cprofile_lock.release()
+        prof.dump_stats(str(base.with_suffix(".prof")))
+        with self._lock:
+            self.profiled += 1
+            if self._merged_stats is None:
+                self._merged_stats = pstats.Stats(prof)
+            else:
+                self._merged_stats.add(prof)
+
+    @contextmanager
+    def _sample(self, base: Path) -> Iterator[None]:
+        ident = threading.get_ident()
+        stacks: Counter = Counter()
+        labels: Dict[object, str] = {}
+        stop = threading.Event()
+
+        def run() -> None:
+            while not stop.wait(self.interval):
+                frame = sys._current_frames().get(ident)
+                if frame is not None:
+                    stacks[_fold_stack(frame, labels)] += 1
+
+        sampler = threading.Thread(target=run, daemon=True)
+        sampler.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            sampler.join()
+        with base.with_suffix(".folded").open("w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        with self._lock:
+            self.profiled += 1
+            self._merged_stacks.update(stacks)
+
+    def _memory_diff(self, base: Path, name: str) -> None:
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            )
+        )
+        with self._lock:
+            previous, self._last_snapshot = self._last_snapshot, snapshot
+        if previous is None:
+            return
+        stats = snapshot.compare_to(previous, "lineno")
+        growth = sum(s.size_diff for s in stats)
+        current, peak = tracemalloc.get_traced_memory()
+        with base.with_suffix(".mem.txt").open("w", encoding="utf-8") as f:
+            f.write(f"growth {growth / 1024:.1f} KiB, traced {current / 1048576:.1f} MiB\n")
+            for stat in stats[: self.top]:
+                f.write(f"{stat}\n")
+        with self._lock:
+            self._memory_lines.append(
+                f"{name}: {growth / 1024:+.1f} KiB (traced {current / 1048576:.1f} MiB, "
+                f"peak {peak / 1048576:.1f} MiB)"
+            )
+
+    def write_report(self) -> Path:
+        path = self.out_dir / "report.txt"
+        with path.open("w", encoding="utf-8") as f:
+            f.write(f"mode: {self.mode}\nfiles profiled: {self.profiled}\n")
+            if self.skipped:
+                f.write(f"files skipped (another file was being profiled): {self.skipped}\n")
+            if self.mode == "cprofile" and self._merged_stats is not None:
+                self._merged_stats.dump_stats(str(self.out_dir / "merged.prof"))
+                stream = io.StringIO()
+                self._merged_stats.stream = stream
+                self._merged_stats.sort_stats("cumulative").print_stats(self.top)
+                f.write("\n" + stream.getvalue())
+            elif self.mode == "sample" and self._merged_stacks:
+                self._write_samples(f)
+            if self._memory_lines:
+                f.write("\nMemory growth per file:\n")
+                f.write("\n".join(self._memory_lines) + "\n")
+        return path
+
+    def _write_samples(self, f) -> None:
+        with (self.out_dir / "merged.folded").open("w", encoding="utf-8") as out:
+            for stack, count in self._merged_stacks.most_common():
+                out.write(f"{stack} {count}\n")
+        total = sum(self._merged_stacks.values())
+        own: Counter = Counter()
+        inclusive: Counter = Counter()
+        for stack, count in self._merged_stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for frame in set(frames):
+                inclusive[frame] += count
+        f.write(f"\nsamples: {total} (interval {self.interval * 1000:.1f} ms)\n")
+        for title, counter in (("Self", own), ("Inclusive", inclusive)):
+            f.write(f"\n{title}:\n")
+            for frame, count in counter.most_common(self.top):
+                f.write(f"{count / total:7.1%} {count:8d}  {frame}\n")
+
+
+def _fold_stack(frame, labels: Dict[object, str]) -> str:
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        label = labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            labels[code] = label
+        parts.append(label)
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+def install_profiler(
+    mode: str, cfg_profiling: Dict[str, str], workers: int = 1
+) -> PipelineProfiler:
+    global _active
+    _active = PipelineProfiler(mode, cfg_profiling or {})
+    if mode == "cprofile" and workers > 1:
+        logger.warning(
+            "cProfile profiles one file at a time; with %d workers other files are skipped "
+            "and their calls may leak into the profile (use scheduler.workers: 1)",
+            workers,
+        )
+    logger.info("Profiling (%s) to %s", mode, _active.out_dir)
+    return _active
+
+
+def active_profiler() -> Optional[PipelineProfiler]:
+    return _active
+
+
+def finish_profiler() -> Optional[Path]:
+    global _active
+    profiler, _active = _active, None
+    if profiler is None:
+        return None
+    report = profiler.write_report()
+    if profiler.trace_memory:
+        tracemalloc.stop()
+    return report
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = """
+Jestes audytorem rozmow telefonicznych. Ocen rozmowe na podstawie transkrypcji.
+Dla kazdej kategorii podaj ocene w skali 0.0-1.0.
+Kategorie: {categories}.
+Wynik ma byc obiektywny i ostrozny. Jesli brak dowodu w transkrypcji, ocen nisko.
+Zwroc JSON:
+{
+  "scores": { "Kryterium": 0.0-1.0, ... },
+  "evidence": { "Kryterium": "krotki cytat z transkrypcji" }
+}
+Jesli brak dowodu, evidence ustaw na pusty string.
+Evidence musi byc doslownym cytatem z transkrypcji (krotki fragment).
+""".strip()
+
+KNOWLEDGE_HEADER = "Baza wiedzy (uzyj do weryfikacji prawdy):\n"
+TRANSCRIPT_HEADER = "Transkrypcja:\n"
+CHARS_PER_TOKEN = 3.5
+MESSAGE_OVERHEAD_TOKENS = 16
+
+_builders: Dict[str, "PromptBuilder"] = {}
+_builders_lock = Lock()
+
+
+@dataclass
+class Prompt:
+    system: str
+    user: str
+    input_tokens: int
+
+
+class PromptBuilder:
+    def __init__(self, cfg_scoring: Dict[str, str], criteria: list[dict]) -> None:
+        criteria_txt = "\n".join(
+            [f"- {c['name']}: {c.get('description','')}".strip() for c in criteria]
+        )
+        categories = ", ".join(c["name"] for c in criteria)
+        self.system = (
+            SYSTEM_PROMPT.replace("{categories}", categories) + "\nKryteria:\n" + criteria_txt
+        )
+        self.model = str(cfg_scoring.get("model", ""))
+        self.system_tokens = count_tokens(self.system, self.model)
+        self.max_prompt_tokens = int(cfg_scoring.get("max_prompt_tokens", 0) or 0)
+        self.knowledge_share = float(cfg_scoring.get("knowledge_token_share", 0.3))
+
+    def build(self, transcript: str, knowledge_ctx: List[str]) -> Prompt:
+        snippets, budget = self.transcript_budget(knowledge_ctx)
+        if budget is not None:
+            truncated = truncate_to_tokens(transcript, budget, self.model)
+            if len(truncated) < len(transcript):
+                logger.warning(
+                    "Transcript cut to %d of %d chars to fit max_prompt_tokens=%d",
+                    len(truncated),
+                    len(transcript),
+                    self.max_prompt_tokens,
+                )
+            transcript = truncated
+
+        if snippets:
+            user = KNOWLEDGE_HEADER + "\n".join(snippets) + "\n\n" + TRANSCRIPT_HEADER + transcript
+        else:
+            user = transcript
+        tokens = self.system_tokens + count_tokens(user, self.model) + MESSAGE_OVERHEAD_TOKENS
+        return Prompt(system=self.system, user=user, input_tokens=tokens)
+
+    def transcript_budget(self, knowledge_ctx: List[str]) -> Tuple[List[str], Optional[int]]:
+        snippets = [s for s in knowledge_ctx or [] if s]
+        if not self.max_prompt_tokens:
+            return snippets, None
+        budget = self.max_prompt_tokens - self.system_tokens - MESSAGE_OVERHEAD_TOKENS
+        budget -= count_tokens(KNOWLEDGE_HEADER + TRANSCRIPT_HEADER, self.model)
+        budget = max(0, budget)
+        snippets = self._fit_snippets(snippets, int(budget * self.knowledge_share))
+        used = sum(count_tokens(s, self.model) + 1 for s in snippets)
+        return snippets, budget - used
+
+    def _fit_snippets(self, snippets: List[str], budget: int) -> List[str]:
+        kept = []
+        for s in snippets:
+            cost = count_tokens(s, self.model) + 1
+            if cost > budget:
+                if budget > 32:
+                    kept.append(truncate_to_tokens(s, budget - 1, self.model))
+                break
+            kept.append(s)
+            budget -= cost
+        return kept
+
+
+def get_prompt_builder(cfg_scoring: Dict[str, str], criteria: list[dict]) -> PromptBuilder:
+    key = json.dumps(
+        [
+            criteria,
+            cfg_scoring.get("model"),
+            cfg_scoring.get("max_prompt_tokens"),
+            cfg_scoring.get("knowledge_token_share"),
+        ],
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    with _builders_lock:
+        builder = _builders.get(key)
+        if builder is None:
+            builder = PromptBuilder(cfg_scoring, criteria)
+            _builders[key] = builder
+        return builder
+
+
+@lru_cache(maxsize=8)
+def _encoder(model: str):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        pass
+    try:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text: str, model: str = "") -> int:
+    if not text:
+        return 0
+    enc = _encoder(model)
+    if enc is None:
+        return int(len(text) / CHARS_PER_TOKEN) + 1
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = "") -> str:
+    if max_tokens <= 0:
+        return ""
+    enc = _encoder(model)
+    if enc is None:
+        return text[: int(max_tokens * CHARS_PER_TOKEN)]
+    tokens = enc.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return enc.decode(tokens[:max_tokens])
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Dict, Mapping, Optional
+
+
+logger = logging.getLogger(__name__)
+
+_limiters: Dict[str, Optional["RateLimiter"]] = {}
+_limiters_lock = threading.Lock()
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, refill_per_sec: float) -> None:
+        self.capacity = capacity
+        self.refill_per_sec = refill_per_sec
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        with self._lock:
+            self._refill()
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.refill_per_sec
+
+    def credit(self, amount: float) -> None:
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+    def cap(self, remaining: float) -> None:
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, remaining)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.refill_per_sec
+        )
+        self._updated = now
+
+
+class RateLimiter:
+    def __init__(self, name: str, rpm: float, tpm: float, headroom: float = 0.95) -> None:
+        self.name = name
+        self.headroom = headroom
+        self.requests = TokenBucket(rpm * headroom, rpm * headroom / 60.0) if rpm else None
+        self.tokens = TokenBucket(tpm * headroom, tpm * headroom / 60.0) if tpm else None
+
+    def acquire(self, tokens: int = 0) -> float:
+        wait = 0.0
+        if self.requests:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens and tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        if wait > 0:
+            logger.debug("Rate limiter %s waiting %.2fs", self.name, wait)
+            time.sleep(wait)
+        return wait
+
+    def settle(self, estimated: int, actual: Optional[int]) -> None:
+        if self.tokens and actual is not None and actual < estimated:
+            self.tokens.credit(estimated - actual)
+        elif self.tokens and actual is not None and actual > estimated:
+            self.tokens.reserve(actual - estimated)
+
+    def update_from_headers(self, headers: Optional[Mapping[str, str]]) -> None:
+        if not headers:
+            return
+        remaining_requests = _header_float(headers, "x-ratelimit-remaining-requests")
+        if self.requests and remaining_requests is not None:
+            self.requests.cap(remaining_requests * self.headroom)
+        remaining_tokens = _header_float(headers, "x-ratelimit-remaining-tokens")
+        if self.tokens and remaining_tokens is not None:
+            self.tokens.cap(remaining_tokens * self.headroom)
+
+
+def _header_float(headers: Mapping[str, str], name: str) -> Optional[float]:
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def get_limiter(name: str, cfg: Dict[str, str]) -> Optional[RateLimiter]:
+    with _limiters_lock:
+        if name not in _limiters:
+            rpm = float(cfg.get("requests_per_minute", 0) or 0)
+            tpm = float(cfg.get("tokens_per_minute", 0) or 0)
+            _limiters[name] = (
+                RateLimiter(name, rpm, tpm, float(cfg.get("rate_limit_headroom", 0.95)))
+                if rpm or tpm
+                else None
+            )
+        return _limiters[name]
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import json
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional, TypeVar
+
+import openai
+
+from src.services.metrics import incr
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+TRANSPORT = "transport"
+RATE_LIMIT = "rate_limit"
+SERVER = "server"
+PARSE = "parse"
+CLIENT = "client"
+RETRYABLE = {TRANSPORT, RATE_LIMIT, SERVER, PARSE}
+
+_breakers: Dict[str, "CircuitBreaker"] = {}
+_breakers_lock = threading.Lock()
+
+
+class RetryError(RuntimeError):
+    def __init__(self, attempts: int, last_error: Exception) -> None:
+        super().__init__(f"failed after {attempts} attempts: {last_error}")
+        self.attempts = attempts
+        self.last_error = last_error
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+def classify_error(exc: Exception) -> str:
+    if isinstance(exc, openai.RateLimitError):
+        return RATE_LIMIT
+    if isinstance(exc, openai.APIConnectionError):
+        return TRANSPORT
+    if isinstance(exc, openai.APIStatusError):
+        status = int(getattr(exc, "status_code", 0) or 0)
+        if status == 429:
+            return RATE_LIMIT
+        if status >= 500 or status in (408, 409):
+            return SERVER
+        return CLIENT
+    if isinstance(exc, (json.JSONDecodeError, KeyError, ValueError)):
+        return PARSE
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return TRANSPORT
+    return CLIENT
+
+
+def retry_after_sec(exc: Exception) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class RetryPolicy:
+    max_retries: int
+    base_sec: float
+    max_sec: float
+    jitter: float
+
+    @classmethod
+    def from_cfg(cls, cfg: Dict[str, str]) -> "RetryPolicy":
+        return cls(
+            max_retries=max(0, int(cfg.get("max_retries", 2))),
+            base_sec=float(cfg.get("retry_sleep_sec", 1)),
+            max_sec=float(cfg.get("retry_max_sleep_sec", 30)),
+            jitter=float(cfg.get("retry_jitter", 0.5)),
+        )
+
+    def delay(self, attempt: int, kind: str, exc: Exception) -> float:
+        if kind == PARSE:
+            return 0.0
+        hinted = retry_after_sec(exc)
+        if hinted is not None:
+            return min(hinted, self.max_sec)
+        delay = min(self.max_sec, self.base_sec * (2**attempt))
+        return random.uniform(delay * (1.0 - self.jitter), delay)
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 3,
+        reset_sec: float = 30.0,
+        max_reset_sec: float = 300.0,
+        max_wait_sec: float = 0.0,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_sec = reset_sec
+        self.max_reset_sec = max(reset_sec, max_reset_sec)
+        self.max_wait_sec = max_wait_sec
+        self.state = self.CLOSED
+        self._failures = 0
+        self._cooldown = reset_sec
+        self._open_until = 0.0
+        self._cond = threading.Condition()
+
+    def before_call(self) -> None:
+        deadline = time.monotonic() + self.max_wait_sec if self.max_wait_sec else None
+        with self._cond:
+            while True:
+                if self.state == self.CLOSED:
+                    return
+                now = time.monotonic()
+                if self.state == self.OPEN and now >= self._open_until:
+                    self.state = self.HALF_OPEN
+                    logger.info("Circuit %s half-open, probing endpoint", self.name)
+                    return
+                if deadline is not None and now >= deadline:
+                    raise CircuitOpenError(f"Endpoint {self.name} unavailable (circuit open)")
+                wait = self._open_until - now if self.state == self.OPEN else 1.0
+                if deadline is not None:
+                    wait = min(wait, deadline - now)
+                self._cond.wait(max(0.05, wait))
+
+    def probe_due(self) -> bool:
+        with self._cond:
+            return self.state == self.OPEN and time.monotonic() >= self._open_until
+
+    def retry_in(self) -> float:
+        with self._cond:
+            if self.state == self.OPEN:
+                return max(0.0, self._open_until - time.monotonic())
+            return 0.0 if self.state == self.CLOSED else 1.0
+
+    def begin_probe(self) -> None:
+        with self._cond:
+            self.state = self.HALF_OPEN
+
+    def record_success(self) -> None:
+        with self._cond:
+            if self.state != self.CLOSED:
+                logger.info("Circuit %s closed", self.name)
+            self.state = self.CLOSED
+            self._failures = 0
+            self._cooldown = self.reset_sec
+            self._cond.notify_all()
+
+    def record_failure(self) -> None:
+        with self._cond:
+            self._failures += 1
+            if self.state == self.HALF_OPEN:
+                self._cooldown = min(self._cooldown * 2, self.max_reset_sec)
+            elif self._failures < self.failure_threshold:
+                return
+            self.state = self.OPEN
+            self._open_until = time.monotonic() + self._cooldown
+            logger.warning(
+                "Circuit %s open for %.0fs after %d failures",
+                self.name,
+                self._cooldown,
+                self._failures,
+            )
+            self._cond.notify_all()
+
+
+def get_breaker(name: str, cfg: Dict[str, str]) -> CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                name,
+                failure_threshold=int(cfg.get("breaker_failure_threshold", 3)),
+                reset_sec=float(cfg.get("breaker_reset_sec", 30)),
+                max_reset_sec=float(cfg.get("breaker_max_reset_sec", 300)),
+                max_wait_sec=float(cfg.get("breaker_max_wait_sec", 0)),
+            )
+            _breakers[name] = breaker
+        return breaker
+
+
+def call_with_retry(
+    fn: Callable[[], T],
+    policy: RetryPolicy,
+    breaker: Optional[CircuitBreaker] = None,
+    label: str = "request",
+) -> T:
+    attempt = 0
+    while True:
+        if breaker:
+            breaker.before_call()
+        try:
+            result = fn()
+        except Exception as exc:
+            kind = classify_error(exc)
+            if breaker:
+                if kind in (TRANSPORT, SERVER):
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+            if kind not in RETRYABLE or attempt >= policy.max_retries:
+                raise RetryError(attempt + 1, exc) from exc
+            delay = policy.delay(attempt, kind, exc)
+            logger.warning(
+                "%s failed (%s, attempt %d/%d), retrying in %.1fs: %s",
+                label,
+                kind,
+                attempt + 1,
+                policy.max_retries + 1,
+                delay,
+                exc,
+            )
+            incr("retries")
+            if delay:
+                time.sleep(delay)
+            attempt += 1
+            continue
+        if breaker:
+            breaker.record_success()
+        return result
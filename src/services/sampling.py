@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import json
+import math
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Tuple
+
+from src.services.db import count_agent_calls
+
+
+_samplers: Dict[str, "SamplingPolicy"] = {}
+_samplers_lock = threading.Lock()
+
+
+def window_bounds(moment: datetime, window: str) -> Tuple[datetime, datetime]:
+    start = moment.replace(minute=0, second=0, microsecond=0)
+    if window == "hour":
+        return start, start + timedelta(hours=1)
+    start = start.replace(hour=0)
+    if window == "week":
+        start -= timedelta(days=start.weekday())
+        return start, start + timedelta(days=7)
+    return start, start + timedelta(days=1)
+
+
+class SamplingPolicy:
+    def __init__(self, cfg_sampling: Dict[str, str]) -> None:
+        self.window = str(cfg_sampling.get("window", "day")).lower()
+        self.per_agent_count = int(cfg_sampling.get("per_agent_count", 0) or 0)
+        self.per_agent_percent = float(cfg_sampling.get("per_agent_percent", 0) or 0)
+        self.always_over_sec = float(cfg_sampling.get("always_over_sec", 0) or 0)
+        self._counts: Dict[Tuple[str, str, datetime], list[int]] = {}
+        self._lock = threading.Lock()
+
+    def select(
+        self,
+        db_conn,
+        first_name: str,
+        last_name: str,
+        duration_sec: float,
+        profanity_flag: bool,
+        moment: datetime | None = None,
+    ) -> bool:
+        start, end = window_bounds(moment or datetime.now(), self.window)
+        key = (first_name.lower(), last_name.lower(), start)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = list(count_agent_calls(db_conn, first_name, last_name, start, end))
+                self._counts = {k: v for k, v in self._counts.items() if k[2] == start}
+                self._counts[key] = counts
+            seen, sampled = counts
+            forced = profanity_flag or (
+                self.always_over_sec > 0 and duration_sec >= self.always_over_sec
+            )
+            take = forced or sampled < self._quota(seen + 1)
+            counts[0] += 1
+            if take:
+                counts[1] += 1
+            return take
+
+    def _quota(self, seen: int) -> int:
+        if self.per_agent_count:
+            return self.per_agent_count
+        return math.ceil(seen * self.per_agent_percent / 100.0)
+
+
+def get_sampler(cfg_sampling: Dict[str, str]) -> SamplingPolicy | None:
+    if not cfg_sampling or not cfg_sampling.get("enabled", False):
+        return None
+    key = json.dumps(cfg_sampling, sort_keys=True, default=str)
+    with _samplers_lock:
+        sampler = _samplers.get(key)
+        if sampler is None:
+            sampler = SamplingPolicy(cfg_sampling)
+            _samplers[key] = sampler
+        return sampler
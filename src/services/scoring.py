@@ -1,7 +1,10 @@
 ﻿from __future__ import annotations
 
+import hashlib
 from typing import Dict
 
+from src.core.models import EvidenceMatch
+
 
 def score_to_stars(score_total: float, thresholds: Dict[str, float]) -> int:
     if score_total >= thresholds["five_star"]:
@@ -17,3 +20,22 @@ def compute_score(weights: Dict[str, float], scores: Dict[str, float]) -> float:
     if not weights:
         return 0.0
     return sum(weights[k] * scores.get(k, 0.0) for k in weights.keys())
+
+
+def summarize_evidence(
+    scores: Dict[str, float],
+    evidence: Dict[str, str],
+    transcript: str,
+    verification: Dict[str, EvidenceMatch] | None = None,
+) -> str:
+    for k in scores.keys():
+        if not evidence.get(k):
+            continue
+        if verification is None or (k in verification and verification[k].verified):
+            return evidence.get(k, "")
+    return transcript[:200].strip()
+
+
+def criterion_fingerprint(criterion: Dict[str, str]) -> str:
+    text = f"{criterion['name']}\n{criterion.get('description', '')}".strip()
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
@@ -1,62 +1,281 @@
 ﻿from __future__ import annotations
 
+import io
+import os
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict
+from typing import Callable, Dict, Iterator, List, Tuple
 
 from openai import OpenAI
 
-from src.core.models import TranscriptionResult
+from src.core.models import TranscriptionInfo, TranscriptionResult, TranscriptSegment
+from src.services.audio_probe import probe_mp3
+from src.services.cassettes import active_cassettes
+from src.services.metrics import propagate
+from src.services.rate_limit import get_limiter
+from src.services.resilience import RetryError, RetryPolicy, call_with_retry, get_breaker
+
+
+SAMPLE_RATE = 16000
+WAV_BYTES_PER_SEC = SAMPLE_RATE * 2
 
 
 def transcribe(file_path: str, cfg_transcription: Dict[str, str]) -> TranscriptionResult:
+    segment_iter, info = stream_transcribe(file_path, cfg_transcription)
+    segments = list(segment_iter)
+    return TranscriptionResult(
+        file_name=Path(file_path).name,
+        transcript=join_segments(segments),
+        confidence=info.confidence,
+        duration_sec=info.duration_sec,
+        segments=segments,
+    )
+
+
+def stream_transcribe(
+    file_path: str, cfg_transcription: Dict[str, str]
+) -> Tuple[Iterator[TranscriptSegment], TranscriptionInfo]:
+    cassettes = active_cassettes()
+    if cassettes is not None:
+        return cassettes.transcribe(lambda: _stream_provider(file_path, cfg_transcription))
+    return _stream_provider(file_path, cfg_transcription)
+
+
+def _stream_provider(
+    file_path: str, cfg_transcription: Dict[str, str]
+) -> Tuple[Iterator[TranscriptSegment], TranscriptionInfo]:
     provider = (cfg_transcription.get("provider") or "openai").lower()
     if provider in {"faster_whisper", "local"}:
-        return _transcribe_faster_whisper(file_path, cfg_transcription)
-    return _transcribe_openai(file_path, cfg_transcription)
+        return _stream_faster_whisper(file_path, cfg_transcription)
+    return _stream_openai(file_path, cfg_transcription)
+
+
+def _stream_openai(
+    file_path: str, cfg_transcription: Dict[str, str]
+) -> Tuple[Iterator[TranscriptSegment], TranscriptionInfo]:
+    client = _openai_client(cfg_transcription)
+    path = Path(file_path)
+    max_bytes = int(cfg_transcription.get("api_max_bytes", 25_000_000))
+    too_big = path.stat().st_size > max_bytes
+    probed = probe_mp3(path)
+    info = TranscriptionInfo(
+        confidence=float(cfg_transcription.get("min_confidence", 0.85)),
+        duration_sec=int(round(probed.duration_sec)) if probed else 0,
+    )
+    long_call = probed is None or probed.duration_sec >= _chunk_min_duration(cfg_transcription)
+
+    if (_chunking_enabled(cfg_transcription) and long_call) or too_big:
+        audio = _decode_audio(file_path)
+        info.duration_sec = int(len(audio) / SAMPLE_RATE)
+        if info.duration_sec >= _chunk_min_duration(cfg_transcription) or too_big:
+            max_chunk_sec = max(1, (max_bytes - 1024) // WAV_BYTES_PER_SEC)
+            chunk_sec = int(cfg_transcription.get("chunk_sec", 0) or max_chunk_sec)
+            chunk_sec = min(chunk_sec, max_chunk_sec)
+            bounds = _split_at_silence(audio, chunk_sec, _chunk_search_sec(cfg_transcription))
+
+            def run(bound: Tuple[int, int]) -> Iterator[TranscriptSegment]:
+                start, end = bound
+                text = _openai_request(
+                    client,
+                    (f"chunk_{start}.wav", _to_wav_bytes(audio[start:end]), "audio/wav"),
+                    cfg_transcription,
+                )
+                if text.strip():
+                    yield TranscriptSegment(
+                        text=text.strip(), start=start / SAMPLE_RATE, end=end / SAMPLE_RATE
+                    )
+
+            return _stream_chunks(bounds, run, _chunk_workers(cfg_transcription, len(bounds))), info
 
+    def single() -> Iterator[TranscriptSegment]:
+        with path.open("rb") as audio_file:
+            text = _openai_request(client, audio_file, cfg_transcription)
+        if text.strip():
+            yield TranscriptSegment(text=text.strip(), start=0.0, end=float(info.duration_sec))
 
-def _transcribe_openai(file_path: str, cfg_transcription: Dict[str, str]) -> TranscriptionResult:
-    client = OpenAI()
-    with Path(file_path).open("rb") as audio_file:
-        transcription = client.audio.transcriptions.create(
+    return single(), info
+
+
+def _openai_client(cfg_transcription: Dict[str, str]) -> OpenAI:
+    timeout = float(cfg_transcription.get("timeout_sec", 600))
+    if cfg_transcription.get("base_url") or cfg_transcription.get("api_key_env"):
+        return OpenAI(
+            base_url=cfg_transcription.get("base_url") or None,
+            api_key=os.getenv(cfg_transcription.get("api_key_env") or "OPENAI_API_KEY"),
+            max_retries=0,
+            timeout=timeout,
+        )
+    return OpenAI(max_retries=0, timeout=timeout)
+
+
+def _openai_request(client: OpenAI, audio_file, cfg_transcription: Dict[str, str]) -> str:
+    limiter = get_limiter("stt:openai", cfg_transcription)
+
+    def attempt():
+        if hasattr(audio_file, "seek"):
+            audio_file.seek(0)
+        if limiter:
+            limiter.acquire()
+        raw_response = client.audio.transcriptions.with_raw_response.create(
             model=cfg_transcription["model"],
             file=audio_file,
             response_format="text",
             language=cfg_transcription.get("language"),
             prompt=cfg_transcription.get("prompt") or None,
         )
+        if limiter:
+            limiter.update_from_headers(raw_response.headers)
+        return raw_response.parse()
 
-    text = transcription.text if hasattr(transcription, "text") else str(transcription)
-
-    return TranscriptionResult(
-        file_name=Path(file_path).name,
-        transcript=text,
-        confidence=float(cfg_transcription.get("min_confidence", 0.85)),
-        duration_sec=0,
-    )
+    try:
+        transcription = call_with_retry(
+            attempt,
+            RetryPolicy.from_cfg(cfg_transcription),
+            get_breaker("stt:openai", cfg_transcription),
+            label="Transcription",
+        )
+    except RetryError as exc:
+        raise RuntimeError(
+            f"Transcription failed after {exc.attempts} attempts: {exc.last_error}"
+        ) from exc.last_error
+    return transcription.text if hasattr(transcription, "text") else str(transcription)
 
 
-def _transcribe_faster_whisper(file_path: str, cfg_transcription: Dict[str, str]) -> TranscriptionResult:
+@lru_cache(maxsize=2)
+def _load_model(model_name: str, device: str, compute_type: str, num_workers: int):
     from faster_whisper import WhisperModel
 
+    return WhisperModel(
+        model_name, device=device, compute_type=compute_type, num_workers=num_workers
+    )
+
+
+def _stream_faster_whisper(
+    file_path: str, cfg_transcription: Dict[str, str]
+) -> Tuple[Iterator[TranscriptSegment], TranscriptionInfo]:
     model_name = cfg_transcription.get("model", "base")
     device = cfg_transcription.get("device", "cpu")
     compute_type = cfg_transcription.get("compute_type", "int8")
+    workers = int(cfg_transcription.get("chunk_workers", 1) or 1)
 
-    model = WhisperModel(model_name, device=device, compute_type=compute_type)
-    segments, info = model.transcribe(
-        file_path,
-        language=cfg_transcription.get("language"),
-        initial_prompt=cfg_transcription.get("prompt") or None,
-    )
+    model = _load_model(model_name, device, compute_type, workers)
+    kwargs = {
+        "language": cfg_transcription.get("language"),
+        "initial_prompt": cfg_transcription.get("prompt") or None,
+    }
 
-    text = "".join([seg.text for seg in segments]).strip()
-    confidence = getattr(info, "language_probability", 0.0) or 0.0
-    duration = int(getattr(info, "duration", 0.0) or 0.0)
+    if not _chunking_enabled(cfg_transcription):
+        seg_iter, fw_info = model.transcribe(file_path, **kwargs)
+        info = TranscriptionInfo(
+            confidence=getattr(fw_info, "language_probability", 0.0) or 0.0,
+            duration_sec=int(getattr(fw_info, "duration", 0.0) or 0.0),
+        )
+        segments = (TranscriptSegment(text=s.text, start=s.start, end=s.end) for s in seg_iter)
+        return segments, info
 
-    return TranscriptionResult(
-        file_name=Path(file_path).name,
-        transcript=text,
-        confidence=confidence,
-        duration_sec=duration,
-    )
+    audio = _decode_audio(file_path)
+    info = TranscriptionInfo(confidence=0.0, duration_sec=int(len(audio) / SAMPLE_RATE))
+    if info.duration_sec < _chunk_min_duration(cfg_transcription):
+        bounds = [(0, len(audio))]
+    else:
+        bounds = _split_at_silence(
+            audio, int(cfg_transcription["chunk_sec"]), _chunk_search_sec(cfg_transcription)
+        )
+    probabilities: List[float] = []
+
+    def run(bound: Tuple[int, int]) -> Iterator[TranscriptSegment]:
+        start, end = bound
+        offset = start / SAMPLE_RATE
+        seg_iter, fw_info = model.transcribe(audio[start:end], **kwargs)
+        probabilities.append(getattr(fw_info, "language_probability", 0.0) or 0.0)
+        info.confidence = sum(probabilities) / len(probabilities)
+        for s in seg_iter:
+            yield TranscriptSegment(text=s.text, start=s.start + offset, end=s.end + offset)
+
+    return _stream_chunks(bounds, run, _chunk_workers(cfg_transcription, len(bounds))), info
+
+
+def _stream_chunks(
+    bounds: List[Tuple[int, int]],
+    run: Callable[[Tuple[int, int]], Iterator[TranscriptSegment]],
+    workers: int,
+) -> Iterator[TranscriptSegment]:
+    if len(bounds) == 1:
+        yield from run(bounds[0])
+        return
+    with ThreadPoolExecutor(max_workers=max(1, workers - 1)) as pool:
+        futures = [pool.submit(propagate(lambda b: list(run(b))), b) for b in bounds[1:]]
+        yield from run(bounds[0])
+        for fut in futures:
+            yield from fut.result()
+
+
+def _chunking_enabled(cfg_transcription: Dict[str, str]) -> bool:
+    return int(cfg_transcription.get("chunk_sec", 0) or 0) > 0
+
+
+def _chunk_min_duration(cfg_transcription: Dict[str, str]) -> float:
+    return float(cfg_transcription.get("chunk_min_duration_sec", 900))
+
+
+def _chunk_search_sec(cfg_transcription: Dict[str, str]) -> float:
+    return float(cfg_transcription.get("chunk_search_sec", 20))
+
+
+def _chunk_workers(cfg_transcription: Dict[str, str], n_chunks: int) -> int:
+    return max(1, min(int(cfg_transcription.get("chunk_workers", 1) or 1), n_chunks))
+
+
+def _decode_audio(file_path: str):
+    from faster_whisper import decode_audio
+
+    return decode_audio(file_path, sampling_rate=SAMPLE_RATE)
+
+
+def _split_at_silence(
+    audio, chunk_sec: float, search_sec: float, frame_ms: int = 30
+) -> List[Tuple[int, int]]:
+    import numpy as np
+
+    frame = SAMPLE_RATE * frame_ms // 1000
+    n_frames = len(audio) // frame
+    target = int(chunk_sec * 1000 // frame_ms)
+    search = int(search_sec * 1000 // frame_ms)
+    if n_frames <= target + search:
+        return [(0, len(audio))]
+
+    frames = audio[: n_frames * frame].reshape(n_frames, frame)
+    energy = np.sqrt(np.mean(frames**2, axis=1))
+    smooth = max(1, 300 // frame_ms)
+    energy = np.convolve(energy, np.ones(smooth) / smooth, mode="same")
+
+    cuts = [0]
+    pos = 0
+    while n_frames - pos > target + search:
+        lo = max(pos + 1, pos + target - search)
+        hi = min(n_frames, pos + target + search)
+        pos = lo + int(np.argmin(energy[lo:hi]))
+        cuts.append(pos)
+
+    bounds = [(cuts[i] * frame, cuts[i + 1] * frame) for i in range(len(cuts) - 1)]
+    bounds.append((cuts[-1] * frame, len(audio)))
+    return bounds
+
+
+def _to_wav_bytes(audio) -> bytes:
+    import numpy as np
+
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(SAMPLE_RATE)
+        w.writeframes(pcm)
+    return buf.getvalue()
+
+
+def join_segments(segments: List[TranscriptSegment]) -> str:
+    return " ".join(s.text.strip() for s in segments if s.text.strip())
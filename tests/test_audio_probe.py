@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import pytest
+
+from src.services.audio_probe import probe_mp3
+
+STEREO_128K = bytes([0xFF, 0xFB, 0x90, 0x00])
+MONO_128K = bytes([0xFF, 0xFB, 0x90, 0xC0])
+FRAME_LEN = 144 * 128000 // 44100
+
+
+def _frames(header: bytes, count: int, first: bytes = b"") -> bytes:
+    body = (first + bytes(FRAME_LEN - 4))[: FRAME_LEN - 4]
+    frames = [header + body]
+    frames += [header + bytes(FRAME_LEN - 4) for _ in range(count - 1)]
+    return b"".join(frames)
+
+
+def _id3v2(payload_size: int) -> bytes:
+    size = bytes(
+        [
+            (payload_size >> 21) & 0x7F,
+            (payload_size >> 14) & 0x7F,
+            (payload_size >> 7) & 0x7F,
+            payload_size & 0x7F,
+        ]
+    )
+    return b"ID3\x04\x00\x00" + size + bytes(payload_size)
+
+
+def test_cbr_duration_from_size(tmp_path):
+    path = tmp_path / "cbr.mp3"
+    path.write_bytes(_frames(STEREO_128K, 200))
+    info = probe_mp3(path)
+    assert info.bitrate_kbps == 128
+    assert info.sample_rate == 44100
+    assert info.channels == 2
+    assert info.duration_sec == pytest.approx(200 * FRAME_LEN * 8 / 128000)
+
+
+def test_skips_id3v2_and_id3v1_tags(tmp_path):
+    audio = _frames(STEREO_128K, 100)
+    path = tmp_path / "tagged.mp3"
+    path.write_bytes(_id3v2(3000) + audio + b"TAG" + bytes(125))
+    info = probe_mp3(path)
+    assert info.duration_sec == pytest.approx(len(audio) * 8 / 128000)
+
+
+def test_xing_header_gives_vbr_duration_and_bitrate(tmp_path):
+    frames, vbr_bytes = 5000, 3_000_000
+    xing = bytes(32) + b"Xing" + (3).to_bytes(4, "big")
+    xing += frames.to_bytes(4, "big") + vbr_bytes.to_bytes(4, "big")
+    path = tmp_path / "vbr.mp3"
+    path.write_bytes(_frames(STEREO_128K, 10, xing))
+    info = probe_mp3(path)
+    duration = frames * 1152 / 44100
+    assert info.duration_sec == pytest.approx(duration)
+    assert info.bitrate_kbps == round(vbr_bytes * 8 / duration / 1000)
+
+
+def test_xing_offset_depends_on_channels(tmp_path):
+    xing = bytes(17) + b"Info" + (1).to_bytes(4, "big") + (1000).to_bytes(4, "big")
+    path = tmp_path / "mono.mp3"
+    path.write_bytes(_frames(MONO_128K, 10, xing))
+    info = probe_mp3(path)
+    assert info.channels == 1
+    assert info.duration_sec == pytest.approx(1000 * 1152 / 44100)
+
+
+def test_vbri_header(tmp_path):
+    frames, vbr_bytes = 2500, 1_500_000
+    vbri = bytes(32) + b"VBRI" + bytes(6) + vbr_bytes.to_bytes(4, "big")
+    vbri += frames.to_bytes(4, "big")
+    path = tmp_path / "vbri.mp3"
+    path.write_bytes(_frames(STEREO_128K, 10, vbri))
+    info = probe_mp3(path)
+    assert info.duration_sec == pytest.approx(frames * 1152 / 44100)
+
+
+def test_not_an_mp3(tmp_path):
+    path = tmp_path / "noise.mp3"
+    path.write_bytes(b"RIFF" + bytes(4000))
+    assert probe_mp3(path) is None
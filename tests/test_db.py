@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+import pytest
+
+from src.core.models import EvaluationResult
+from src.services.db import init_db, insert_evaluation, list_stale_criteria, seed_criterion_scores
+
+OLD = [
+    {"name": "Otwarcie", "weight": 0.5, "description": "Powitanie"},
+    {"name": "Domkniecie", "weight": 0.5, "description": "Pozegnanie"},
+]
+NEW = [*OLD, {"name": "Empatia", "weight": 0.2, "description": "Zrozumienie klienta"}]
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = init_db(tmp_path / "calls.db")
+    for file_hash in ("h1", "h2"):
+        insert_evaluation(
+            conn,
+            EvaluationResult(
+                first_name="Jan",
+                last_name="Kowalski",
+                file_name=f"{file_hash}.mp3",
+                evaluation_timestamp=datetime(2024, 5, 15, 12),
+                transcript="Dzien dobry. Do widzenia.",
+                score_total=1.0,
+                stars=5,
+                profanity_flag=False,
+                profanity_phrases=[],
+                profanity_excerpt="",
+                score_breakdown={"Otwarcie": 1.0, "Domkniecie": 1.0},
+                evidence_breakdown={"Otwarcie": "Dzien dobry.", "Domkniecie": "Do widzenia."},
+                evidence_summary="",
+                knowledge_snippets=[],
+                transcription_confidence=1.0,
+                call_duration_sec=60,
+                file_hash=file_hash,
+            ),
+        )
+    yield conn
+    conn.close()
+
+
+def test_seed_uses_current_fingerprints_for_known_criteria(conn):
+    assert seed_criterion_scores(conn, NEW) == 2
+    assert list_stale_criteria(conn, NEW) == [("h1", ["Empatia"]), ("h2", ["Empatia"])]
+    assert list_stale_criteria(conn, OLD) == []
+
+
+def test_seed_legacy_rescores_every_criterion(conn):
+    assert seed_criterion_scores(conn, NEW, legacy=True) == 2
+    names = [c["name"] for c in NEW]
+    assert list_stale_criteria(conn, NEW) == [("h1", names), ("h2", names)]
+
+
+def test_seed_runs_once_per_call(conn):
+    seed_criterion_scores(conn, OLD)
+    assert seed_criterion_scores(conn, NEW, legacy=True) == 0
+    assert list_stale_criteria(conn, OLD) == []
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from src.core.config import load_config
+from src.core.models import EvaluationResult
+from src.pipelines.deferred import _custom_id, _ingest_output, _parse_custom_id
+from src.services.db import init_db, insert_evaluation, list_evaluations
+
+CONFIG = Path(__file__).resolve().parents[1] / "config.yaml"
+TRANSCRIPT = "Dzien dobry, w czym moge pomoc? ... Dziekuje za rozmowe, do uslyszenia."
+
+
+@pytest.fixture
+def cfg():
+    return load_config(CONFIG)
+
+
+@pytest.fixture
+def conn(tmp_path, cfg):
+    conn = init_db(tmp_path / "calls.db")
+    for file_hash in ("h1", "h2"):
+        insert_evaluation(
+            conn,
+            EvaluationResult(
+                first_name="Jan",
+                last_name="Kowalski",
+                file_name=f"{file_hash}.mp3",
+                evaluation_timestamp=datetime(2024, 5, 15, 12),
+                transcript=TRANSCRIPT,
+                score_total=0.0,
+                stars=0,
+                profanity_flag=False,
+                profanity_phrases=[],
+                profanity_excerpt="",
+                score_breakdown={},
+                evidence_breakdown={},
+                evidence_summary="",
+                knowledge_snippets=[],
+                transcription_confidence=1.0,
+                call_duration_sec=600,
+                file_hash=file_hash,
+                status="pending",
+            ),
+            cfg.criteria,
+        )
+    yield conn
+    conn.close()
+
+
+def _line(custom_id: str, scores, evidence=None, status: int = 200) -> str:
+    content = json.dumps({"scores": scores, "evidence": evidence or {}})
+    body = {"choices": [{"message": {"content": content}}]}
+    return json.dumps(
+        {"custom_id": custom_id, "response": {"status_code": status, "body": body}}
+    )
+
+
+def test_custom_id_round_trip():
+    assert _custom_id("abc", 0, 1) == "abc"
+    assert _parse_custom_id("abc") == ("abc", 0, 1)
+    assert _custom_id("abc", 2, 3) == "abc#3/3"
+    assert _parse_custom_id("abc#3/3") == ("abc", 2, 3)
+
+
+def test_windowed_responses_are_reduced(cfg, conn):
+    names = [c["name"] for c in cfg.criteria]
+    first = {name: 0.5 for name in names}
+    last = {name: 0.5 for name in names}
+    first["Domkniecie"] = 0.0
+    last["Domkniecie"] = 1.0
+    lines = [
+        _line("h1#2/2", last, {"Domkniecie": "Dziekuje za rozmowe, do uslyszenia."}),
+        _line("h1#1/2", first, {"Otwarcie": "Dzien dobry, w czym moge pomoc?"}),
+        _line("h2#1/2", first),
+    ]
+    client = SimpleNamespace(
+        files=SimpleNamespace(content=lambda _: SimpleNamespace(text="\n".join(lines)))
+    )
+
+    assert _ingest_output(cfg, conn, client, "file-1", lambda fn, _: fn()) == 1
+
+    rows = {r.file_hash: r for r in list_evaluations(conn)}
+    assert rows["h1"].status == "scored"
+    assert rows["h1"].score_breakdown["Domkniecie"] == 1.0
+    assert rows["h1"].evidence_breakdown["Otwarcie"] == "Dzien dobry, w czym moge pomoc?"
+    assert rows["h2"].status == "pending"
+
+
+def test_failed_window_leaves_call_pending(cfg, conn):
+    scores = {c["name"]: 1.0 for c in cfg.criteria}
+    lines = [_line("h1#1/2", scores), _line("h1#2/2", scores, status=500)]
+    client = SimpleNamespace(
+        files=SimpleNamespace(content=lambda _: SimpleNamespace(text="\n".join(lines)))
+    )
+    assert _ingest_output(cfg, conn, client, "file-1", lambda fn, _: fn()) == 0
+    assert {r.status for r in list_evaluations(conn)} == {"pending"}
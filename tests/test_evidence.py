@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from src.core.models import TranscriptSegment
+from src.services.evidence import EvidenceIndex, SuffixAutomaton, normalize, verify_evidence
+
+SEGMENTS = [
+    TranscriptSegment(text="Dzień dobry, w czym mogę pomóc?", start=0.0, end=2.5),
+    TranscriptSegment(text="Chciałbym złożyć reklamację zamówienia.", start=2.5, end=6.0),
+    TranscriptSegment(text="Oczywiście, proszę podać numer zamówienia.", start=6.0, end=9.0),
+]
+TRANSCRIPT = " ".join(s.text for s in SEGMENTS)
+
+
+def _brute_force_stats(text: str, pattern: str):
+    stats = []
+    for i in range(len(pattern)):
+        n = 0
+        while n <= i and pattern[i - n : i + 1] in text:
+            n += 1
+        stats.append(n)
+    return stats
+
+
+def test_normalize_folds_and_keeps_positions():
+    text, positions = normalize("  Żółw, ŁÓDŹ!  ")
+    assert text == "zolw lodz"
+    assert len(positions) == len(text)
+    assert positions[0] == 2
+    assert positions[text.index("lodz")] == 8
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matching_statistics_match_brute_force(seed):
+    rng = random.Random(seed)
+    text = "".join(rng.choice("abc") for _ in range(200))
+    pattern = "".join(rng.choice("abcd") for _ in range(60))
+    automaton = SuffixAutomaton(text)
+    stats = automaton.matching_statistics(pattern)
+    assert [n for n, _ in stats] == _brute_force_stats(text, pattern)
+    for i, (n, end) in enumerate(stats):
+        if n:
+            assert text[end - n + 1 : end + 1] == pattern[i - n + 1 : i + 1]
+
+
+def test_exact_match_ignores_case_accents_and_punctuation():
+    index = EvidenceIndex(TRANSCRIPT, SEGMENTS)
+    match = index.locate("chcialbym zlozyc REKLAMACJE zamowienia")
+    assert match.verified
+    assert match.match == "exact"
+    assert match.score == 1.0
+    assert match.offset == TRANSCRIPT.index("Chciałbym")
+    assert match.segment == 1
+    assert match.start_sec == 2.5
+
+
+def test_fuzzy_match_tolerates_small_edits():
+    index = EvidenceIndex(TRANSCRIPT, SEGMENTS)
+    match = index.locate("Oczywiście, prosze podac ten numer zamowienia")
+    assert match.verified
+    assert match.match == "fuzzy"
+    assert 0.8 <= match.score < 1.0
+    assert match.segment == 2
+
+
+def test_unrelated_quote_is_not_verified():
+    index = EvidenceIndex(TRANSCRIPT, SEGMENTS)
+    match = index.locate("klient zrezygnowal z uslugi internetowej")
+    assert not match.verified
+    assert match.match == "none"
+    assert match.offset == -1
+
+
+def test_scattered_short_runs_do_not_count():
+    index = EvidenceIndex(TRANSCRIPT, SEGMENTS)
+    quote = "numer dzien czym reklamacje pomoc"
+    assert not index.locate(quote, min_run=12).verified
+    assert index.locate(quote, min_run=4).match == "fuzzy"
+
+
+def test_without_segments_only_offset_is_reported():
+    match = EvidenceIndex(TRANSCRIPT).locate("numer zamówienia")
+    assert match.verified
+    assert match.offset == TRANSCRIPT.index("numer")
+    assert (match.segment, match.start_sec) == (-1, -1.0)
+
+
+def test_verify_evidence_skips_empty_quotes_and_reads_config():
+    evidence = {"powitanie": "Dzień dobry", "zamkniecie": "", "reklamacja": "złożyć reklamację"}
+    result = verify_evidence(evidence, TRANSCRIPT, SEGMENTS)
+    assert set(result) == {"powitanie", "reklamacja"}
+    assert all(m.verified for m in result.values())
+
+    strict = verify_evidence(
+        {"numer": "prosze podac inny numer"},
+        TRANSCRIPT,
+        SEGMENTS,
+        {"evidence_min_run_chars": 12, "evidence_min_coverage": 0.99},
+    )
+    assert not strict["numer"].verified
+    assert verify_evidence({"a": ""}, TRANSCRIPT) == {}
+    assert not verify_evidence({"a": "cokolwiek"}, "")["a"].verified
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+from itertools import pairwise
+
+from src.core.models import KnowledgeChunk
+from src.services.knowledge import _iter_chunks, _iter_units, _join_overlapping, _merge_hits
+
+PAGE_1 = (
+    "Konsultant wita klienta. Potwierdza dane zamowienia!\n"
+    "Czy wszystko jasne? Tak, dziekuje.\n\nNowy akapit bez kropki"
+)
+PAGE_2 = "Na koniec konsultant zegna sie uprzejmie. Rozmowa konczy sie."
+
+
+def _sentences(count: int) -> str:
+    return " ".join(f"To jest zdanie numer {i} o reklamacji." for i in range(count))
+
+
+def test_units_split_on_sentences_and_paragraphs():
+    units = list(_iter_units([PAGE_1], 200))
+    assert [u[0] for u in units] == [
+        "Konsultant wita klienta.",
+        "Potwierdza dane zamowienia!",
+        "Czy wszystko jasne?",
+        "Tak, dziekuje.",
+        "Nowy akapit bez kropki",
+    ]
+
+
+def test_unit_offsets_point_into_joined_pages():
+    joined = PAGE_1 + "\n" + PAGE_2
+    units = list(_iter_units([PAGE_1, PAGE_2], 200))
+    for text, page, start, end in units:
+        assert " ".join(joined[start:end].split()) == text
+    assert [u[1] for u in units[-2:]] == [2, 2]
+
+
+def test_long_sentence_is_cut_on_spaces():
+    sentence = " ".join(["slowo"] * 60) + "."
+    units = list(_iter_units([sentence], 50))
+    assert len(units) > 1
+    assert all(len(u[0]) <= 50 for u in units)
+    assert " ".join(u[0] for u in units) == sentence
+
+
+def test_chunks_respect_size_and_keep_whole_sentences():
+    text = _sentences(40)
+    chunks = list(_iter_chunks([text], 300, 80))
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert len(chunk.text) <= 300
+        assert chunk.text.startswith("To jest zdanie")
+        assert chunk.text.endswith("reklamacji.")
+
+
+def test_chunks_overlap_and_cover_every_sentence():
+    text = _sentences(40)
+    chunks = list(_iter_chunks([text], 300, 80))
+    for prev, nxt in pairwise(chunks):
+        first_sentence = nxt.text.split(".")[0] + "."
+        assert first_sentence in prev.text
+        assert nxt.start < prev.end
+    covered = " ".join(c.text for c in chunks)
+    for i in range(40):
+        assert f"numer {i} " in covered
+
+
+def test_chunks_without_overlap_do_not_repeat():
+    text = _sentences(40)
+    chunks = list(_iter_chunks([text], 300, 0))
+    assert " ".join(c.text for c in chunks) == text
+
+
+def test_chunk_reports_first_page():
+    chunks = list(_iter_chunks([PAGE_1, PAGE_2], 1000, 100))
+    assert len(chunks) == 1
+    assert chunks[0].page == 1
+    assert chunks[0].end == len(PAGE_1) + 1 + len(PAGE_2)
+
+
+def test_join_overlapping():
+    assert _join_overlapping("ala ma kota i psa", "kota i psa oraz rybki") == (
+        "ala ma kota i psa oraz rybki"
+    )
+    assert _join_overlapping("pierwszy fragment", "drugi fragment") == (
+        "pierwszy fragment drugi fragment"
+    )
+
+
+def test_join_overlapping_only_at_word_boundaries():
+    assert _join_overlapping("ma kota", "a psa") == "ma kota a psa"
+
+
+def test_merge_hits_joins_overlapping_chunks_of_same_source():
+    a = KnowledgeChunk(text="Zdanie jeden. Zdanie dwa.", page=1, start=0, end=25)
+    b = KnowledgeChunk(text="Zdanie dwa. Zdanie trzy.", page=1, start=14, end=38)
+    merged = _merge_hits([("regulamin.pdf", b), ("regulamin.pdf", a)], 5)
+    assert len(merged) == 1
+    source, chunk = merged[0]
+    assert source == "regulamin.pdf"
+    assert chunk.text == "Zdanie jeden. Zdanie dwa. Zdanie trzy."
+    assert (chunk.start, chunk.end) == (0, 38)
+
+
+def test_merge_hits_keeps_other_sources_and_drops_duplicates():
+    a = KnowledgeChunk(text="Zdanie jeden.", page=1, start=0, end=13)
+    dup = KnowledgeChunk(text="zdanie   JEDEN.", page=3, start=500, end=515)
+    far = KnowledgeChunk(text="Inny rozdzial.", page=4, start=900, end=914)
+    merged = _merge_hits([("a.pdf", a), ("b.pdf", a), ("a.pdf", dup), ("a.pdf", far)], 5)
+    assert [(s, c.text) for s, c in merged] == [
+        ("a.pdf", "Zdanie jeden."),
+        ("a.pdf", "Inny rozdzial."),
+    ]
+
+
+def test_merge_hits_limits_to_top_k_but_still_merges():
+    first = KnowledgeChunk(text="Jeden. Dwa.", page=1, start=0, end=11)
+    other = KnowledgeChunk(text="Trzy.", page=2, start=100, end=105)
+    tail = KnowledgeChunk(text="Dwa. Cztery.", page=1, start=7, end=19)
+    merged = _merge_hits([("a.pdf", first), ("a.pdf", other), ("a.pdf", tail)], 1)
+    assert len(merged) == 1
+    assert merged[0][1].text == "Jeden. Dwa. Cztery."
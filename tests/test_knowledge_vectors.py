@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+
+import pytest
+
+from src.services import knowledge
+from src.services.knowledge_vectors import embed, reciprocal_rank_fusion, vectors_enabled
+
+
+def test_rrf_single_ranking_keeps_order():
+    assert reciprocal_rank_fusion([[3, 1, 2]]) == [3, 1, 2]
+
+
+def test_rrf_rewards_items_ranked_by_both():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [4, 3, 5]])
+    assert fused[0] == 3
+    assert set(fused) == {1, 2, 3, 4, 5}
+
+
+def test_rrf_ties_keep_first_seen_order():
+    assert reciprocal_rank_fusion([[1, 2], [2, 1]]) == [1, 2]
+    assert reciprocal_rank_fusion([[7], [8]]) == [7, 8]
+
+
+def test_rrf_small_k_favours_top_ranks():
+    rankings = [[1, 2, 3, 4], [5, 6, 7, 4]]
+    assert reciprocal_rank_fusion(rankings, k=1)[:2] == [1, 5]
+    assert reciprocal_rank_fusion(rankings, k=1000)[0] == 4
+
+
+def test_rrf_empty():
+    assert reciprocal_rank_fusion([]) == []
+    assert reciprocal_rank_fusion([[], []]) == []
+
+
+def test_vectors_disabled_by_default():
+    assert not vectors_enabled({})
+
+
+def test_embed_matches_inflected_and_unaccented_forms():
+    np = pytest.importorskip("numpy")
+
+    def cosine(a, b):
+        return float(a @ b / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+    query = embed("reklamacja zamowienia", 1024)
+    close = embed("Złożył reklamację zamówienia w sklepie", 1024)
+    far = embed("pogoda na weekend bedzie sloneczna", 1024)
+    assert query.shape == (1024,)
+    assert query.dtype == np.float32
+    assert cosine(query, close) > cosine(query, far)
+
+
+def test_embed_empty_text_is_zero_vector():
+    pytest.importorskip("numpy")
+    assert not embed("", 64).any()
+    assert embed("a", 64).sum() > 0
+
+
+def _stored_vectors(conn: sqlite3.Connection, np):
+    rows = conn.execute(
+        """
+        SELECT v.vec, f.chunk FROM knowledge_vectors v
+        JOIN knowledge_fts f ON f.rowid = v.fts_rowid
+        """
+    ).fetchall()
+    return [(np.frombuffer(vec, dtype=np.float16), chunk) for vec, chunk in rows]
+
+
+def test_changed_pdf_is_re_embedded(tmp_path, monkeypatch):
+    np = pytest.importorskip("numpy")
+    monkeypatch.setattr(knowledge, "_iter_pdf_pages", lambda path: [path.read_text("utf-8")])
+    folder = tmp_path / "knowledge"
+    folder.mkdir()
+    pdf = folder / "regulamin.pdf"
+    pdf.write_text("Reklamacje przyjmujemy w ciagu 14 dni. Zwrot pieniedzy w 30 dni.", "utf-8")
+    cfg = {"folder": str(folder), "vectors": True, "vector_dim": 64, "chunk_chars": 40}
+    conn = sqlite3.connect(str(tmp_path / "calls.db"))
+
+    knowledge.ensure_knowledge_index(conn, cfg)
+    before = conn.execute("SELECT rowid FROM knowledge_fts ORDER BY rowid").fetchall()
+
+    pdf.write_text("Pogoda na weekend bedzie sloneczna. Temperatura do 25 stopni.", "utf-8")
+    stat = pdf.stat()
+    os.utime(pdf, (stat.st_atime, stat.st_mtime + 10))
+    knowledge.ensure_knowledge_index(conn, cfg)
+
+    after = conn.execute("SELECT rowid FROM knowledge_fts ORDER BY rowid").fetchall()
+    assert after[: len(before)] == before
+    stored = _stored_vectors(conn, np)
+    assert len(stored) == len(after)
+    for vec, chunk in stored:
+        assert "Reklamacje" not in chunk
+        assert np.array_equal(vec, embed(chunk, 64).astype(np.float16))
+
+    pdf.unlink()
+    knowledge.ensure_knowledge_index(conn, cfg)
+    assert conn.execute("SELECT COUNT(1) FROM knowledge_vectors").fetchone()[0] == 0
+    conn.close()
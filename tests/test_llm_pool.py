@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from src.services.llm_pool import (
+    _endpoint_key,
+    client_for_provider,
+    derived_scoring_cfg,
+    endpoint_configs,
+)
+
+SCORING = {
+    "provider": "lmstudio",
+    "base_url": "http://172.18.192.1:1234/v1",
+    "api_key_env": "LM_STUDIO_API_KEY",
+    "model": "qwen2.5-7b-instruct",
+    "timeout_sec": 90,
+    "max_retries": 3,
+    "requests_per_minute": 30,
+}
+
+
+def test_without_endpoints_uses_scoring():
+    configs = endpoint_configs(SCORING)
+    assert configs == [SCORING]
+
+
+def test_mixed_pool_keeps_each_connection():
+    cfg = {
+        **SCORING,
+        "endpoints": [
+            {"provider": "lmstudio", "weight": 2},
+            {"provider": "lmstudio", "base_url": "http://172.18.192.2:1234/v1"},
+            {"provider": "openai", "model": "gpt-4o-mini", "weight": 0.5},
+        ],
+    }
+    local, second, remote = endpoint_configs(cfg)
+
+    assert local["base_url"] == "http://172.18.192.1:1234/v1"
+    assert local["api_key_env"] == "LM_STUDIO_API_KEY"
+    assert local["weight"] == 2
+    assert second["base_url"] == "http://172.18.192.2:1234/v1"
+    assert second["model"] == "qwen2.5-7b-instruct"
+
+    assert remote["provider"] == "openai"
+    assert "base_url" not in remote
+    assert "api_key_env" not in remote
+    assert "requests_per_minute" not in remote
+    assert remote["model"] == "gpt-4o-mini"
+    assert remote["timeout_sec"] == 90
+    assert remote["max_retries"] == 3
+
+    assert [_endpoint_key(c) for c in (local, second, remote)] == [
+        "http://172.18.192.1:1234/v1#qwen2.5-7b-instruct",
+        "http://172.18.192.2:1234/v1#qwen2.5-7b-instruct",
+        "openai#gpt-4o-mini",
+    ]
+
+
+def test_openai_entry_with_own_connection():
+    cfg = {
+        **SCORING,
+        "endpoints": [
+            {
+                "provider": "openai",
+                "base_url": "https://proxy.example/v1",
+                "api_key_env": "PROXY_KEY",
+                "model": "gpt-4o-mini",
+            }
+        ],
+    }
+    (remote,) = endpoint_configs(cfg)
+    assert remote["base_url"] == "https://proxy.example/v1"
+    assert remote["api_key_env"] == "PROXY_KEY"
+
+
+def test_derived_cfg_drops_nested_sections():
+    derived = derived_scoring_cfg({**SCORING, "cascade": {"enabled": True}}, {"model": ""})
+    assert "cascade" not in derived
+    assert derived["model"] == "qwen2.5-7b-instruct"
+    assert derived["provider"] == "lmstudio"
+
+
+def test_mixed_pool_clients_use_own_server_and_key(monkeypatch):
+    monkeypatch.setenv("LM_STUDIO_API_KEY", "local-key")
+    monkeypatch.setenv("OPENAI_API_KEY", "remote-key")
+    cfg = {**SCORING, "endpoints": [{"provider": "lmstudio"}, {"provider": "openai"}]}
+    local, remote = (client_for_provider(c) for c in endpoint_configs(cfg))
+    assert str(local.base_url).startswith("http://172.18.192.1:1234/v1")
+    assert local.api_key == "local-key"
+    assert "172.18.192.1" not in str(remote.base_url)
+    assert remote.api_key == "remote-key"
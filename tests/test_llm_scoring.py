@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+from itertools import pairwise
+
+import pytest
+
+from src.services.llm_scoring import _split_windows, reduce_windows, transcript_windows
+
+CRITERIA = [{"name": "powitanie"}, {"name": "zamkniecie"}]
+PARTS = [
+    ({"powitanie": 1.0, "zamkniecie": 0.0}, {"powitanie": "dzien dobry", "zamkniecie": ""}),
+    ({"powitanie": 0.0, "zamkniecie": 0.5}, {"powitanie": "", "zamkniecie": "na razie"}),
+    ({"powitanie": 0.5, "zamkniecie": 1.0}, {"powitanie": "witam", "zamkniecie": "do widzenia"}),
+]
+
+
+def _text(words: int) -> str:
+    return " ".join(f"slowo{i:04d}" for i in range(words))
+
+
+def test_short_text_is_one_window():
+    assert _split_windows("krotka rozmowa", 100, 20) == ["krotka rozmowa"]
+
+
+def test_windows_cover_text_and_respect_size():
+    text = _text(400)
+    windows = _split_windows(text, 300, 60)
+    assert len(windows) > 1
+    assert all(len(w) <= 300 for w in windows)
+    assert windows[0].startswith("slowo0000")
+    assert windows[-1].endswith("slowo0399")
+    seen = {word for w in windows for word in w.split()}
+    assert seen == set(text.split())
+
+
+def test_windows_cut_on_word_boundaries_and_overlap():
+    text = _text(400)
+    words = set(text.split())
+    windows = _split_windows(text, 300, 60)
+    for w in windows:
+        assert set(w.split()) <= words
+    for prev, nxt in pairwise(windows):
+        assert nxt.split()[0] in prev.split()
+
+
+def test_overlap_is_capped_at_half_window():
+    windows = _split_windows(_text(400), 200, 10_000)
+    assert len(windows) < 400
+    assert all(windows)
+
+
+@pytest.mark.parametrize("chunk_chars", [0, 5000])
+def test_long_transcript_is_windowed_not_cut(chunk_chars):
+    text = _text(400)
+    cfg = {"chunk_chars": chunk_chars, "max_transcript_chars": 1000, "chunk_overlap_chars": 100}
+    windows = transcript_windows(text, cfg, CRITERIA, [])
+    assert len(windows) > 1
+    assert windows[0].startswith(f"[Fragment 1/{len(windows)} rozmowy]\n")
+    assert all(len(w.split("\n", 1)[1]) <= 1000 for w in windows)
+    assert windows[-1].endswith("slowo0399")
+
+
+def test_short_transcript_is_one_window():
+    cfg = {"chunk_chars": 0, "max_transcript_chars": 1000}
+    assert transcript_windows("krotka rozmowa", cfg, CRITERIA, []) == ["krotka rozmowa"]
+
+
+def test_prompt_token_budget_windows_transcript():
+    text = _text(2000)
+    cfg = {"chunk_chars": 0, "max_transcript_chars": 0, "max_prompt_tokens": 2000}
+    windows = transcript_windows(text, cfg, CRITERIA, [])
+    assert len(windows) > 1
+    assert windows[-1].endswith("slowo1999")
+
+
+@pytest.mark.parametrize(
+    "strategy, expected_scores, expected_evidence",
+    [
+        ("first", (1.0, 0.0), ("dzien dobry", "")),
+        ("last", (0.5, 1.0), ("witam", "do widzenia")),
+        ("min", (0.0, 0.0), ("", "")),
+        ("max", (1.0, 1.0), ("dzien dobry", "do widzenia")),
+    ],
+)
+def test_reduce_pick_strategies(strategy, expected_scores, expected_evidence):
+    scores, evidence = reduce_windows(PARTS, CRITERIA, {"chunk_reduce": strategy})
+    assert (scores["powitanie"], scores["zamkniecie"]) == expected_scores
+    assert (evidence["powitanie"], evidence["zamkniecie"]) == expected_evidence
+
+
+def test_reduce_mean_keeps_best_quote():
+    scores, evidence = reduce_windows(PARTS, CRITERIA, {"chunk_reduce": "mean"})
+    assert scores["powitanie"] == pytest.approx(0.5)
+    assert scores["zamkniecie"] == pytest.approx(0.5)
+    assert evidence == {"powitanie": "dzien dobry", "zamkniecie": "do widzenia"}
+
+
+def test_reduce_overrides_per_criterion():
+    cfg = {"chunk_reduce": "max", "chunk_reduce_overrides": {"zamkniecie": "last"}}
+    scores, evidence = reduce_windows(PARTS, CRITERIA, cfg)
+    assert scores == {"powitanie": 1.0, "zamkniecie": 1.0}
+    assert evidence["powitanie"] == "dzien dobry"
+
+    cfg["chunk_reduce_overrides"] = {"zamkniecie": "first"}
+    scores, _ = reduce_windows(PARTS, CRITERIA, cfg)
+    assert scores["zamkniecie"] == 0.0
+
+
+def test_reduce_treats_missing_scores_as_zero():
+    parts = [({}, {}), ({"powitanie": None}, {"powitanie": None})]
+    scores, evidence = reduce_windows(parts, CRITERIA[:1], {})
+    assert scores == {"powitanie": 0.0}
+    assert evidence == {"powitanie": ""}
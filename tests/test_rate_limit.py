@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import pytest
+
+from src.services import rate_limit
+from src.services.rate_limit import RateLimiter, TokenBucket, get_limiter
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+        self.slept = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, sec: float) -> None:
+        self.slept.append(sec)
+        self.now += sec
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock)
+    monkeypatch.setattr(rate_limit.time, "sleep", clock.sleep)
+    return clock
+
+
+def test_bucket_starts_full_and_reports_wait(clock):
+    bucket = TokenBucket(10, 2)
+    assert bucket.reserve(10) == 0.0
+    assert bucket.reserve(4) == pytest.approx(2.0)
+    assert bucket.reserve(2) == pytest.approx(3.0)
+
+
+def test_bucket_refills_up_to_capacity(clock):
+    bucket = TokenBucket(10, 2)
+    bucket.reserve(10)
+    clock.now += 3
+    assert bucket.reserve(6) == 0.0
+    assert bucket.reserve(1) == pytest.approx(0.5)
+    clock.now += 3600
+    assert bucket.reserve(10) == 0.0
+    assert bucket.reserve(1) == pytest.approx(0.5)
+
+
+def test_credit_and_cap(clock):
+    bucket = TokenBucket(10, 1)
+    bucket.reserve(8)
+    bucket.credit(5)
+    assert bucket.reserve(7) == 0.0
+    bucket.credit(100)
+    bucket.cap(3)
+    assert bucket.reserve(4) == pytest.approx(1.0)
+
+
+def test_limiter_applies_headroom_and_sleeps(clock):
+    limiter = RateLimiter("llm", rpm=0, tpm=1000, headroom=0.9)
+    assert limiter.acquire(900) == 0.0
+    assert limiter.acquire(15) == pytest.approx(1.0)
+    assert clock.slept == [pytest.approx(1.0)]
+
+
+def test_limiter_counts_requests(clock):
+    limiter = RateLimiter("llm", rpm=2, tpm=0, headroom=1.0)
+    limiter.acquire()
+    limiter.acquire()
+    assert limiter.acquire() == pytest.approx(30.0)
+
+
+def test_settle_returns_unused_and_charges_overrun(clock):
+    limiter = RateLimiter("llm", rpm=0, tpm=1000, headroom=1.0)
+    limiter.acquire(1000)
+    limiter.settle(1000, 0)
+    assert limiter.acquire(1000) == 0.0
+    limiter.settle(1000, None)
+    limiter.settle(0, 60)
+    assert limiter.tokens.reserve(0) == pytest.approx(3.6)
+
+
+def test_headers_cap_remaining_budget(clock):
+    limiter = RateLimiter("llm", rpm=60, tpm=1000, headroom=1.0)
+    limiter.update_from_headers(
+        {"x-ratelimit-remaining-requests": "0", "x-ratelimit-remaining-tokens": "bogus"}
+    )
+    assert limiter.acquire() == pytest.approx(1.0)
+    assert limiter.tokens.reserve(1000) == 0.0
+
+
+def test_get_limiter_is_disabled_without_limits():
+    assert get_limiter("test-no-limits", {}) is None
+    limiter = get_limiter("test-limits", {"requests_per_minute": 60})
+    assert limiter is get_limiter("test-limits", {"requests_per_minute": 1})
+    assert limiter.tokens is None
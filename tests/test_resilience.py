@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import json
+from types import SimpleNamespace
+
+import openai
+import pytest
+
+from src.services import resilience
+from src.services.resilience import (
+    CLIENT,
+    PARSE,
+    RATE_LIMIT,
+    SERVER,
+    TRANSPORT,
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryError,
+    RetryPolicy,
+    call_with_retry,
+    classify_error,
+    retry_after_sec,
+)
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(resilience.time, "monotonic", clock)
+    return clock
+
+
+def _status_error(status: int, headers=None) -> openai.APIStatusError:
+    exc = openai.APIStatusError.__new__(openai.APIStatusError)
+    exc.status_code = status
+    exc.response = SimpleNamespace(headers=headers or {})
+    return exc
+
+
+@pytest.mark.parametrize(
+    "exc, kind",
+    [
+        (openai.APIConnectionError.__new__(openai.APIConnectionError), TRANSPORT),
+        (_status_error(429), RATE_LIMIT),
+        (_status_error(503), SERVER),
+        (_status_error(408), SERVER),
+        (_status_error(400), CLIENT),
+        (json.JSONDecodeError("bad", "{", 0), PARSE),
+        (KeyError("scores"), PARSE),
+        (TimeoutError(), TRANSPORT),
+        (RuntimeError("boom"), CLIENT),
+    ],
+)
+def test_classify_error(exc, kind):
+    assert classify_error(exc) == kind
+
+
+def test_retry_after_headers():
+    assert retry_after_sec(_status_error(429, {"retry-after-ms": "1500"})) == 1.5
+    assert retry_after_sec(_status_error(429, {"retry-after": "7"})) == 7.0
+    assert retry_after_sec(_status_error(429)) is None
+    assert retry_after_sec(RuntimeError("no response")) is None
+
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker("llm", failure_threshold=3, reset_sec=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.retry_in() == pytest.approx(30)
+    assert not breaker.probe_due()
+
+
+def test_success_resets_failure_count(clock):
+    breaker = CircuitBreaker("llm", failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_probe_then_close(clock):
+    breaker = CircuitBreaker("llm", failure_threshold=1, reset_sec=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.probe_due()
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.retry_in() == 0.0
+
+
+def test_failed_probe_doubles_cooldown_up_to_cap(clock):
+    breaker = CircuitBreaker("llm", failure_threshold=1, reset_sec=30, max_reset_sec=100)
+    breaker.record_failure()
+    for expected in (60, 100, 100):
+        clock.now += breaker.retry_in()
+        breaker.before_call()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.retry_in() == pytest.approx(expected)
+
+    clock.now += breaker.retry_in()
+    breaker.before_call()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.retry_in() == pytest.approx(30)
+
+
+def test_open_breaker_rejects_after_max_wait():
+    breaker = CircuitBreaker("llm", failure_threshold=1, reset_sec=60, max_wait_sec=0.05)
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_call_with_retry_retries_parse_errors():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise json.JSONDecodeError("bad", "{", 0)
+        return "ok"
+
+    assert call_with_retry(flaky, RetryPolicy(2, 0, 0, 0)) == "ok"
+    assert len(calls) == 3
+
+
+def test_call_with_retry_does_not_retry_client_errors():
+    def bad_request():
+        raise _status_error(400)
+
+    with pytest.raises(RetryError) as err:
+        call_with_retry(bad_request, RetryPolicy(5, 0, 0, 0))
+    assert err.value.attempts == 1
+
+
+def test_transport_failures_open_breaker(clock):
+    breaker = CircuitBreaker("llm", failure_threshold=2, reset_sec=30)
+
+    def down():
+        raise ConnectionError("refused")
+
+    with pytest.raises(RetryError):
+        call_with_retry(down, RetryPolicy(1, 0, 0, 0), breaker)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_rate_limits_do_not_trip_breaker(clock):
+    breaker = CircuitBreaker("llm", failure_threshold=1)
+
+    def throttled():
+        raise _status_error(429, {"retry-after": "0"})
+
+    with pytest.raises(RetryError):
+        call_with_retry(throttled, RetryPolicy(2, 0, 0, 0), breaker)
+    assert breaker.state == CircuitBreaker.CLOSED
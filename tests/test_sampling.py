@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+import pytest
+
+from src.services.db import init_db
+from src.services.sampling import SamplingPolicy, get_sampler, window_bounds
+
+MOMENT = datetime(2024, 5, 15, 13, 45, 10)
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = init_db(tmp_path / "calls.db")
+    yield conn
+    conn.close()
+
+
+def _insert(conn, file_hash: str, status: str, when: datetime = MOMENT) -> None:
+    conn.execute(
+        """
+        INSERT INTO call_evaluations (
+            first_name, last_name, file_hash, evaluation_timestamp, status
+        ) VALUES (?, ?, ?, ?, ?)
+        """,
+        ("Jan", "Kowalski", file_hash, when.strftime("%Y-%m-%d %H:%M:%S"), status),
+    )
+    conn.commit()
+
+
+def _run(policy: SamplingPolicy, conn, calls: int, **kwargs) -> list[bool]:
+    kwargs.setdefault("duration_sec", 60)
+    kwargs.setdefault("profanity_flag", False)
+    return [
+        policy.select(conn, "Jan", "Kowalski", moment=MOMENT, **kwargs) for _ in range(calls)
+    ]
+
+
+@pytest.mark.parametrize(
+    "window, start, end",
+    [
+        ("hour", datetime(2024, 5, 15, 13), datetime(2024, 5, 15, 14)),
+        ("day", datetime(2024, 5, 15), datetime(2024, 5, 16)),
+        ("week", datetime(2024, 5, 13), datetime(2024, 5, 20)),
+    ],
+)
+def test_window_bounds(window, start, end):
+    assert window_bounds(MOMENT, window) == (start, end)
+
+
+def test_fixed_count_per_agent(conn):
+    policy = SamplingPolicy({"per_agent_count": 2})
+    assert _run(policy, conn, 5) == [True, True, False, False, False]
+
+
+def test_percent_quota_rounds_up(conn):
+    policy = SamplingPolicy({"per_agent_percent": 25})
+    assert _run(policy, conn, 8) == [True, False, False, False, True, False, False, False]
+
+
+def test_forced_calls_bypass_quota(conn):
+    policy = SamplingPolicy({"per_agent_count": 1, "always_over_sec": 600})
+    assert _run(policy, conn, 2) == [True, False]
+    assert _run(policy, conn, 1, profanity_flag=True) == [True]
+    assert _run(policy, conn, 1, duration_sec=600) == [True]
+    assert _run(policy, conn, 1) == [False]
+
+
+def test_quota_is_per_agent(conn):
+    policy = SamplingPolicy({"per_agent_count": 1})
+    assert policy.select(conn, "Jan", "Kowalski", 60, False, MOMENT)
+    assert policy.select(conn, "Anna", "Nowak", 60, False, MOMENT)
+    assert not policy.select(conn, "JAN", "kowalski", 60, False, MOMENT)
+
+
+def test_counts_seed_from_database_window(conn):
+    _insert(conn, "a", "scored")
+    _insert(conn, "b", "transcribed")
+    _insert(conn, "c", "auto")
+    _insert(conn, "d", "scored", datetime(2024, 5, 14, 9))
+    policy = SamplingPolicy({"per_agent_count": 2})
+    assert _run(policy, conn, 2) == [True, False]
+
+
+def test_new_window_resets_counts(conn):
+    policy = SamplingPolicy({"per_agent_count": 1, "window": "hour"})
+    assert _run(policy, conn, 2) == [True, False]
+    later = MOMENT.replace(hour=14)
+    assert policy.select(conn, "Jan", "Kowalski", 60, False, later)
+
+
+def test_get_sampler_requires_enabled():
+    assert get_sampler({}) is None
+    assert get_sampler({"enabled": False, "per_agent_count": 1}) is None
+    cfg = {"enabled": True, "per_agent_count": 1}
+    assert get_sampler(cfg) is get_sampler(dict(cfg))
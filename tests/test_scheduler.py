@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from src.pipelines.scheduler import FALLBACK_BYTES_PER_SEC, JobScheduler, expected_duration
+
+
+def _call(tmp_path, name: str, seconds: float):
+    path = tmp_path / name
+    path.write_bytes(bytes(int(seconds * FALLBACK_BYTES_PER_SEC)))
+    return path
+
+
+def _drain(scheduler: JobScheduler):
+    jobs = []
+    while len(scheduler):
+        jobs.append(scheduler.get(timeout=0))
+    return jobs
+
+
+def test_expected_duration_falls_back_to_size(tmp_path):
+    path = _call(tmp_path, "Jan Kowalski – 1.wav", 30)
+    assert expected_duration(path) == pytest.approx(30)
+    assert expected_duration(tmp_path / "missing.mp3") == 0.0
+
+
+def test_lanes_are_assigned_from_agent_and_duration(tmp_path):
+    scheduler = JobScheduler({"short_call_sec": 60, "flagged_agents": ["Anna  Nowak"]})
+    flagged = scheduler.submit(_call(tmp_path, "Anna Nowak – 1.wav", 600))
+    short = scheduler.submit(_call(tmp_path, "Jan Kowalski – 1.wav", 45))
+    normal = scheduler.submit(_call(tmp_path, "Jan Kowalski – 2.wav", 300))
+    manual = scheduler.submit(_call(tmp_path, "Jan Kowalski – 3.wav", 300), lane="manual")
+    assert [flagged.lane, short.lane, normal.lane, manual.lane] == [
+        "flagged",
+        "short",
+        "normal",
+        "manual",
+    ]
+
+
+def test_lanes_are_served_in_priority_order(tmp_path):
+    scheduler = JobScheduler(
+        {"short_call_sec": 60, "flagged_agents": ["Anna Nowak"], "duration_weight": 0}
+    )
+    scheduler.submit(_call(tmp_path, "Jan Kowalski – 1.wav", 300))
+    scheduler.submit(_call(tmp_path, "Jan Kowalski – 2.wav", 30))
+    scheduler.submit(_call(tmp_path, "Anna Nowak – 1.wav", 300))
+    scheduler.submit(_call(tmp_path, "Jan Kowalski – 3.wav", 300), lane="manual")
+    assert [job.lane for job in _drain(scheduler)] == ["manual", "flagged", "short", "normal"]
+
+
+def test_shorter_calls_first_within_lane(tmp_path):
+    scheduler = JobScheduler({"lane_delay_sec": {"normal": 0}})
+    for name, seconds in (("a", 900), ("b", 300), ("c", 600)):
+        scheduler.submit(_call(tmp_path, f"Jan Kowalski – {name}.wav", seconds), lane="normal")
+    assert [job.path.stem[-1] for job in _drain(scheduler)] == ["b", "c", "a"]
+
+
+def test_duration_weight_zero_keeps_submission_order(tmp_path):
+    scheduler = JobScheduler({"duration_weight": 0})
+    for name, seconds in (("a", 900), ("b", 300), ("c", 600)):
+        scheduler.submit(_call(tmp_path, f"Jan Kowalski – {name}.wav", seconds), lane="normal")
+    assert [job.path.stem[-1] for job in _drain(scheduler)] == ["a", "b", "c"]
+
+
+def test_get_times_out_and_close_wakes_waiters(tmp_path):
+    scheduler = JobScheduler({})
+    assert scheduler.get(timeout=0.01) is None
+
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(scheduler.get()))
+    waiter.start()
+    scheduler.close()
+    waiter.join(timeout=2)
+    assert not waiter.is_alive()
+    assert results == [None]
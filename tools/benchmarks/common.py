@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import fnmatch
+import json
+import platform
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from src.core.models import EvaluationResult, EvidenceMatch
+
+SENTENCES = [
+    "Dzien dobry, nazywam sie Anna i dzwonie z biura obslugi klienta.",
+    "W czym moge panu dzisiaj pomoc?",
+    "Prosze podac numer umowy albo numer klienta.",
+    "Dziekuje, widze juz pana konto w systemie.",
+    "Faktura za ostatni miesiac zostala wystawiona dwa dni temu.",
+    "Rozumiem, ze kwota jest wyzsza niz zwykle.",
+    "Wynika to ze zmiany taryfy od poczatku kwartalu.",
+    "Moge zaproponowac rozlozenie platnosci na dwie raty.",
+    "Czy taka forma bedzie dla pana wygodna?",
+    "Potwierdzenie wysle na adres e-mail podany w umowie.",
+    "Czy moge jeszcze w czyms pomoc?",
+    "Dziekuje za rozmowe i zycze milego dnia.",
+]
+SYLLABLES = [
+    "ka", "to", "wy", "prze", "sta", "ni", "ro", "zu", "me", "dol", "szy", "cja", "pla", "go",
+]
+AGENTS = [("Jan", "Kowalski"), ("Anna", "Nowak"), ("Piotr", "Wisniewski"), ("Ewa", "Lis")]
+
+
+def measure(fn: Callable[[], object], ops: int, unit: str, repeat: int = 1, **extra) -> Dict:
+    best = None
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return {
+        "seconds": round(best, 6),
+        "ops": ops,
+        "unit": unit,
+        "ops_per_sec": round(ops / best, 3) if best else 0.0,
+        **extra,
+    }
+
+
+def transcript(rng: random.Random, sentences: int, profanity: Optional[List[str]] = None) -> str:
+    words = [rng.choice(SENTENCES) for _ in range(sentences)]
+    if profanity and rng.random() < 0.05:
+        words.insert(rng.randrange(len(words) + 1), rng.choice(profanity))
+    return " ".join(words)
+
+
+def pseudo_text(rng: random.Random, words: int) -> str:
+    return " ".join(
+        "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(words)
+    )
+
+
+def evaluation(rng: random.Random, idx: int, criteria: List[str]) -> EvaluationResult:
+    first_name, last_name = AGENTS[idx % len(AGENTS)]
+    text = transcript(rng, 20)
+    scores = {c: round(rng.random(), 2) for c in criteria}
+    evidence = {c: SENTENCES[idx % len(SENTENCES)] for c in criteria}
+    return EvaluationResult(
+        first_name=first_name,
+        last_name=last_name,
+        file_name=f"{first_name} {last_name} {idx:07d}.mp3",
+        evaluation_timestamp=datetime(2026, 1, 1) + timedelta(minutes=idx),
+        transcript=text,
+        score_total=sum(scores.values()) / max(1, len(scores)),
+        stars=rng.randint(1, 5),
+        profanity_flag=False,
+        profanity_phrases=[],
+        profanity_excerpt="",
+        score_breakdown=scores,
+        evidence_breakdown=evidence,
+        evidence_summary=evidence[criteria[0]] if criteria else "",
+        knowledge_snippets=[],
+        transcription_confidence=0.9,
+        call_duration_sec=rng.randint(30, 900),
+        file_hash=f"{idx:064x}",
+        status="scored",
+        evidence_verification={
+            c: EvidenceMatch(verified=True, match="exact", score=1.0, offset=0, segment=0)
+            for c in criteria
+        },
+    )
+
+
+def mp3_bytes(seconds: float, rng: random.Random) -> bytes:
+    header = bytes([0xFF, 0xFB, 0x90, 0x00])
+    frame_len = 144 * 128000 // 44100
+    frames = int(seconds * 44100 / 1152)
+    payload = bytes(rng.getrandbits(8) & 0x7F for _ in range(frame_len - 4))
+    return b"".join(header + payload for _ in range(frames))
+
+
+def write_results(path: Path, results: Dict[str, Dict], args: Dict) -> None:
+    payload = {
+        "meta": {
+            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "args": args,
+        },
+        "results": results,
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+def threshold_for(name: str, thresholds: Dict[str, float]) -> float:
+    best, best_len = float(thresholds.get("default", 0.2)), -1
+    for pattern, value in thresholds.items():
+        if pattern != "default" and fnmatch.fnmatch(name, pattern) and len(pattern) > best_len:
+            best, best_len = float(value), len(pattern)
+    return best
+
+
+def compare(
+    results: Dict[str, Dict], baseline: Dict[str, Dict], thresholds: Dict[str, float]
+) -> List[str]:
+    regressions = []
+    for name, current in sorted(results.items()):
+        previous = baseline.get(name)
+        if not previous or not previous.get("ops_per_sec"):
+            continue
+        ratio = current["ops_per_sec"] / previous["ops_per_sec"]
+        limit = threshold_for(name, thresholds)
+        status = "REGRESSION" if ratio < 1.0 - limit else "ok"
+        print(
+            f"{name:<52}{previous['ops_per_sec']:>14.1f}{current['ops_per_sec']:>14.1f}"
+            f"{ratio:>8.2f}x  {status}"
+        )
+        if status != "ok":
+            regressions.append(name)
+    return regressions
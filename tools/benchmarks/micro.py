@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import random
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+from src.core.config import AppConfig
+from src.services.db import init_db, insert_evaluation, list_evaluations
+from src.services.export_excel import export_to_excel
+from src.services.knowledge import ensure_knowledge_index, retrieve_knowledge
+from src.services.profanity import detect_profanity
+from tools.benchmarks.common import evaluation, measure, pseudo_text, transcript
+
+QUERIES = 200
+
+
+def bench_detect_profanity(cfg: AppConfig, rows: int, seed: int) -> Dict:
+    rng = random.Random(seed)
+    texts = [transcript(rng, 12, cfg.profanity_list) for _ in range(rows)]
+
+    def run() -> None:
+        for text in texts:
+            detect_profanity(text, cfg.profanity_list)
+
+    return measure(run, rows, "transcripts")
+
+
+def bench_retrieve_knowledge(
+    cfg: AppConfig, rows: int, seed: int, work_dir: Path
+) -> Dict[str, Dict]:
+    rng = random.Random(seed)
+    cfg_knowledge = {**cfg.knowledge, "enabled": True, "vectors": False}
+    cfg_knowledge["folder"] = str(work_dir / "knowledge_empty")
+    conn = init_db(work_dir / f"knowledge_{rows}.db")
+    ensure_knowledge_index(conn, cfg_knowledge)
+    conn.executemany(
+        """
+        INSERT INTO knowledge_fts (source, chunk, page, start_offset, end_offset)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        (
+            (f"bench_{i // 500}.pdf", pseudo_text(rng, 120), 1 + i % 500, 0, 0)
+            for i in range(rows)
+        ),
+    )
+    conn.execute(
+        """
+        INSERT INTO knowledge_state (key, value) VALUES ('generation', 1)
+        ON CONFLICT(key) DO UPDATE SET value = value + 1
+        """
+    )
+    conn.commit()
+    queries = [pseudo_text(rng, 150) for _ in range(QUERIES)]
+
+    def run() -> None:
+        for q in queries:
+            retrieve_knowledge(conn, cfg_knowledge, q)
+
+    cold = measure(run, QUERIES, "queries", chunks=rows)
+    warm = measure(run, QUERIES, "queries", chunks=rows)
+    conn.close()
+    return {"cold": cold, "warm": warm}
+
+
+def bench_db(cfg: AppConfig, rows: int, seed: int, work_dir: Path) -> Dict[str, Dict]:
+    rng = random.Random(seed)
+    criteria = [c["name"] for c in cfg.criteria]
+    results = [evaluation(rng, i, criteria) for i in range(rows)]
+    conn = init_db(work_dir / f"evaluations_{rows}.db")
+
+    def insert() -> None:
+        for r in results:
+            insert_evaluation(conn, r, cfg.criteria)
+
+    out = {"insert_evaluation": measure(insert, rows, "rows")}
+    pages = max(1, min(100, rows // 200))
+    out["list_evaluations.first_page"] = measure(
+        lambda: [list_evaluations(conn) for _ in range(pages)], pages, "pages", rows=rows
+    )
+    out["list_evaluations.last_page"] = measure(
+        lambda: [list_evaluations(conn, offset=max(0, rows - 200)) for _ in range(pages)],
+        pages,
+        "pages",
+        rows=rows,
+    )
+    out["list_evaluations.name_filter"] = measure(
+        lambda: [list_evaluations(conn, name_filter="Nowak") for _ in range(pages)],
+        pages,
+        "pages",
+        rows=rows,
+    )
+    out["list_evaluations.all"] = measure(lambda: list_evaluations(conn, limit=rows), rows, "rows")
+    conn.close()
+    return out
+
+
+def bench_export_to_excel(cfg: AppConfig, rows: int, seed: int, work_dir: Path) -> Dict:
+    rng = random.Random(seed)
+    criteria = [c["name"] for c in cfg.criteria]
+    results = [evaluation(rng, i, criteria) for i in range(rows)]
+    return measure(
+        lambda: export_to_excel(results, work_dir / f"report_{rows}.xlsx"), rows, "rows"
+    )
+
+
+def run_micro(cfg: AppConfig, sizes: List[int], seed: int, skip: List[str]) -> Dict[str, Dict]:
+    results: Dict[str, Dict] = {}
+    with tempfile.TemporaryDirectory(prefix="ocena_bench_") as tmp:
+        work_dir = Path(tmp)
+        for rows in sizes:
+            if "detect_profanity" not in skip:
+                results[f"micro.detect_profanity.{rows}"] = bench_detect_profanity(
+                    cfg, rows, seed
+                )
+            if "retrieve_knowledge" not in skip:
+                for name, res in bench_retrieve_knowledge(cfg, rows, seed, work_dir).items():
+                    results[f"micro.retrieve_knowledge.{name}.{rows}"] = res
+            if "db" not in skip:
+                for name, res in bench_db(cfg, rows, seed, work_dir).items():
+                    results[f"micro.{name}.{rows}"] = res
+            if "export_to_excel" not in skip:
+                results[f"micro.export_to_excel.{rows}"] = bench_export_to_excel(
+                    cfg, rows, seed, work_dir
+                )
+            for name in sorted(k for k in results if k.endswith(f".{rows}")):
+                res = results[name]
+                print(f"{name:<52}{res['ops_per_sec']:>14.1f} {res['unit']}/s")
+    return results
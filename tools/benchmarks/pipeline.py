@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from src.core.config import AppConfig
+from src.pipelines.batch import process_file, run_batch
+from src.services.db import count_evaluations, init_db
+from src.services.metrics import REGISTRY
+from tools.benchmarks.common import AGENTS, measure, mp3_bytes
+from tools.stubs.openai_stub import StubState, serve
+
+API_KEY_ENV = "OCENA_BENCH_API_KEY"
+
+
+def bench_config(cfg: AppConfig, work_dir: Path, base_url: str, workers: int) -> AppConfig:
+    os.environ.setdefault(API_KEY_ENV, "bench")
+    cfg.input_dir = work_dir / "in"
+    cfg.processed_dir = work_dir / "processed"
+    cfg.invalid_dir = work_dir / "invalid"
+    cfg.reports_dir = work_dir / "reports"
+    cfg.db_path = work_dir / "bench.db"
+    cfg.use_excel_export = False
+    retry = {"max_retries": 5, "retry_sleep_sec": 0.01, "retry_max_sleep_sec": 0.05}
+    cfg.transcription = {
+        **cfg.transcription,
+        **retry,
+        "provider": "openai",
+        "model": "whisper-1",
+        "base_url": base_url,
+        "api_key_env": API_KEY_ENV,
+        "chunk_sec": 0,
+        "requests_per_minute": 0,
+    }
+    cfg.scoring = {
+        **cfg.scoring,
+        **retry,
+        "provider": "lmstudio",
+        "model": "stub",
+        "base_url": base_url,
+        "api_key_env": API_KEY_ENV,
+        "endpoints": [],
+        "cascade": {"enabled": False},
+        "evidence_reask": False,
+        "requests_per_minute": 0,
+        "tokens_per_minute": 0,
+    }
+    cfg.scheduler = {**cfg.scheduler, "workers": workers}
+    cfg.knowledge = {**cfg.knowledge, "enabled": False}
+    cfg.batch_api = {**cfg.batch_api, "enabled": False}
+    cfg.sampling = {**cfg.sampling, "enabled": False}
+    cfg.metrics = {**cfg.metrics, "http_port": 0}
+    cfg.watcher = {**cfg.watcher, "settle_time_sec": 0, "idle_sleep_sec": 1}
+    return cfg
+
+
+def make_calls(folder: Path, count: int, seed: int) -> List[Path]:
+    rng = random.Random(seed)
+    folder.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(count):
+        first_name, last_name = AGENTS[i % len(AGENTS)]
+        path = folder / f"{first_name} {last_name} {seed}_{i:05d}.mp3"
+        path.write_bytes(mp3_bytes(rng.uniform(20, 240), rng))
+        paths.append(path)
+    return paths
+
+
+def _stage_stats() -> Dict[str, Dict]:
+    snap = REGISTRY.snapshot()
+    stages = {
+        name: {k: v for k, v in s.items() if k != "buckets"} for name, s in snap["stages"].items()
+    }
+    return {"stages": stages, "counters": snap["counters"]}
+
+
+def bench_run_batch(cfg: AppConfig, files: int, seed: int) -> Dict:
+    make_calls(cfg.input_dir, files, seed)
+    conn = init_db(cfg.db_path)
+    before = count_evaluations(conn)
+    REGISTRY.reset()
+    result = measure(lambda: run_batch(cfg, conn), files, "files")
+    result["scored"] = count_evaluations(conn) - before
+    result.update(_stage_stats())
+    conn.close()
+    return result
+
+
+def bench_process_file(cfg: AppConfig, files: int, seed: int) -> Dict:
+    paths = make_calls(cfg.input_dir, files, seed + 1)
+    conn = init_db(cfg.db_path)
+    before = count_evaluations(conn)
+    REGISTRY.reset()
+    latencies = []
+
+    def run() -> None:
+        for path in paths:
+            started = time.perf_counter()
+            process_file(path, cfg, conn)
+            latencies.append(time.perf_counter() - started)
+
+    result = measure(run, files, "files")
+    latencies.sort()
+    result["p50_sec"] = round(latencies[len(latencies) // 2], 6)
+    result["p95_sec"] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 6)
+    result["scored"] = count_evaluations(conn) - before
+    result.update(_stage_stats())
+    conn.close()
+    return result
+
+
+def bench_watcher(cfg: AppConfig, files: int, seed: int, timeout_sec: float = 600.0) -> Dict:
+    from src.pipelines.watcher import run_watcher
+
+    cfg.input_dir.mkdir(parents=True, exist_ok=True)
+    staging = cfg.input_dir.parent / "staging"
+    paths = make_calls(staging, files, seed + 2)
+    conn = init_db(cfg.db_path)
+    before = count_evaluations(conn)
+    REGISTRY.reset()
+    threading.Thread(target=run_watcher, args=(cfg, init_db(cfg.db_path)), daemon=True).start()
+    time.sleep(1.0)
+
+    def run() -> None:
+        for path in paths:
+            shutil.move(str(path), str(cfg.input_dir / path.name))
+        deadline = time.monotonic() + timeout_sec
+        while count_evaluations(conn) - before < files and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    result = measure(run, files, "files")
+    result["scored"] = count_evaluations(conn) - before
+    result.update(_stage_stats())
+    conn.close()
+    return result
+
+
+def run_pipeline(
+    cfg: AppConfig,
+    files: int,
+    workers: int,
+    seed: int,
+    latency_ms: float,
+    jitter_ms: float,
+    failure_rate: float,
+    skip: List[str],
+) -> Dict[str, Dict]:
+    state = StubState(
+        batch_delay_sec=0.0,
+        latency_ms=latency_ms,
+        jitter_ms=jitter_ms,
+        failure_rate=failure_rate,
+        seed=seed,
+    )
+    server = serve("127.0.0.1", 0, state)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}/v1"
+    results: Dict[str, Dict] = {}
+    try:
+        with tempfile.TemporaryDirectory(prefix="ocena_bench_") as tmp:
+            bench_config(cfg, Path(tmp), base_url, workers)
+            benches = [
+                ("process_file", lambda: bench_process_file(cfg, files, seed)),
+                ("run_batch", lambda: bench_run_batch(cfg, files, seed)),
+                ("watcher", lambda: bench_watcher(cfg, files, seed)),
+            ]
+            for name, bench in benches:
+                if name in skip:
+                    continue
+                key = f"pipeline.{name}.w{1 if name == 'process_file' else workers}"
+                requests, failures = state.requests, state.failures
+                results[key] = bench()
+                results[key]["stub_requests"] = state.requests - requests
+                results[key]["stub_failures"] = state.failures - failures
+                print(f"{key:<52}{results[key]['ops_per_sec']:>14.2f} files/s")
+    finally:
+        server.shutdown()
+        server.server_close()
+    return results
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+
+from src.core.config import load_config
+from tools.benchmarks.common import compare, write_results
+from tools.benchmarks.micro import run_micro
+from tools.benchmarks.pipeline import run_pipeline
+
+DEFAULT_THRESHOLDS = Path(__file__).with_name("thresholds.json")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline throughput benchmarks")
+    parser.add_argument("--suite", choices=["micro", "pipeline", "all"], default="all")
+    parser.add_argument("--config", default="config.yaml")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000])
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--failure-rate", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--skip", nargs="*", default=[])
+    parser.add_argument("--output", default="benchmarks/results.json")
+    parser.add_argument("--baseline")
+    parser.add_argument("--thresholds", default=str(DEFAULT_THRESHOLDS))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    results = {}
+    if args.suite in ("micro", "all"):
+        results.update(run_micro(load_config(Path(args.config)), args.rows, args.seed, args.skip))
+    if args.suite in ("pipeline", "all"):
+        results.update(
+            run_pipeline(
+                load_config(Path(args.config)),
+                args.files,
+                args.workers,
+                args.seed,
+                args.latency_ms,
+                args.jitter_ms,
+                args.failure_rate,
+                args.skip,
+            )
+        )
+    write_results(Path(args.output), results, vars(args))
+    print(f"Results: {args.output}")
+
+    if not args.baseline:
+        return 0
+    baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))["results"]
+    thresholds = json.loads(Path(args.thresholds).read_text(encoding="utf-8"))
+    regressions = compare(results, baseline, thresholds)
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed beyond threshold")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
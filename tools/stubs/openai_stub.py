@@ -0,0 +1,368 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+
+TRANSCRIPT_HEADER = "Transkrypcja:\n"
+BYTES_PER_SENTENCE = 8000
+
+SENTENCES = [
+    "Dzien dobry, nazywam sie Anna i dzwonie z biura obslugi klienta.",
+    "W czym moge panu dzisiaj pomoc?",
+    "Prosze podac numer umowy albo numer klienta.",
+    "Dziekuje, widze juz pana konto w systemie.",
+    "Faktura za ostatni miesiac zostala wystawiona dwa dni temu.",
+    "Rozumiem, ze kwota jest wyzsza niz zwykle.",
+    "Wynika to ze zmiany taryfy od poczatku kwartalu.",
+    "Moge zaproponowac rozlozenie platnosci na dwie raty.",
+    "Czy taka forma bedzie dla pana wygodna?",
+    "Potwierdzenie wysle na adres e-mail podany w umowie.",
+    "Czy moge jeszcze w czyms pomoc?",
+    "Dziekuje za rozmowe i zycze milego dnia.",
+]
+
+
+class StubState:
+    def __init__(
+        self,
+        batch_delay_sec: float = 1.0,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.batch_delay_sec = batch_delay_sec
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.files: Dict[str, Dict] = {}
+        self.batches: Dict[str, Dict] = {}
+        self.requests = 0
+        self.failures = 0
+        self.lock = threading.Lock()
+        self._random = random.Random(seed)
+
+    def simulate(self) -> Optional[int]:
+        with self.lock:
+            self.requests += 1
+            delay = self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)
+            fail = self._random.random() < self.failure_rate
+            status = self._random.choice((429, 500, 503)) if fail else None
+            if fail:
+                self.failures += 1
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+        return status
+
+    def add_file(self, filename: str, purpose: str, data: bytes) -> Dict:
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        meta = {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(data),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+        }
+        with self.lock:
+            self.files[file_id] = {"meta": meta, "data": data}
+        return meta
+
+    def create_batch(self, input_file_id: str, endpoint: str, window: str) -> Optional[Dict]:
+        with self.lock:
+            if input_file_id not in self.files:
+                return None
+            batch_id = f"batch_{uuid.uuid4().hex[:24]}"
+            batch = {
+                "id": batch_id,
+                "object": "batch",
+                "endpoint": endpoint,
+                "input_file_id": input_file_id,
+                "completion_window": window,
+                "status": "validating",
+                "output_file_id": None,
+                "error_file_id": None,
+                "created_at": int(time.time()),
+                "request_counts": {"total": 0, "completed": 0, "failed": 0},
+            }
+            self.batches[batch_id] = batch
+        threading.Thread(target=self._run_batch, args=(batch_id,), daemon=True).start()
+        return batch
+
+    def _run_batch(self, batch_id: str) -> None:
+        with self.lock:
+            batch = self.batches[batch_id]
+            data = self.files[batch["input_file_id"]]["data"]
+            batch["status"] = "in_progress"
+        time.sleep(self.batch_delay_sec)
+
+        out_lines: List[str] = []
+        completed = 0
+        for line in data.decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            body = chat_completion(request.get("body") or {})
+            out_lines.append(
+                json.dumps(
+                    {
+                        "id": f"batch_req_{uuid.uuid4().hex[:16]}",
+                        "custom_id": request.get("custom_id"),
+                        "response": {"status_code": 200, "request_id": "", "body": body},
+                        "error": None,
+                    },
+                    ensure_ascii=False,
+                )
+            )
+            completed += 1
+
+        output = self.add_file("batch_output.jsonl", "batch_output", "\n".join(out_lines).encode())
+        with self.lock:
+            batch["status"] = "completed"
+            batch["output_file_id"] = output["id"]
+            batch["completed_at"] = int(time.time())
+            batch["request_counts"] = {"total": completed, "completed": completed, "failed": 0}
+
+
+def chat_completion(body: Dict) -> Dict:
+    messages = body.get("messages") or []
+    system = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+    user = next((m.get("content", "") for m in messages if m.get("role") == "user"), "")
+    names = _criteria_names(body, system)
+    transcript = user.split(TRANSCRIPT_HEADER, 1)[-1]
+    quote = _quote(transcript)
+
+    scores = {}
+    for name in names:
+        digest = hashlib.sha256(f"{name}\n{transcript}".encode("utf-8")).digest()
+        scores[name] = round(0.5 + digest[0] / 510.0, 2)
+    content = json.dumps(
+        {"scores": scores, "evidence": {n: quote for n in names}}, ensure_ascii=False
+    )
+    prompt_tokens = (len(system) + len(user)) // 4
+    completion_tokens = len(content) // 4
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def transcription_text(audio: bytes) -> str:
+    digest = hashlib.sha256(audio).digest()
+    count = max(3, min(60, len(audio) // BYTES_PER_SENTENCE))
+    return " ".join(
+        SENTENCES[(digest[i % len(digest)] + i) % len(SENTENCES)] for i in range(count)
+    )
+
+
+def _criteria_names(body: Dict, system: str) -> List[str]:
+    try:
+        schema = body["response_format"]["json_schema"]["schema"]
+        return list(schema["properties"]["scores"]["required"])
+    except (KeyError, TypeError):
+        pass
+    match = re.search(r"Kategorie: (.+?)\.\n", system)
+    if not match:
+        return []
+    return [n.strip() for n in match.group(1).split(",") if n.strip()]
+
+
+def _quote(transcript: str, max_chars: int = 80) -> str:
+    text = transcript.strip()
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind(" ", 0, max_chars)
+    return text[: cut if cut > 0 else max_chars]
+
+
+def parse_multipart(body: bytes, content_type: str) -> Dict[str, Tuple[str, bytes]]:
+    match = re.search(r'boundary="?([^";]+)"?', content_type)
+    if not match:
+        return {}
+    delimiter = b"--" + match.group(1).encode()
+    parts: Dict[str, Tuple[str, bytes]] = {}
+    for chunk in body.split(delimiter)[1:]:
+        if chunk.startswith(b"--"):
+            break
+        head, _, data = chunk[2:].partition(b"\r\n\r\n")
+        if data.endswith(b"\r\n"):
+            data = data[:-2]
+        name = re.search(rb'\bname="([^"]*)"', head)
+        filename = re.search(rb'\bfilename="([^"]*)"', head)
+        if name:
+            parts[name.group(1).decode()] = (
+                filename.group(1).decode() if filename else "",
+                data,
+            )
+    return parts
+
+
+def make_handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+        def do_GET(self) -> None:
+            path = self.path.split("?", 1)[0].rstrip("/")
+            if path == "/v1/models":
+                self._json({"object": "list", "data": [{"id": "stub", "object": "model"}]})
+                return
+            match = re.fullmatch(r"/v1/files/([^/]+)(/content)?", path)
+            if match:
+                with state.lock:
+                    stored = state.files.get(match.group(1))
+                if stored is None:
+                    self._error(404, "file not found")
+                elif match.group(2):
+                    self._send(200, stored["data"], "application/octet-stream")
+                else:
+                    self._json(stored["meta"])
+                return
+            match = re.fullmatch(r"/v1/batches/([^/]+)", path)
+            if match:
+                with state.lock:
+                    batch = state.batches.get(match.group(1))
+                    batch = dict(batch) if batch else None
+                if batch is None:
+                    self._error(404, "batch not found")
+                else:
+                    self._json(batch)
+                return
+            self._error(404, "not found")
+
+        def do_POST(self) -> None:
+            path = self.path.split("?", 1)[0].rstrip("/")
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if path in ("/v1/chat/completions", "/v1/audio/transcriptions"):
+                status = state.simulate()
+                if status is not None:
+                    self._json(
+                        {"error": {"message": "simulated failure", "type": "server_error"}},
+                        status,
+                        {"retry-after-ms": "10"} if status == 429 else None,
+                    )
+                    return
+            if path == "/v1/chat/completions":
+                self._json(chat_completion(json.loads(body or b"{}")))
+            elif path == "/v1/audio/transcriptions":
+                parts = parse_multipart(body, self.headers.get("Content-Type", ""))
+                if "file" not in parts:
+                    self._error(400, "missing file")
+                    return
+                text = transcription_text(parts["file"][1])
+                response_format = parts.get("response_format", ("", b"json"))[1].decode()
+                if response_format == "text":
+                    self._send(200, text.encode("utf-8"), "text/plain; charset=utf-8")
+                else:
+                    self._json({"text": text})
+            elif path == "/v1/files":
+                parts = parse_multipart(body, self.headers.get("Content-Type", ""))
+                if "file" not in parts:
+                    self._error(400, "missing file")
+                    return
+                filename, data = parts["file"]
+                purpose = parts.get("purpose", ("", b"batch"))[1].decode()
+                self._json(state.add_file(filename or "upload.jsonl", purpose, data))
+            elif path == "/v1/batches":
+                payload = json.loads(body or b"{}")
+                batch = state.create_batch(
+                    payload.get("input_file_id", ""),
+                    payload.get("endpoint", "/v1/chat/completions"),
+                    payload.get("completion_window", "24h"),
+                )
+                if batch is None:
+                    self._error(404, "input file not found")
+                else:
+                    self._json(batch)
+            else:
+                self._error(404, "not found")
+
+        def _json(
+            self, payload: Dict, status: int = 200, headers: Optional[Dict[str, str]] = None
+        ) -> None:
+            data = json.dumps(payload, ensure_ascii=False).encode()
+            self._send(status, data, "application/json", headers)
+
+        def _error(self, status: int, message: str) -> None:
+            self._json({"error": {"message": message, "type": "invalid_request_error"}}, status)
+
+        def _send(
+            self,
+            status: int,
+            data: bytes,
+            content_type: str,
+            headers: Optional[Dict[str, str]] = None,
+        ) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+    return Handler
+
+
+def serve(host: str, port: int, state: StubState) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--batch-delay", type=float, default=1.0)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    state = StubState(
+        batch_delay_sec=args.batch_delay,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        failure_rate=args.failure_rate,
+        seed=args.seed,
+    )
+    server = serve(args.host, args.port, state)
+    print(f"OpenAI stub listening on http://{args.host}:{server.server_port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()